@@ -3,6 +3,14 @@ ASGI config for crud project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Las lecturas del catálogo tienen variantes async (/api/lectura/..., ver
+mantenedores/vistas_async.py) pensadas para este punto de entrada:
+
+    uvicorn crud.asgi:application --host 0.0.0.0 --port $PORT --workers 1
+
+Un solo proceso atiende miles de conexiones lentas de la app móvil. El resto
+de las vistas es sync y funciona igual, cada petición en un hilo.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -12,5 +20,29 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'crud.settings')
+os.environ.setdefault('DJANGO_ASGI', '1')
+
+django_application = get_asgi_application()
+
+from django.conf import settings  # noqa: E402  (después de configurar Django)
+from django.core.handlers.asgi import ASGIHandler  # noqa: E402
+
+
+class LecturaASGIHandler(ASGIHandler):
+    """Handler de /api/lectura/ con la pila reducida MIDDLEWARE_LECTURA_ASYNC."""
+    def load_middleware(self, is_async=False):
+        completo = settings.MIDDLEWARE
+        settings.MIDDLEWARE = settings.MIDDLEWARE_LECTURA_ASYNC
+        try:
+            super().load_middleware(is_async)
+        finally:
+            settings.MIDDLEWARE = completo
+
+
+lectura_application = LecturaASGIHandler()
+
 
-application = get_asgi_application()
+async def application(scope, receive, send):
+    if scope['type'] == 'http' and scope['path'].startswith('/api/lectura/'):
+        return await lectura_application(scope, receive, send)
+    return await django_application(scope, receive, send)
@@ -4,9 +4,11 @@ Django settings for crud project.
 
 from pathlib import Path
 import os
+import sys
 import dj_database_url
 import logging
 import cloudinary
+from django.core.exceptions import ImproperlyConfigured
 
 AUTH_USER_MODEL = 'mantenedores.Usuario'
 
@@ -44,7 +46,10 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    # Variante async de WhiteNoise para no serializar las vistas async bajo ASGI
+    'mantenedores.middleware.WhiteNoiseAsyncMiddleware',
+    'mantenedores.instrumentacion.InstrumentacionMiddleware',
+    'mantenedores.replicas.ReplicaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -71,8 +76,41 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'crud.wsgi.application'
+ASGI_APPLICATION = 'crud.asgi.application'
+
+# crud/asgi.py marca el proceso como ASGI (uvicorn). Ahí el ORM corre en un
+# hilo por petición y las conexiones persistentes no se reutilizan entre
+# peticiones, así que se cierran al terminar cada una.
+SERVIDOR_ASGI = os.environ.get('DJANGO_ASGI', '') == '1'
 
 # --- Base de datos ---
+# DB_POOL elige cómo se reutilizan las conexiones:
+#   ''          conexiones persistentes de Django (CONN_MAX_AGE), con health checks
+#   'psycopg'   pool de psycopg 3 dentro del proceso (DB_POOL_MIN/MAX/TIMEOUT)
+#   'pgbouncer' DATABASE_URL apunta a un PgBouncer en modo transaction
+DB_POOL = os.environ.get('DB_POOL', '').strip().lower()
+
+
+def configurar_conexion(config):
+    """Aplica el modo de DB_POOL a la configuración de una base."""
+    config['CONN_HEALTH_CHECKS'] = True
+    if 'postgresql' not in config['ENGINE']:
+        return config
+    opciones = config.setdefault('OPTIONS', {})
+    if DB_POOL == 'psycopg':
+        # Django exige CONN_MAX_AGE = 0: al cerrar, la conexión vuelve al pool
+        config['CONN_MAX_AGE'] = 0
+        opciones['pool'] = {
+            'min_size': int(os.environ.get('DB_POOL_MIN', 2)),
+            'max_size': int(os.environ.get('DB_POOL_MAX', 10)),
+            'timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        }
+    elif DB_POOL == 'pgbouncer':
+        # En modo transaction los cursores con nombre no sobreviven entre transacciones
+        config['DISABLE_SERVER_SIDE_CURSORS'] = True
+    return config
+
+
 if DEBUG:
     DATABASES = {
         'default': {
@@ -87,11 +125,94 @@ if DEBUG:
 else:
     DATABASES = {
         'default': dj_database_url.config(
-            conn_max_age=600,
+            conn_max_age=0 if SERVIDOR_ASGI else 600,
             ssl_require=True
         )
     }
 
+# Réplicas de lectura: DATABASE_REPLICA_URLS=postgres://...,postgres://...
+# Quedan como replica_1, replica_2... y solo reciben los GET de la API
+# (ver mantenedores/replicas.py). Requieren CACHE_URL compartida: ahí se marca
+# a quién leer de la primaria después de escribir.
+for numero, url in enumerate(filter(None, os.environ.get('DATABASE_REPLICA_URLS', '').split(',')), start=1):
+    DATABASES[f'replica_{numero}'] = dj_database_url.parse(
+        url.strip(),
+        conn_max_age=0 if SERVIDOR_ASGI else 600,
+        ssl_require=not DEBUG,
+        test_options={'MIRROR': 'default'},
+    )
+    # Una réplica caída no debe colgar la petición que mide su atraso
+    DATABASES[f'replica_{numero}'].setdefault('OPTIONS', {})['connect_timeout'] = int(
+        os.environ.get('REPLICA_CONNECT_TIMEOUT', 3)
+    )
+
+for _config in DATABASES.values():
+    configurar_conexion(_config)
+
+REPLICAS = {
+    # Atraso máximo (s) para usar una réplica; si lo supera se lee de la primaria
+    'LAG_MAXIMO': float(os.environ.get('REPLICA_LAG_MAXIMO', 5)),
+    # Cada cuántos segundos cada proceso vuelve a medir el atraso
+    'INTERVALO': float(os.environ.get('REPLICA_INTERVALO', 5)),
+    # Rutas cuyos GET pueden ir a una réplica (los mantenedores del panel no)
+    'RUTAS': ('/api/',),
+    # Tras una escritura, el mismo cliente lee de la primaria durante estos segundos
+    'LECTURA_PROPIA': float(os.environ.get('REPLICA_LECTURA_PROPIA', 10)),
+}
+if len(DATABASES) > 1:
+    DATABASE_ROUTERS = ['mantenedores.replicas.ReplicaRouter']
+
+# --- Caché ---
+# CACHE_URL: redis://... (o rediss://), file:///ruta/al/directorio; sin valor usa memoria local.
+CACHE_URL = os.environ.get('CACHE_URL', '')
+# Redis es común a todos los procesos; los archivos, a los workers de una misma máquina
+CACHE_COMPARTIDA = CACHE_URL.startswith(('redis://', 'rediss://', 'file://'))
+
+
+def configurar_cache(alias, max_entradas):
+    """
+    Alias de caché sobre CACHE_URL. Cada alias tiene su espacio de claves
+    (prefijo en Redis, subdirectorio o memoria propia) para que las
+    respuestas de la API no desalojen contadores ni otros datos. En memoria
+    y en archivos Django descarta entradas al pasar `max_entradas` (None:
+    nunca, solo vencen por su TTL).
+    """
+    max_entradas = sys.maxsize if max_entradas is None else max_entradas
+    if CACHE_URL.startswith(('redis://', 'rediss://')):
+        return {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+            'KEY_PREFIX': '' if alias == 'default' else alias,
+        }
+    if CACHE_URL.startswith('file://'):
+        directorio = CACHE_URL[len('file://'):]
+        return {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': directorio if alias == 'default' else os.path.join(directorio, alias),
+            'OPTIONS': {'MAX_ENTRIES': max_entradas},
+        }
+    return {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'superlocaliza' if alias == 'default' else f'superlocaliza-{alias}',
+        'OPTIONS': {'MAX_ENTRIES': max_entradas},
+    }
+
+
+CACHES = {
+    # Límites de login (throttles), lectura propia tras escribir (réplicas)
+    'default': configurar_cache('default', 10000),
+    # Respuestas de la API (cache_api.py): pocas, pero pueden pesar varios MB
+    'api': configurar_cache('api', int(os.environ.get('API_CACHE_MAX_ENTRADAS', 500))),
+    # Tokens de clientes revocados (authentication.py): descartar una entrada
+    # volvería a aceptar el token, así que no tiene límite. En Redis conviene
+    # maxmemory-policy noeviction.
+    'revocaciones': configurar_cache('revocaciones', None),
+}
+
+# Segundos que una respuesta de la API permanece en caché (las claves ya
+# cambian con cada versión del modelo, así que esto solo limita la memoria).
+API_CACHE_TIMEOUT = int(os.environ.get('API_CACHE_TIMEOUT', 3600))
+
 # --- Validación de contraseñas ---
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -100,6 +221,59 @@ AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator'},
 ]
 
+# --- Hash de contraseñas ---
+# PASSWORD_HASHER elige el algoritmo de los hashes nuevos (argon2 | bcrypt | pbkdf2).
+# Los demás quedan para verificar hashes antiguos, que se regeneran solos al
+# iniciar sesión, igual que cuando cambia alguno de los costos.
+PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', 'pbkdf2')
+_PASSWORD_HASHERS = {
+    'argon2': 'mantenedores.hashers.Argon2Configurable',
+    'bcrypt': 'mantenedores.hashers.BCryptConfigurable',
+    'pbkdf2': 'mantenedores.hashers.PBKDF2Configurable',
+}
+PASSWORD_HASHERS = [_PASSWORD_HASHERS[PASSWORD_HASHER]] + [
+    hasher for nombre, hasher in _PASSWORD_HASHERS.items() if nombre != PASSWORD_HASHER
+]
+
+def _entero_env(nombre):
+    valor = os.environ.get(nombre)
+    return int(valor) if valor else None
+
+# Costos (None = valor por defecto de Django)
+PBKDF2_ITERACIONES = _entero_env('PBKDF2_ITERACIONES')
+BCRYPT_ROUNDS = _entero_env('BCRYPT_ROUNDS')
+ARGON2_TIME_COST = _entero_env('ARGON2_TIME_COST')
+ARGON2_MEMORY_COST = _entero_env('ARGON2_MEMORY_COST')
+ARGON2_PARALLELISM = _entero_env('ARGON2_PARALLELISM')
+
+# Pool acotado para los hashes de login/registro (ver mantenedores/hashing.py)
+HASH_POOL = {
+    'HILOS': int(os.environ.get('HASH_POOL_HILOS', os.cpu_count() or 1)),  # 0 = en el hilo de la petición
+    'COLA': int(os.environ.get('HASH_POOL_COLA', 32)),
+    'ESPERA': float(os.environ.get('HASH_POOL_ESPERA', 5)),
+}
+
+# --- Instrumentación (ver mantenedores/instrumentacion.py) ---
+# Consultas SQL, tiempo de BD y de serialización por petición. ESTRICTA hace
+# fallar la petición cuando una vista supera su presupuesto (pensado para tests).
+INSTRUMENTACION = {
+    'ACTIVA': os.environ.get('INSTRUMENTACION', '1') == '1',
+    'HEADERS': os.environ.get('INSTRUMENTACION_HEADERS', '1' if DEBUG else '0') == '1',
+    'ESTRICTA': os.environ.get('INSTRUMENTACION_ESTRICTA', '0') == '1',
+}
+
+# Lecturas async del catálogo (mantenedores/vistas_async.py): peticiones que
+# pueden estar consultando la BD a la vez por proceso. El resto espera en el
+# event loop sin ocupar un hilo ni una conexión.
+LECTURA_ASYNC_CONCURRENCIA_BD = int(os.environ.get('LECTURA_ASYNC_CONCURRENCIA_BD', 20))
+# Bajo ASGI /api/lectura/ se atiende solo con estos middlewares (ver crud/asgi.py):
+# los basados en MiddlewareMixin cuestan un cambio de hilo cada uno y esas
+# lecturas no usan sesión, CSRF ni mensajes.
+MIDDLEWARE_LECTURA_ASYNC = [
+    'mantenedores.instrumentacion.InstrumentacionMiddleware',
+    'mantenedores.replicas.ReplicaMiddleware',
+]
+
 LOGIN_REDIRECT_URL = 'dashboard'
 LOGIN_URL = 'login'
 LOGOUT_REDIRECT_URL = 'login'
@@ -110,9 +284,37 @@ REST_FRAMEWORK = {
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
-    )
+    ),
+    # Paginación opcional: ?page=/?page_size= o ?paginacion=cursor (ver mantenedores/pagination.py)
+    'DEFAULT_PAGINATION_CLASS': 'mantenedores.pagination.MantenedoresPagination',
+    # Límites del login de clientes (ver mantenedores/throttles.py)
+    'DEFAULT_THROTTLE_RATES': {
+        'login_ip': os.environ.get('LOGIN_RATE_IP', '20/min'),
+        # Solo credenciales incorrectas, por usuario e IP
+        'login_usuario': os.environ.get('LOGIN_RATE_USUARIO', '5/min'),
+    },
+    # Proxies delante de Django (Render agrega uno): la IP real es la del X-Forwarded-For
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 1 if IS_PRODUCTION else 0)),
 }
 
+# Sincronización incremental de la app (/api/productos/changes/): días que se
+# conservan los tombstones de Eliminacion (los borra `purgar_eliminaciones`).
+# Un `since` más antiguo recibe el catálogo completo.
+SINCRONIZACION = {
+    'RETENCION_ELIMINACIONES_DIAS': int(os.environ.get('RETENCION_ELIMINACIONES_DIAS', 30)),
+}
+
+# Autenticación de Clientes (app móvil): 'stateless' valida el access token
+# con sus claims y la caché 'revocaciones'; 'db' consulta la tabla. Con una
+# caché en memoria cada worker vería solo sus propias revocaciones, así que
+# 'stateless' exige CACHE_URL compartida y sin ella el modo por defecto es 'db'.
+CLIENTE_JWT_MODO = os.environ.get('CLIENTE_JWT_MODO', 'stateless' if CACHE_COMPARTIDA else 'db')
+if CLIENTE_JWT_MODO == 'stateless' and not CACHE_COMPARTIDA:
+    raise ImproperlyConfigured(
+        "CLIENTE_JWT_MODO='stateless' requiere CACHE_URL con Redis o archivos: "
+        "en memoria local una revocación no llega a los demás workers."
+    )
+
 LANGUAGE_CODE = 'es'
 TIME_ZONE = 'UTC'
 USE_I18N = True
@@ -147,5 +349,63 @@ cloudinary.config(
     secure=True
 )
 
+# --- Imágenes de productos ---
+# Derivadas WebP/AVIF por ancho (ver mantenedores/imagenes.py). Con Cloudinary
+# son transformaciones de la URL del original; con 'local' se generan con
+# Pillow al subir la imagen y se guardan en el almacenamiento de archivos.
+IMAGENES = {
+    'ANCHOS': (160, 320, 640, 1024),
+    'FORMATOS': ('avif', 'webp'),
+    'CALIDAD': int(os.environ.get('IMAGENES_CALIDAD', 70)),
+    'ALMACEN': os.environ.get('IMAGENES_ALMACEN') or ('cloudinary' if CLOUDINARY_STORAGE['CLOUD_NAME'] else 'local'),
+}
+
+# --- Sucursales cercanas (mantenedores/cercania.py) ---
+CERCANIA = {
+    # 'grilla': índice geohash en memoria (sin dependencias); 'postgis': KNN en
+    # PostgreSQL, requiere la extensión postgis antes de la migración 0016
+    'MOTOR': os.environ.get('CERCANIA_MOTOR', 'grilla'),
+    # Caracteres de geohash de cada celda de la grilla (5 = celdas de ~5 km)
+    'PRECISION': 5,
+    # Con un filtro de producto que deja hasta tantas sucursales se miden todas
+    'MAXIMO_DIRECTO': 256,
+}
+
+# --- Tareas en segundo plano ---
+# Cola en la base de datos (mantenedores/cola.py), atendida por
+# `python manage.py procesar_tareas` (en Render, un Background Worker).
+TAREAS = {
+    # Ejecuta cada tarea al confirmar la transacción que la encoló, en el
+    # mismo proceso: para desarrollo sin trabajador (activo por defecto con DEBUG)
+    'SINCRONAS': os.environ.get('TAREAS_SINCRONAS', '1' if DEBUG else '0') == '1',
+    # concurrencia: tareas de la cola en curso a la vez (entre todos los trabajadores)
+    # visibilidad: segundos tras los que una tarea sin terminar vuelve a la cola
+    'COLAS': {
+        'default': {'concurrencia': 2, 'visibilidad': 300},
+        'imagenes': {'concurrencia': 4, 'visibilidad': 120},
+        'importaciones': {'concurrencia': 1, 'visibilidad': 1800},
+    },
+    # Espera antes del primer reintento (s); se duplica en cada intento
+    'REINTENTO_BASE': 10,
+    # Días que se conservan las tareas terminadas (completadas o fallidas)
+    'RETENCION_DIAS': 7,
+}
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
-logging.basicConfig(level=logging.ERROR)
\ No newline at end of file
+logging.basicConfig(level=logging.ERROR)
+
+# Línea JSON por petición de la instrumentación (WARNING = solo presupuestos excedidos)
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'consola': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'mantenedores.instrumentacion': {
+            'handlers': ['consola'],
+            'level': os.environ.get('INSTRUMENTACION_LOG_NIVEL', 'INFO' if DEBUG else 'WARNING'),
+            'propagate': False,
+        },
+    },
+}
\ No newline at end of file
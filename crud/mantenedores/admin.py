@@ -8,3 +8,6 @@ admin.site.register(Producto)
 admin.site.register(Cliente)
 admin.site.register(Sucursal)
 admin.site.register(Usuario)
+admin.site.register(UbicacionProducto)
+admin.site.register(NodoPasillo)
+admin.site.register(ConexionPasillo)
@@ -1,6 +1,7 @@
 from rest_framework.routers import DefaultRouter
 from django.urls import path, include
 from .views import * # Importa todas tus vistas
+from . import vistas_async
 
 # Router para los endpoints de datos (productos, clientes, etc.)
 router = DefaultRouter()
@@ -12,6 +13,8 @@ router.register(r'sucursales', SucursalViewSet)
 router.register(r'categorias', CategoriaViewSet)
 router.register(r'estanterias', EstanteriaViewSet)
 router.register(r'pasillos', PasilloViewSet)
+router.register(r'ubicaciones', UbicacionProductoViewSet)
+router.register(r'tareas', TareaViewSet)
 
 # URL Patterns
 urlpatterns = [
@@ -19,6 +22,14 @@ urlpatterns = [
     path('clientes/token/', ClienteTokenObtainPairView.as_view(), name='cliente_token_obtain_pair'),
     path('clientes/token/refresh/', ClienteTokenRefreshView.as_view(), name='cliente_token_refresh'),
 
+    # --- Lecturas async del catálogo (para uvicorn, ver crud/asgi.py) ---
+    path('lectura/productos/', vistas_async.ProductosLectura.as_view(), name='lectura_productos'),
+    path('lectura/productos/<int:pk>/', vistas_async.ProductosLectura.as_view(), name='lectura_producto'),
+    path('lectura/categorias/', vistas_async.CategoriasLectura.as_view(), name='lectura_categorias'),
+    path('lectura/categorias/<int:pk>/', vistas_async.CategoriasLectura.as_view(), name='lectura_categoria'),
+    path('lectura/promociones/', vistas_async.PromocionesLectura.as_view(), name='lectura_promociones'),
+    path('lectura/promociones/<int:pk>/', vistas_async.PromocionesLectura.as_view(), name='lectura_promocion'),
+
     # --- URLs para el resto de los datos de la API ---
     path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class MantenedoresConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'mantenedores'
+
+    def ready(self):
+        from . import instrumentacion, signals, tareas  # noqa: F401  (registra receivers y tareas)
@@ -1,11 +1,84 @@
 # mantenedores/authentication.py
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.functional import cached_property
 from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
 from .models import Cliente
 
-class ClienteJWTAuthentication(JWTAuthentication):
+# Claims que se agregan a los tokens de Cliente (ver ClienteTokenObtainPairSerializer)
+CLAIM_VERSION = 'tv'
+CLAIM_ACTIVO = 'activo'
+
+# Valor de versión usado para rechazar todos los tokens de un cliente eliminado
+VERSION_ELIMINADO = 2 ** 62
+
+
+def clave_estado_cliente(cliente_id):
+    return f"cliente_jwt:{cliente_id}"
+
+
+def cache_revocaciones():
+    """Alias 'revocaciones' de CACHES: compartido entre workers y sin descarte por tamaño."""
+    return caches['revocaciones']
+
+
+def publicar_estado_cliente(cliente_id, token_version, is_active):
+    """
+    Publica en la caché compartida la versión de token vigente de un cliente.
+    Solo hace falta conservarla mientras pueda existir un access token
+    anterior al cambio, es decir, durante ACCESS_TOKEN_LIFETIME.
+    """
+    ttl = int(api_settings.ACCESS_TOKEN_LIFETIME.total_seconds()) + 60
+    cache_revocaciones().set(clave_estado_cliente(cliente_id), (token_version, is_active), ttl)
+
+
+class ClienteTokenUser(TokenUser):
+    """
+    Usuario construido solo desde los claims del token (sin consultar la BD).
+    Si una vista necesita la fila completa puede usar `request.user.cliente`.
+    """
+    @cached_property
+    def cliente(self):
+        return Cliente.objects.get(id=self.id)
+
+
+class AutenticacionAsyncMixin:
+    """
+    `authenticate` para las vistas async (HttpRequest de Django). Validar el
+    token es solo CPU; el usuario se busca con `aget_user`, que por defecto
+    corre el `get_user` sync en un hilo.
+    """
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        return await sync_to_async(self.get_user)(validated_token)
+
+
+class UsuarioJWTAuthentication(AutenticacionAsyncMixin, JWTAuthentication):
+    """JWTAuthentication (usuarios del panel) usable desde las vistas async."""
+
+
+class ClienteJWTAuthentication(AutenticacionAsyncMixin, JWTAuthentication):
     """
     Clase de autenticación personalizada para validar tokens de 'Cliente'.
+
+    En modo 'stateless' (CLIENTE_JWT_MODO, por defecto si la caché es
+    compartida) los tokens que traen la versión de token se validan contra
+    una caché de clientes cambiados, sin consultar la tabla de clientes. Los tokens antiguos sin esos claims
+    (o el modo 'db') siguen buscando el cliente en la base de datos.
     """
     def get_user(self, validated_token):
         """
@@ -16,8 +89,50 @@ class ClienteJWTAuthentication(JWTAuthentication):
         except KeyError:
             return None # El token no tiene user_id, es inválido.
 
+        if self.sin_estado(validated_token):
+            return self.usuario_del_token(validated_token, cache_revocaciones().get(clave_estado_cliente(user_id)))
+
         try:
             # Busca el usuario por su ID en la tabla Cliente.
-            return Cliente.objects.get(id=user_id)
+            cliente = Cliente.objects.get(id=user_id)
         except Cliente.DoesNotExist:
-            return None # El usuario ya no existe.
\ No newline at end of file
+            return None # El usuario ya no existe.
+        return self.verificar_cliente(validated_token, cliente)
+
+    async def aget_user(self, validated_token):
+        # Sin cambiar de hilo: caché y ORM async
+        try:
+            user_id = validated_token['user_id']
+        except KeyError:
+            return None
+
+        if self.sin_estado(validated_token):
+            return self.usuario_del_token(validated_token, await cache_revocaciones().aget(clave_estado_cliente(user_id)))
+
+        try:
+            cliente = await Cliente.objects.aget(id=user_id)
+        except Cliente.DoesNotExist:
+            return None
+        return self.verificar_cliente(validated_token, cliente)
+
+    def sin_estado(self, validated_token):
+        return (
+            validated_token.get(CLAIM_VERSION) is not None
+            and getattr(settings, 'CLIENTE_JWT_MODO', 'db') == 'stateless'
+        )
+
+    def usuario_del_token(self, validated_token, estado):
+        """Modo stateless: `estado` es lo publicado por publicar_estado_cliente (o None)."""
+        if not validated_token.get(CLAIM_ACTIVO, True):
+            raise AuthenticationFailed("Cliente inactivo.", code='user_inactive')
+        if estado is not None:
+            version_vigente, activo = estado
+            if not activo or validated_token[CLAIM_VERSION] < version_vigente:
+                raise AuthenticationFailed("Token revocado.", code='token_revoked')
+        return ClienteTokenUser(validated_token)
+
+    def verificar_cliente(self, validated_token, cliente):
+        version = validated_token.get(CLAIM_VERSION)
+        if version is not None and version < cliente.token_version:
+            raise AuthenticationFailed("Token revocado.", code='token_revoked')
+        return cliente
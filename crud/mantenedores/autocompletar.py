@@ -0,0 +1,187 @@
+# mantenedores/autocompletar.py
+
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+
+from .models import Estanteria, Pasillo, Producto, VersionModelo
+
+
+def normalizar(texto):
+    """Minúsculas, sin acentos y con espacios simples: 'Café  Molido' -> 'cafe molido'."""
+    descompuesto = unicodedata.normalize('NFKD', texto or '')
+    sin_acentos = ''.join(c for c in descompuesto if not unicodedata.combining(c))
+    return ' '.join(sin_acentos.lower().split())
+
+
+def claves(nombre):
+    """
+    Claves de un nombre: el nombre completo y el resto del nombre desde cada
+    palabra, para que 'leche' también encuentre 'Yogur de leche'.
+    """
+    palabras = normalizar(nombre).split(' ')
+    return [' '.join(palabras[i:]) for i in range(len(palabras)) if palabras[i]]
+
+
+class IndiceAutocompletar:
+    """
+    Índice de prefijos en memoria sobre `Producto.nombre`.
+
+    Se mantiene como listas ordenadas de (clave, id) recorridas con bisect.
+    Se construye en la primera consulta, se actualiza con las señales de
+    Producto/Pasillo/Estanteria del propio proceso y, para enterarse de los
+    cambios hechos en otros workers, compara cada `REVISION_SEGUNDOS` los
+    contadores de VersionModelo y se reconstruye si cambiaron.
+    """
+    REVISION_SEGUNDOS = 30
+    MODELOS = ('producto', 'pasillo', 'estanteria')
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.construido = False
+        self.revisado = 0.0
+        self.versiones = {}
+        self.principales = []   # (nombre completo normalizado, id)
+        self.palabras = []      # (resto del nombre desde la 2ª palabra en adelante, id)
+        self.productos = {}     # id -> (nombre, pasillo_id, estanteria_id)
+        self.pasillos = {}
+        self.estanterias = {}
+
+    # --- Construcción ---
+
+    def leer_versiones(self):
+        return dict(VersionModelo.objects.filter(modelo__in=self.MODELOS).values_list('modelo', 'version'))
+
+    def construir(self):
+        versiones = self.leer_versiones()
+        productos = {
+            pk: (nombre, pasillo_id, estanteria_id)
+            for pk, nombre, pasillo_id, estanteria_id in
+            Producto.objects.values_list('id', 'nombre', 'pasillo_id', 'estanteria_id').iterator()
+        }
+        principales, palabras = [], []
+        for pk, (nombre, _, _) in productos.items():
+            lista = claves(nombre)
+            if lista:
+                principales.append((lista[0], pk))
+                palabras.extend((clave, pk) for clave in lista[1:])
+        principales.sort()
+        palabras.sort()
+
+        with self.lock:
+            self.productos = productos
+            self.principales = principales
+            self.palabras = palabras
+            self.pasillos = dict(Pasillo.objects.values_list('id', 'nombre'))
+            self.estanterias = dict(Estanteria.objects.values_list('id', 'nombre'))
+            self.versiones = versiones
+            self.revisado = time.monotonic()
+            self.construido = True
+
+    def asegurar(self):
+        if not self.construido:
+            with self.lock:
+                if not self.construido:
+                    self.construir()
+            return
+        if time.monotonic() - self.revisado >= self.REVISION_SEGUNDOS:
+            self.revisado = time.monotonic()
+            if self.leer_versiones() != self.versiones:
+                self.construir()
+
+    # --- Actualización incremental (señales) ---
+
+    def aplicado(self, modelo):
+        """
+        Registra un cambio local ya aplicado al índice. Su señal también
+        incrementó en 1 la versión del modelo en la base, así que se avanza la
+        versión conocida y asegurar() no reconstruye por un cambio propio; si
+        otro worker cambió algo, la base queda por delante y se reconstruye.
+        """
+        self.versiones[modelo] = self.versiones.get(modelo, 0) + 1
+
+    def sacar_producto(self, pk):
+        anterior = self.productos.pop(pk, None)
+        if anterior is None:
+            return
+        lista = claves(anterior[0])
+        if lista:
+            self.quitar(self.principales, (lista[0], pk))
+            for clave in lista[1:]:
+                self.quitar(self.palabras, (clave, pk))
+
+    def quitar_producto(self, pk):
+        with self.lock:
+            if not self.construido:
+                return
+            self.sacar_producto(pk)
+            self.aplicado('producto')
+
+    def guardar_producto(self, producto):
+        with self.lock:
+            if not self.construido:
+                return
+            self.sacar_producto(producto.pk)
+            self.productos[producto.pk] = (producto.nombre, producto.pasillo_id, producto.estanteria_id)
+            lista = claves(producto.nombre)
+            if lista:
+                insort(self.principales, (lista[0], producto.pk))
+                for clave in lista[1:]:
+                    insort(self.palabras, (clave, producto.pk))
+            self.aplicado('producto')
+
+    def guardar_ubicacion(self, instancia, eliminada=False):
+        with self.lock:
+            if not self.construido:
+                return
+            destino = self.pasillos if isinstance(instancia, Pasillo) else self.estanterias
+            if eliminada:
+                destino.pop(instancia.pk, None)
+            else:
+                destino[instancia.pk] = instancia.nombre
+            self.aplicado(instancia._meta.model_name)
+
+    @staticmethod
+    def quitar(lista, entrada):
+        i = bisect_left(lista, entrada)
+        if i < len(lista) and lista[i] == entrada:
+            del lista[i]
+
+    # --- Consulta ---
+
+    def buscar(self, texto, k=10):
+        """Hasta `k` productos cuyo nombre (o alguna palabra del nombre) empieza con `texto`."""
+        prefijo = normalizar(texto)
+        if not prefijo:
+            return []
+        self.asegurar()
+
+        with self.lock:
+            encontrados = []
+            vistos = set()
+            # Primero coincidencias al inicio del nombre, luego en palabras interiores
+            for lista in (self.principales, self.palabras):
+                i = bisect_left(lista, (prefijo,))
+                while i < len(lista) and len(encontrados) < k:
+                    clave, pk = lista[i]
+                    if not clave.startswith(prefijo):
+                        break
+                    if pk not in vistos:
+                        vistos.add(pk)
+                        encontrados.append(pk)
+                    i += 1
+
+            resultado = []
+            for pk in encontrados:
+                nombre, pasillo_id, estanteria_id = self.productos[pk]
+                resultado.append({
+                    'id': pk,
+                    'nombre': nombre,
+                    'pasillo': self.pasillos.get(pasillo_id),
+                    'estante': self.estanterias.get(estanteria_id),
+                })
+            return resultado
+
+
+indice_autocompletar = IndiceAutocompletar()
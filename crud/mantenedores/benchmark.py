@@ -0,0 +1,623 @@
+# mantenedores/benchmark.py
+
+import asyncio
+import http.cookiejar
+import json
+import os
+import platform
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+import urllib.request
+from datetime import timedelta
+from decimal import Decimal
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher, make_password
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import (
+    Categoria, Cliente, Estanteria, Pasillo, PrecioEfectivo, Producto, Promocion, Sucursal, UbicacionProducto,
+    Usuario,
+)
+from .estadisticas import reconciliar
+from .precios import recalcular_precios
+from .versiones import incrementar_version
+
+# Todo lo generado lleva estos prefijos para poder borrarlo sin tocar datos reales
+PREFIJO_CODIGO = 'BENCH-'
+PREFIJO_NOMBRE = 'Bench '
+PREFIJO_USUARIO = 'bench.'
+CLIENTE_BENCH = 'bench.cliente'
+ADMIN_BENCH = 'bench.admin'
+PASSWORD_BENCH = 'benchmark-superlocaliza'
+
+
+# --- Generación de datos ---
+
+def borrar_sin_senales(queryset):
+    """
+    DELETE directo en SQL: el delete() del ORM enviaría una señal por fila
+    (lápidas, versiones, revocación de tokens) y tardaría horas con 1M de filas.
+    """
+    modelo = queryset.model
+    sql, params = queryset.values('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {modelo._meta.db_table} WHERE {modelo._meta.pk.column} IN ({sql})', params
+        )
+        return cursor.rowcount
+
+
+class GeneradorDatos:
+    """
+    Carga un volumen grande y reproducible (semilla fija) de datos de prueba
+    con bulk_create por lotes. Las promociones de cada producto son ventanas
+    consecutivas que no se solapan, repartidas alrededor de hoy para que haya
+    promociones vencidas, vigentes y futuras.
+    """
+    def __init__(self, lote=5000, semilla=42, salida=None):
+        self.lote = lote
+        self.azar = random.Random(semilla)
+        self.salida = salida or (lambda mensaje: None)
+
+    def existen(self):
+        return Producto.objects.filter(codigo__startswith=PREFIJO_CODIGO).exists()
+
+    def limpiar(self):
+        productos = Producto.objects.filter(codigo__startswith=PREFIJO_CODIGO)
+        sucursales = Sucursal.objects.filter(nombre__startswith=PREFIJO_NOMBRE)
+        with transaction.atomic():
+            borrar_sin_senales(PrecioEfectivo.objects.filter(producto__in=productos))
+            borrar_sin_senales(Promocion.objects.filter(producto__in=productos))
+            borrar_sin_senales(UbicacionProducto.objects.filter(Q(producto__in=productos) | Q(sucursal__in=sucursales)))
+            borrar_sin_senales(productos)
+            borrar_sin_senales(Cliente.objects.filter(username__startswith=PREFIJO_USUARIO))
+            borrar_sin_senales(Usuario.objects.filter(username__startswith=PREFIJO_USUARIO))
+            for modelo in (Sucursal, Categoria, Pasillo, Estanteria):
+                borrar_sin_senales(modelo.objects.filter(nombre__startswith=PREFIJO_NOMBRE))
+        self.versionar()
+
+    def en_lotes(self, modelo, objetos, total, etiqueta):
+        pendientes, creados = [], 0
+        for objeto in objetos:
+            pendientes.append(objeto)
+            if len(pendientes) >= self.lote:
+                with transaction.atomic():
+                    modelo.objects.bulk_create(pendientes)
+                creados += len(pendientes)
+                pendientes = []
+                self.salida(f"{etiqueta}: {creados}/{total}")
+        if pendientes:
+            with transaction.atomic():
+                modelo.objects.bulk_create(pendientes)
+            creados += len(pendientes)
+        self.salida(f"{etiqueta}: {creados}/{total}")
+        return creados
+
+    def catalogo(self, modelo, cantidad):
+        modelo.objects.bulk_create([modelo(nombre=f"{PREFIJO_NOMBRE}{modelo.__name__} {i}") for i in range(cantidad)])
+        return list(modelo.objects.filter(nombre__startswith=PREFIJO_NOMBRE).values_list('id', flat=True))
+
+    def generar(self, productos=100_000, promociones=1_000_000, clientes=200_000, sucursales=20):
+        categorias = self.catalogo(Categoria, 50)
+        pasillos = self.catalogo(Pasillo, 30)
+        estanterias = self.catalogo(Estanteria, 10)
+        Sucursal.objects.bulk_create([
+            Sucursal(nombre=f"{PREFIJO_NOMBRE}Sucursal {i}", direccion=f"Calle {i} #{100 + i}")
+            for i in range(sucursales)
+        ])
+        ids_sucursales = list(Sucursal.objects.filter(nombre__startswith=PREFIJO_NOMBRE).values_list('id', flat=True))
+
+        azar = self.azar
+        self.en_lotes(Producto, (
+            Producto(
+                codigo=f"{PREFIJO_CODIGO}{i:07d}",
+                nombre=f"{azar.choice(PALABRAS)} {azar.choice(PALABRAS)} {i}",
+                descripcion=None,
+                categoria_id=azar.choice(categorias),
+                pasillo_id=azar.choice(pasillos),
+                estanteria_id=azar.choice(estanterias),
+                precio=Decimal(azar.randint(300, 50_000)),
+            ) for i in range(productos)
+        ), productos, 'Productos')
+
+        self.en_lotes(Promocion, self.promociones(productos, promociones), promociones, 'Promociones')
+
+        # Un único hash compartido: calcular 200k hashes tomaría horas y no es lo que se mide
+        hash_compartido = make_password(PASSWORD_BENCH)
+        self.en_lotes(Cliente, (
+            Cliente(
+                username=f"{PREFIJO_USUARIO}{i:07d}",
+                nombre=azar.choice(NOMBRES),
+                apellido=azar.choice(APELLIDOS),
+                email=f"{PREFIJO_USUARIO}{i:07d}@example.com",
+                password=hash_compartido,
+            ) for i in range(clientes)
+        ), clientes, 'Clientes')
+
+        # Cuentas fijas que usa el runner (login de la app y dashboard)
+        Cliente.objects.create_user(
+            username=CLIENTE_BENCH, email='bench.cliente@example.com', password=PASSWORD_BENCH,
+            nombre='Bench', apellido='Cliente',
+        )
+        Usuario.objects.bulk_create([
+            Usuario(
+                username=f"{PREFIJO_USUARIO}staff{i}", rol='staff', sucursal_id=sucursal_id,
+                password=hash_compartido, is_staff=True,
+            ) for i, sucursal_id in enumerate(ids_sucursales)
+        ])
+        admin = Usuario(username=ADMIN_BENCH, rol='admin', sucursal_id=ids_sucursales[0] if ids_sucursales else None,
+                        is_staff=True)
+        admin.set_password(PASSWORD_BENCH)
+        admin.save()
+
+        self.salida("Precios efectivos...")
+        recalcular_precios()
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        self.versionar()
+
+    def promociones(self, productos, total):
+        """Ventanas sin solape por producto, centradas en hoy."""
+        por_producto = max(1, -(-total // max(productos, 1)))
+        ventana = 14
+        hoy = timezone.localdate()
+        inicio_base = hoy - timedelta(days=ventana * (por_producto // 2))
+        ids = list(Producto.objects.filter(codigo__startswith=PREFIJO_CODIGO).order_by('id').values_list('id', flat=True))
+        creadas = 0
+        for producto_id in ids:
+            for j in range(por_producto):
+                if creadas >= total:
+                    return
+                inicio = inicio_base + timedelta(days=ventana * j + self.azar.randint(0, 3))
+                yield Promocion(
+                    nombre=f"{PREFIJO_NOMBRE}Promo {creadas}",
+                    producto_id=producto_id,
+                    descuento=Decimal(self.azar.choice((5, 10, 15, 20, 25, 30, 40, 50))),
+                    fecha_inicio=inicio,
+                    fecha_fin=inicio + timedelta(days=self.azar.randint(0, ventana - 5)),
+                )
+                creadas += 1
+
+    @staticmethod
+    def versionar():
+        # bulk_create no emite señales: invalidar cachés, ETags e índices a mano
+        for modelo in (Producto, Promocion, PrecioEfectivo, Cliente, Sucursal, Categoria, Pasillo, Estanteria):
+            incrementar_version(modelo)
+        reconciliar()
+
+
+PALABRAS = [
+    'Leche', 'Pan', 'Arroz', 'Aceite', 'Café', 'Té', 'Azúcar', 'Harina', 'Queso', 'Yogur',
+    'Jugo', 'Galletas', 'Fideos', 'Atún', 'Pollo', 'Detergente', 'Shampoo', 'Jabón', 'Agua', 'Cereal',
+    'Mantequilla', 'Huevos', 'Tomate', 'Manzana', 'Plátano', 'Chocolate', 'Vino', 'Cerveza', 'Sal', 'Avena',
+]
+NOMBRES = ['Ana', 'Juan', 'María', 'Pedro', 'Camila', 'Diego', 'Valentina', 'Matías', 'Sofía', 'Benjamín']
+APELLIDOS = ['González', 'Muñoz', 'Rojas', 'Díaz', 'Pérez', 'Soto', 'Contreras', 'Silva', 'Martínez', 'Sepúlveda']
+
+
+# --- Ejecución ---
+
+def percentil(ordenados, p):
+    if not ordenados:
+        return None
+    indice = min(len(ordenados) - 1, max(0, round(p / 100 * len(ordenados)) - 1))
+    return ordenados[indice]
+
+
+class TransporteLocal:
+    """Peticiones en el mismo proceso con el Client de Django (sin red ni servidor)."""
+    def __init__(self):
+        from django.test import Client
+        self.cliente = Client()
+
+    def pedir(self, metodo, ruta, datos=None, token=None):
+        extra = {'HTTP_AUTHORIZATION': f'Bearer {token}'} if token else {}
+        if metodo == 'POST':
+            respuesta = self.cliente.post(ruta, datos, content_type='application/json', **extra)
+        else:
+            respuesta = self.cliente.get(ruta, **extra)
+        return respuesta.status_code, respuesta.content
+
+    def iniciar_sesion(self, username, password):
+        self.cliente.force_login(Usuario.objects.get(username=username))
+
+    def cerrar(self):
+        connection.close()
+
+
+class TransporteHTTP:
+    """Peticiones contra un servidor en marcha (runserver, gunicorn, uvicorn...)."""
+    def __init__(self, base):
+        self.base = base.rstrip('/')
+        self.cookies = http.cookiejar.CookieJar()
+        self.abridor = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies))
+
+    def pedir(self, metodo, ruta, datos=None, token=None, formulario=False):
+        cabeceras = {'Authorization': f'Bearer {token}'} if token else {}
+        cuerpo = None
+        if datos is not None:
+            if formulario:
+                cuerpo = urllib.parse.urlencode(datos).encode()
+                cabeceras['Content-Type'] = 'application/x-www-form-urlencoded'
+                cabeceras['Referer'] = self.base + ruta
+            else:
+                cuerpo = json.dumps(datos).encode()
+                cabeceras['Content-Type'] = 'application/json'
+        peticion = urllib.request.Request(self.base + ruta, data=cuerpo, headers=cabeceras, method=metodo)
+        try:
+            with self.abridor.open(peticion, timeout=60) as respuesta:
+                return respuesta.status, respuesta.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+    def iniciar_sesion(self, username, password):
+        self.pedir('GET', '/login/')
+        csrf = next((c.value for c in self.cookies if c.name == 'csrftoken'), '')
+        self.pedir('POST', '/login/', {
+            'username': username, 'password': password, 'csrfmiddlewaretoken': csrf,
+        }, formulario=True)
+
+    def cerrar(self):
+        pass
+
+
+class RunnerBenchmark:
+    """
+    Ejecuta cada escenario `peticiones` veces repartidas en `concurrencia`
+    hilos (cada hilo con su propio transporte) y resume latencias y
+    throughput. Los escenarios devuelven (código HTTP, cuerpo).
+    """
+    ESCENARIOS = ('productos', 'promociones', 'token', 'token_refresh', 'dashboard')
+
+    def __init__(self, url=None, concurrencia=1, peticiones=200, calentamiento=10, paginas=100, semilla=42):
+        self.url = url
+        self.concurrencia = concurrencia
+        self.peticiones = peticiones
+        self.calentamiento = calentamiento
+        self.paginas = paginas
+        self.semilla = semilla
+        self.tokens = None
+
+    def transporte(self):
+        return TransporteHTTP(self.url) if self.url else TransporteLocal()
+
+    def preparar(self):
+        estado, cuerpo = self.transporte().pedir('POST', '/api/clientes/token/', {
+            'username': CLIENTE_BENCH, 'password': PASSWORD_BENCH,
+        })
+        if estado != 200:
+            raise RuntimeError(f"No se pudo obtener el token de {CLIENTE_BENCH} ({estado}): {cuerpo[:200]!r}")
+        self.tokens = json.loads(cuerpo)
+
+    def escenario(self, nombre, transporte, azar):
+        if nombre == 'productos':
+            pagina = azar.randint(1, self.paginas)
+            return lambda: transporte.pedir('GET', f'/api/productos/?page={pagina}&page_size=50', token=self.tokens['access'])
+        if nombre == 'promociones':
+            pagina = azar.randint(1, self.paginas)
+            return lambda: transporte.pedir('GET', f'/api/promociones/?page={pagina}&page_size=50', token=self.tokens['access'])
+        if nombre == 'token':
+            return lambda: transporte.pedir('POST', '/api/clientes/token/', {
+                'username': CLIENTE_BENCH, 'password': PASSWORD_BENCH,
+            })
+        if nombre == 'token_refresh':
+            return lambda: transporte.pedir('POST', '/api/clientes/token/refresh/', {'refresh': self.tokens['refresh']})
+        if nombre == 'dashboard':
+            return lambda: transporte.pedir('GET', '/')
+        raise ValueError(f"Escenario desconocido: {nombre}")
+
+    def ejecutar(self, nombre):
+        latencias, errores = [], []
+        lock = threading.Lock()
+        por_hilo = [self.peticiones // self.concurrencia + (1 if i < self.peticiones % self.concurrencia else 0)
+                    for i in range(self.concurrencia)]
+
+        def trabajar(indice, cantidad):
+            transporte = self.transporte()
+            azar = random.Random(self.semilla + indice)
+            try:
+                if nombre == 'dashboard':
+                    transporte.iniciar_sesion(ADMIN_BENCH, PASSWORD_BENCH)
+                for _ in range(self.calentamiento):
+                    self.escenario(nombre, transporte, azar)()
+                barrera.wait()
+                propias, fallidas = [], []
+                for _ in range(cantidad):
+                    peticion = self.escenario(nombre, transporte, azar)
+                    inicio = time.perf_counter()
+                    estado, _ = peticion()
+                    propias.append(time.perf_counter() - inicio)
+                    if estado >= 400:
+                        fallidas.append(estado)
+                with lock:
+                    latencias.extend(propias)
+                    errores.extend(fallidas)
+            except threading.BrokenBarrierError:
+                pass  # otro hilo falló antes de empezar
+            except Exception as e:
+                # Rompe la barrera para que el hilo principal y los demás no esperen para siempre
+                with lock:
+                    excepciones.append(f"hilo {indice}: {e!r}")
+                barrera.abort()
+            finally:
+                transporte.cerrar()
+
+        excepciones = []
+        barrera = threading.Barrier(self.concurrencia + 1)
+        hilos = [threading.Thread(target=trabajar, args=(i, n)) for i, n in enumerate(por_hilo)]
+        for hilo in hilos:
+            hilo.start()
+        try:
+            barrera.wait()
+        except threading.BrokenBarrierError:
+            pass
+        inicio = time.perf_counter()
+        for hilo in hilos:
+            hilo.join()
+        duracion = time.perf_counter() - inicio
+        if excepciones:
+            raise RuntimeError(f"Escenario {nombre}: " + "; ".join(excepciones))
+
+        ordenadas = sorted(latencias)
+        return {
+            'peticiones': len(latencias),
+            'errores': len(errores),
+            'codigos_error': sorted(set(errores)),
+            'p50_ms': round(percentil(ordenadas, 50) * 1000, 2) if ordenadas else None,
+            'p95_ms': round(percentil(ordenadas, 95) * 1000, 2) if ordenadas else None,
+            'p99_ms': round(percentil(ordenadas, 99) * 1000, 2) if ordenadas else None,
+            'media_ms': round(statistics.fmean(ordenadas) * 1000, 2) if ordenadas else None,
+            'rps': round(len(latencias) / duracion, 2) if duracion else None,
+        }
+
+    def entorno(self):
+        return {
+            'fecha': timezone.now().isoformat(),
+            'transporte': self.url or 'local',
+            'bd': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'hasher': get_hasher('default').algorithm,
+            'concurrencia': self.concurrencia,
+            'peticiones': self.peticiones,
+            'cache': settings.CACHES['api']['BACKEND'],
+            'datos': {
+                'productos': Producto.objects.count(),
+                'promociones': Promocion.objects.count(),
+                'clientes': Cliente.objects.count(),
+                'sucursales': Sucursal.objects.count(),
+            } if not self.url else None,
+        }
+
+
+def comparar(actual, base, tolerancia):
+    """
+    Regresiones de `actual` respecto a `base`: p95 más lento o throughput
+    más bajo que la tolerancia relativa. Devuelve una lista de mensajes.
+    """
+    regresiones = []
+    for nombre, datos in actual['escenarios'].items():
+        anterior = base.get('escenarios', {}).get(nombre)
+        if not anterior:
+            continue
+        if anterior.get('p95_ms') and datos.get('p95_ms') and datos['p95_ms'] > anterior['p95_ms'] * (1 + tolerancia):
+            regresiones.append(f"{nombre}: p95 {anterior['p95_ms']} ms -> {datos['p95_ms']} ms")
+        if anterior.get('rps') and datos.get('rps') and datos['rps'] < anterior['rps'] * (1 - tolerancia):
+            regresiones.append(f"{nombre}: {anterior['rps']} -> {datos['rps']} peticiones/s")
+    return regresiones
+
+
+class ServidorLocal:
+    """
+    Levanta el proyecto en un puerto local con un solo proceso, para comparar
+    servidores con la misma huella (un worker):
+
+    - 'wsgi': gunicorn con worker gthread (`hilos` hilos),
+    - 'asgi': uvicorn (event loop; las vistas sync corren en hilos).
+    """
+    TIPOS = ('wsgi', 'asgi')
+
+    def __init__(self, tipo, puerto, hilos=32):
+        self.tipo = tipo
+        self.puerto = puerto
+        self.hilos = hilos
+        self.proceso = None
+
+    def comando(self):
+        if self.tipo == 'wsgi':
+            return [
+                sys.executable, '-m', 'gunicorn', 'crud.wsgi:application',
+                '--bind', f'127.0.0.1:{self.puerto}', '--workers', '1',
+                '--worker-class', 'gthread', '--threads', str(self.hilos),
+                '--worker-connections', '10000', '--backlog', '4096',
+                '--timeout', '120', '--log-level', 'warning',
+            ]
+        return [
+            sys.executable, '-m', 'uvicorn', 'crud.asgi:application',
+            '--host', '127.0.0.1', '--port', str(self.puerto),
+            '--backlog', '4096', '--log-level', 'warning', '--no-access-log',
+        ]
+
+    def iniciar(self, espera=30):
+        entorno = dict(os.environ, INSTRUMENTACION_LOG_NIVEL='WARNING')
+        self.proceso = subprocess.Popen(self.comando(), cwd=settings.BASE_DIR, env=entorno)
+        limite = time.monotonic() + espera
+        while time.monotonic() < limite:
+            if self.proceso.poll() is not None:
+                raise RuntimeError(f"{self.tipo}: el servidor terminó con código {self.proceso.returncode}")
+            try:
+                socket.create_connection(('127.0.0.1', self.puerto), timeout=0.5).close()
+                return
+            except OSError:
+                time.sleep(0.2)
+        self.detener()
+        raise RuntimeError(f"{self.tipo}: el servidor no respondió en {espera} s")
+
+    def procesos(self):
+        """pid del servidor y de sus hijos (los workers de gunicorn)."""
+        pendientes, pids = [self.proceso.pid], []
+        while pendientes:
+            pid = pendientes.pop()
+            pids.append(pid)
+            try:
+                for tarea in os.listdir(f'/proc/{pid}/task'):
+                    with open(f'/proc/{pid}/task/{tarea}/children') as archivo:
+                        pendientes.extend(int(hijo) for hijo in archivo.read().split())
+            except OSError:
+                pass
+        return pids
+
+    def memoria(self):
+        """(RSS total en MB, hilos) del servidor; (None, None) fuera de Linux."""
+        rss, hilos = 0, 0
+        for pid in self.procesos():
+            try:
+                with open(f'/proc/{pid}/status') as archivo:
+                    for linea in archivo:
+                        if linea.startswith('VmRSS:'):
+                            rss += int(linea.split()[1])
+                        elif linea.startswith('Threads:'):
+                            hilos += int(linea.split()[1])
+            except OSError:
+                return None, None
+        return round(rss / 1024, 1), hilos
+
+    def detener(self):
+        if self.proceso and self.proceso.poll() is None:
+            self.proceso.terminate()
+            try:
+                self.proceso.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                self.proceso.kill()
+                self.proceso.wait()
+
+
+class CargaConexionesLentas:
+    """
+    Simula `conexiones` clientes móviles lentos con asyncio: cada uno abre una
+    conexión, envía la línea de la petición, espera `lento` segundos (enlace
+    de subida lento) antes de mandar el resto de las cabeceras, lee la
+    respuesta a `kbps` KB/s como máximo y repite hasta cumplir `duracion`.
+
+    Con la lectura limitada el socket del cliente usa un buffer de recepción
+    chico para que el servidor note la contrapresión: un servidor con hilos
+    ocupa un hilo por respuesta mientras se envía; uno con event loop, solo
+    el socket y el cuerpo en memoria.
+    """
+    BUFFER_LECTURA = 16 * 1024
+
+    def __init__(self, puerto, ruta, token, conexiones=500, duracion=20, lento=1.0, kbps=None, timeout=30,
+                 host='127.0.0.1'):
+        self.host = host
+        self.puerto = puerto
+        self.ruta = ruta
+        self.token = token
+        self.conexiones = conexiones
+        self.duracion = duracion
+        self.lento = lento
+        self.kbps = kbps
+        self.timeout = timeout
+
+    async def conectar(self):
+        if not self.kbps:
+            return await asyncio.open_connection(self.host, self.puerto)
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.BUFFER_LECTURA)
+        sock.setblocking(False)
+        try:
+            await asyncio.get_running_loop().sock_connect(sock, (self.host, self.puerto))
+        except OSError:
+            sock.close()
+            raise
+        return await asyncio.open_connection(sock=sock)
+
+    async def leer(self, lector):
+        if not self.kbps:
+            return await lector.read()
+        inicio = None
+        while bloque := await lector.read(4096):
+            inicio = inicio or bloque
+            await asyncio.sleep(len(bloque) / (self.kbps * 1024))
+        return inicio or b''
+
+    async def peticion(self):
+        lector, escritor = await self.conectar()
+        try:
+            escritor.write(f'GET {self.ruta} HTTP/1.1\r\nHost: {self.host}:{self.puerto}\r\n'.encode())
+            await escritor.drain()
+            await asyncio.sleep(self.lento)
+            escritor.write((
+                f'Authorization: Bearer {self.token}\r\n'
+                'Accept: application/json\r\nConnection: close\r\n\r\n'
+            ).encode())
+            await escritor.drain()
+            respuesta = await self.leer(lector)
+        finally:
+            escritor.close()
+        if not respuesta.startswith(b'HTTP/'):
+            raise ConnectionError('respuesta vacía')
+        return int(respuesta.split(b' ', 2)[1])
+
+    async def cliente(self, fin, latencias, estados, errores):
+        # Arranque escalonado para no abrir todas las conexiones en el mismo instante
+        await asyncio.sleep(random.random())
+        while time.monotonic() < fin:
+            inicio = time.perf_counter()
+            try:
+                estado = await asyncio.wait_for(self.peticion(), self.timeout)
+            except asyncio.TimeoutError:
+                errores['timeout'] += 1
+                continue
+            except OSError:
+                errores['conexion'] += 1
+                await asyncio.sleep(0.1)
+                continue
+            except ConnectionError:
+                errores['conexion'] += 1
+                continue
+            latencias.append(time.perf_counter() - inicio)
+            estados[estado] = estados.get(estado, 0) + 1
+
+    async def muestrear(self, servidor, fin, muestras):
+        while time.monotonic() < fin:
+            muestras.append(servidor.memoria())
+            await asyncio.sleep(0.5)
+
+    async def correr(self, servidor=None):
+        latencias, estados, errores, muestras = [], {}, {'timeout': 0, 'conexion': 0}, []
+        inicio = time.monotonic()
+        fin = inicio + self.duracion
+        tareas = [self.cliente(fin, latencias, estados, errores) for _ in range(self.conexiones)]
+        if servidor is not None:
+            tareas.append(self.muestrear(servidor, fin, muestras))
+        await asyncio.gather(*tareas)
+        duracion = time.monotonic() - inicio
+
+        ordenadas = sorted(latencias)
+        correctas = sum(v for k, v in estados.items() if 200 <= k < 400)
+        rss = [m[0] for m in muestras if m[0] is not None]
+        hilos = [m[1] for m in muestras if m[1] is not None]
+        return {
+            'conexiones': self.conexiones,
+            'completadas': len(latencias),
+            'correctas': correctas,
+            'estados': {str(k): v for k, v in sorted(estados.items())},
+            'errores': errores,
+            'rps': round(correctas / duracion, 2),
+            'p50_ms': round(percentil(ordenadas, 50) * 1000, 1) if ordenadas else None,
+            'p95_ms': round(percentil(ordenadas, 95) * 1000, 1) if ordenadas else None,
+            'p99_ms': round(percentil(ordenadas, 99) * 1000, 1) if ordenadas else None,
+            'rss_mb_max': max(rss) if rss else None,
+            'hilos_max': max(hilos) if hilos else None,
+        }
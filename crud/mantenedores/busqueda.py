@@ -0,0 +1,55 @@
+# mantenedores/busqueda.py
+
+from django.db import connection
+from django.db.models import Q
+from .models import Producto
+
+# Candidatos por índice (FTS sobre nombre+descripción, trigramas sobre el
+# nombre del producto y de la categoría) y luego ranking combinado.
+# Las expresiones deben coincidir con las de la migración 0006 para usar los índices GIN.
+SQL_BUSQUEDA = """
+WITH candidatos AS (
+    SELECT p.id FROM mantenedores_producto p
+    WHERE to_tsvector('es_unaccent', p.nombre || ' ' || coalesce(p.descripcion, ''))
+          @@ websearch_to_tsquery('es_unaccent', %(q)s)
+    UNION
+    SELECT p.id FROM mantenedores_producto p
+    WHERE f_unaccent(lower(%(q)s)) <%% f_unaccent(lower(p.nombre))
+    UNION
+    SELECT p.id FROM mantenedores_producto p
+    JOIN mantenedores_categoria c ON c.id = p.categoria_id
+    WHERE f_unaccent(lower(%(q)s)) <%% f_unaccent(lower(c.nombre))
+)
+SELECT p.id
+FROM candidatos
+JOIN mantenedores_producto p ON p.id = candidatos.id
+JOIN mantenedores_categoria c ON c.id = p.categoria_id
+ORDER BY
+    2 * ts_rank_cd(
+        to_tsvector('es_unaccent', p.nombre || ' ' || coalesce(p.descripcion, '')),
+        websearch_to_tsquery('es_unaccent', %(q)s)
+    )
+    + word_similarity(f_unaccent(lower(%(q)s)), f_unaccent(lower(p.nombre)))
+    + 0.5 * word_similarity(f_unaccent(lower(%(q)s)), f_unaccent(lower(c.nombre)))
+    DESC,
+    p.id
+LIMIT %(limite)s
+"""
+
+
+def buscar_productos(q, limite=20):
+    """
+    Devuelve los ids de los productos que coinciden con `q`, ordenados por
+    relevancia. En PostgreSQL tolera acentos y errores de tipeo; en otros
+    motores recurre a una búsqueda simple por `icontains`.
+    """
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(SQL_BUSQUEDA, {'q': q, 'limite': limite})
+            return [fila[0] for fila in cursor.fetchall()]
+
+    return list(
+        Producto.objects.filter(
+            Q(nombre__icontains=q) | Q(descripcion__icontains=q) | Q(categoria__nombre__icontains=q)
+        ).order_by('nombre', 'id').values_list('id', flat=True)[:limite]
+    )
@@ -0,0 +1,82 @@
+# mantenedores/cache_api.py
+
+import asyncio
+import hashlib
+import time
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.response import Response
+from .versiones import ETagVersionMixin
+
+
+def clave_respuesta(request, etag, prefijo='api'):
+    base = f"{request.get_host()}|{etag}"
+    return f"{prefijo}:" + hashlib.sha1(base.encode()).hexdigest()
+
+
+def timeout_respuesta():
+    return getattr(settings, 'API_CACHE_TIMEOUT', 3600)
+
+
+def cache_respuestas():
+    """Alias 'api' de CACHES: las respuestas no comparten espacio con los contadores de 'default'."""
+    return caches['api']
+
+
+class CacheVersionadaMixin(ETagVersionMixin):
+    """
+    Caché read-through para `list` y `retrieve`.
+
+    La clave se deriva del ETag (contadores de versión + ruta + Accept), así
+    que una escritura invalida todas las respuestas del modelo en O(1): basta
+    con que cambie su versión. Ante un fallo de caché solo un proceso
+    reconstruye la respuesta (candado con `cache.add`); el resto espera
+    mientras el candado exista, por lenta que sea la reconstrucción. Si el
+    candado desaparece sin dejar respuesta (falló, o no era un 200), el
+    siguiente en tomarlo la calcula; el candado vence a los `cache_candado`
+    segundos, así que un proceso muerto no deja a nadie esperando más.
+    """
+    cache_intervalo = 0.02
+    cache_candado = 30
+
+    def generar_respuesta(self, request, etag, generar):
+        cache = cache_respuestas()
+        clave = clave_respuesta(request, etag)
+        candado = clave + ':candado'
+
+        while True:
+            datos = cache.get(clave)
+            if datos is not None:
+                return Response(datos)
+            if cache.add(candado, 1, self.cache_candado):
+                try:
+                    response = generar()
+                    if response.status_code == 200:
+                        cache.set(clave, response.data, timeout_respuesta())
+                    return response
+                finally:
+                    cache.delete(candado)
+            time.sleep(self.cache_intervalo)
+
+
+async def contenido_en_cache(clave, generar, intervalo=0.02, candado_ttl=30):
+    """
+    Versión async del mismo read-through para las vistas async: guarda el
+    JSON ya renderizado (bytes) y `generar` es una corrutina que lo produce.
+    Mientras otro proceso lo reconstruye se espera sin bloquear el event loop.
+    """
+    cache = cache_respuestas()
+    candado = clave + ':candado'
+
+    while True:
+        contenido = await cache.aget(clave)
+        if contenido is not None:
+            return contenido
+        if await cache.aadd(candado, 1, candado_ttl):
+            try:
+                contenido = await generar()
+                await cache.aset(clave, contenido, timeout_respuesta())
+                return contenido
+            finally:
+                await cache.adelete(candado)
+        await asyncio.sleep(intervalo)
@@ -0,0 +1,290 @@
+# mantenedores/cercania.py
+
+import heapq
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.db.models.expressions import RawSQL
+
+from .models import Sucursal, UbicacionProducto, VersionModelo
+
+RADIO_TIERRA_KM = 6371.0088
+
+
+def configuracion(clave):
+    return settings.CERCANIA[clave]
+
+
+# --- Celdas y distancias ---
+
+def tamano_celda(precision):
+    """(alto, ancho) en grados de una celda geohash de `precision` caracteres."""
+    bits = 5 * precision
+    return 180 / 2 ** (bits // 2), 360 / 2 ** ((bits + 1) // 2)
+
+
+def en_radianes(latitud, longitud):
+    """(latitud, longitud, coseno de la latitud) en radianes, para distancia_radianes()."""
+    fi = math.radians(latitud)
+    return fi, math.radians(longitud), math.cos(fi)
+
+
+def distancia_radianes(a, b):
+    """Distancia en km (haversine) entre dos puntos de en_radianes()."""
+    h = math.sin((b[0] - a[0]) / 2) ** 2 + a[2] * b[2] * math.sin((b[1] - a[1]) / 2) ** 2
+    return 2 * RADIO_TIERRA_KM * math.asin(min(1.0, math.sqrt(h)))
+
+
+def distancia_km(lat1, lon1, lat2, lon2):
+    """Distancia sobre la esfera (haversine)."""
+    return distancia_radianes(en_radianes(lat1, lon1), en_radianes(lat2, lon2))
+
+
+def cota_km(latitud, longitud, rectangulo):
+    """
+    Cota inferior de la distancia desde el punto a cualquier punto del
+    rectángulo (lat_min, lat_max, lon_min, lon_max): la diferencia de
+    latitud, o la de longitud medida en la latitud más cercana al polo.
+    """
+    lat0, lat1, lon0, lon1 = rectangulo
+    norte_sur = math.radians(max(0.0, lat0 - latitud, latitud - lat1))
+    cercana, lejana = max(0.0, lon0 - longitud, longitud - lon1), max(abs(longitud - lon0), abs(longitud - lon1))
+    # Cruzando el meridiano 180 la separación puede ser menor
+    separacion = math.radians(min(cercana, 360 - lejana)) if lejana > 180 else math.radians(cercana)
+    cosenos = math.cos(math.radians(abs(latitud))) * math.cos(math.radians(max(abs(lat0), abs(lat1))))
+    este_oeste = 2 * math.asin(min(1.0, math.sqrt(max(0.0, cosenos)) * math.sin(separacion / 2)))
+    return RADIO_TIERRA_KM * max(norte_sur, este_oeste)
+
+
+# --- Índice en memoria ---
+
+class IndiceSucursales:
+    """
+    Grilla en memoria con las sucursales que tienen coordenadas, en dos
+    niveles: celdas geohash de CERCANIA['PRECISION'] caracteres agrupadas en
+    bloques de dos caracteres menos (32 x 32 celdas). Se guardan como
+    (fila, columna) para calcular sus límites sin decodificar el geohash.
+
+    La búsqueda de las k más cercanas visita bloques y celdas de menor a
+    mayor distancia mínima posible al punto y termina cuando la siguiente ya
+    no puede tener nada más cerca que la k-ésima encontrada: solo se miden
+    las sucursales de unas pocas celdas, lejos o cerca de todo.
+
+    Igual que el índice de autocompletar: se construye en la primera
+    consulta, se actualiza con las señales de Sucursal del propio proceso y
+    se reconstruye si el contador de versión cambió (otros workers).
+    """
+    REVISION_SEGUNDOS = 30
+    # Celdas por lado de un bloque (2 caracteres de geohash = 5 bits por eje)
+    LADO_BLOQUE = 32
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.construido = False
+        self.revisado = 0.0
+        self.version = None
+        self.sucursales = {}    # id -> (latitud, longitud, nombre, direccion)
+        self.puntos = {}        # id -> en_radianes(latitud, longitud)
+        self.celdas = {}        # (fila, columna) -> [id, ...]
+        self.bloques = {}       # (fila, columna) del bloque -> {celda, ...}
+        self.radios = {}        # (fila, lado) -> km del centro a las esquinas (no depende de la columna)
+
+    # --- Construcción ---
+
+    def leer_version(self):
+        return VersionModelo.objects.filter(modelo='sucursal').values_list('version', flat=True).first()
+
+    def construir(self):
+        version = self.leer_version()
+        filas = Sucursal.objects.filter(latitud__isnull=False, longitud__isnull=False).values_list(
+            'id', 'latitud', 'longitud', 'nombre', 'direccion',
+        )
+        with self.lock:
+            self.alto, self.ancho = tamano_celda(configuracion('PRECISION'))
+            self.sucursales, self.puntos, self.celdas, self.bloques, self.radios = {}, {}, {}, {}, {}
+            for pk, latitud, longitud, nombre, direccion in filas:
+                self.agregar(pk, float(latitud), float(longitud), nombre, direccion)
+            self.version = version
+            self.revisado = time.monotonic()
+            self.construido = True
+
+    def asegurar(self):
+        if not self.construido:
+            with self.lock:
+                if not self.construido:
+                    self.construir()
+            return
+        if time.monotonic() - self.revisado >= self.REVISION_SEGUNDOS:
+            self.revisado = time.monotonic()
+            if self.leer_version() != self.version:
+                self.construir()
+
+    def celda(self, latitud, longitud):
+        return (
+            min(int((latitud + 90) / self.alto), int(180 / self.alto) - 1),
+            min(int((longitud + 180) / self.ancho), int(360 / self.ancho) - 1),
+        )
+
+    def bloque(self, celda):
+        return celda[0] // self.LADO_BLOQUE, celda[1] // self.LADO_BLOQUE
+
+    def rectangulo(self, fila, columna, lado=1):
+        """(lat_min, lat_max, lon_min, lon_max) de una celda (lado 1) o un bloque."""
+        alto, ancho = self.alto * lado, self.ancho * lado
+        return fila * alto - 90, (fila + 1) * alto - 90, columna * ancho - 180, (columna + 1) * ancho - 180
+
+    def cota(self, latitud, longitud, origen, fila, columna, lado=1):
+        """
+        Distancia mínima posible del punto a una celda o bloque: la mayor
+        entre cota_km() (ajustada cerca) y la distancia al centro menos el
+        radio del rectángulo (ajustada lejos).
+        """
+        rectangulo = self.rectangulo(fila, columna, lado)
+        centro = en_radianes((rectangulo[0] + rectangulo[1]) / 2, (rectangulo[2] + rectangulo[3]) / 2)
+        radio = self.radios.get((fila, lado))
+        if radio is None:
+            # En rectángulos chicos lo más lejano del centro son las esquinas
+            radio = self.radios[fila, lado] = max(
+                distancia_radianes(centro, en_radianes(lat, lon)) for lat in rectangulo[:2] for lon in rectangulo[2:]
+            )
+        return max(cota_km(latitud, longitud, rectangulo), distancia_radianes(origen, centro) - radio)
+
+    def agregar(self, pk, latitud, longitud, nombre, direccion):
+        celda = self.celda(latitud, longitud)
+        self.sucursales[pk] = (latitud, longitud, nombre, direccion)
+        self.puntos[pk] = en_radianes(latitud, longitud)
+        self.celdas.setdefault(celda, []).append(pk)
+        self.bloques.setdefault(self.bloque(celda), set()).add(celda)
+
+    # --- Actualización incremental (señales) ---
+
+    def sacar_sucursal(self, pk):
+        anterior = self.sucursales.pop(pk, None)
+        if anterior is None:
+            return
+        del self.puntos[pk]
+        celda = self.celda(anterior[0], anterior[1])
+        self.celdas[celda].remove(pk)
+        if not self.celdas[celda]:
+            del self.celdas[celda]
+            bloque = self.bloques[self.bloque(celda)]
+            bloque.discard(celda)
+            if not bloque:
+                del self.bloques[self.bloque(celda)]
+
+    def quitar_sucursal(self, pk):
+        with self.lock:
+            if not self.construido:
+                return
+            self.sacar_sucursal(pk)
+            # La señal ya incrementó la versión en la base (ver IndiceAutocompletar.aplicado)
+            self.version = (self.version or 0) + 1
+
+    def guardar_sucursal(self, sucursal):
+        with self.lock:
+            if not self.construido:
+                return
+            self.sacar_sucursal(sucursal.pk)
+            if sucursal.latitud is not None and sucursal.longitud is not None:
+                self.agregar(sucursal.pk, float(sucursal.latitud), float(sucursal.longitud), sucursal.nombre, sucursal.direccion)
+            self.version = (self.version or 0) + 1
+
+    # --- Consulta ---
+
+    def cercanas(self, latitud, longitud, k, permitidas=None):
+        """
+        Las `k` sucursales más cercanas al punto como [(distancia_km, id, datos)],
+        de la más cercana a la más lejana. `permitidas` (ids) restringe la búsqueda.
+        """
+        self.asegurar()
+        with self.lock:
+            origen = en_radianes(latitud, longitud)
+            if permitidas is not None and len(permitidas) <= configuracion('MAXIMO_DIRECTO'):
+                # Pocas candidatas (un producto escaso): se miden todas
+                return self.medir(origen, k, [pk for pk in permitidas if pk in self.sucursales])
+
+            # Cola de (cota, es_celda, fila, columna): primero bloques, que al salir agregan sus celdas
+            pendientes = [
+                (self.cota(latitud, longitud, origen, *bloque, lado=self.LADO_BLOQUE), False, *bloque)
+                for bloque in self.bloques
+            ]
+            heapq.heapify(pendientes)
+            mejores = []   # heap de (-distancia, -id): la raíz es la peor de las k
+            while pendientes:
+                cota, es_celda, fila, columna = heapq.heappop(pendientes)
+                if len(mejores) == k and cota > -mejores[0][0]:
+                    break
+                if not es_celda:
+                    for celda in self.bloques[fila, columna]:
+                        heapq.heappush(pendientes, (self.cota(latitud, longitud, origen, *celda), True, *celda))
+                    continue
+                for pk in self.celdas[fila, columna]:
+                    if permitidas is not None and pk not in permitidas:
+                        continue
+                    entrada = (-distancia_radianes(origen, self.puntos[pk]), -pk)
+                    if len(mejores) < k:
+                        heapq.heappush(mejores, entrada)
+                    elif entrada > mejores[0]:
+                        heapq.heapreplace(mejores, entrada)
+            return [(-d, -pk, self.sucursales[-pk]) for d, pk in sorted(mejores, reverse=True)]
+
+    def medir(self, origen, k, ids):
+        distancias = ((distancia_radianes(origen, self.puntos[pk]), pk) for pk in ids)
+        return [(d, pk, self.sucursales[pk]) for d, pk in heapq.nsmallest(k, distancias)]
+
+
+indice_sucursales = IndiceSucursales()
+
+
+# --- Con PostGIS ---
+
+# Debe coincidir con la expresión del índice sucursal_geografia_idx (migración 0016)
+GEOGRAFIA_SQL = (
+    'geography(ST_SetSRID(ST_MakePoint("mantenedores_sucursal"."longitud"::float8, '
+    '"mantenedores_sucursal"."latitud"::float8), 4326))'
+)
+PUNTO_SQL = 'geography(ST_SetSRID(ST_MakePoint(%s, %s), 4326))'
+
+
+def cercanas_postgis(latitud, longitud, k, producto=None):
+    """Misma respuesta que IndiceSucursales.cercanas, resuelta por PostgreSQL (KNN con <->)."""
+    sucursales = Sucursal.objects.filter(latitud__isnull=False, longitud__isnull=False)
+    if producto is not None:
+        sucursales = sucursales.filter(ubicaciones__producto_id=producto)
+    filas = sucursales.annotate(
+        distancia_m=RawSQL(f"ST_Distance({GEOGRAFIA_SQL}, {PUNTO_SQL})", (longitud, latitud)),
+    ).order_by(RawSQL(f"{GEOGRAFIA_SQL} <-> {PUNTO_SQL}", (longitud, latitud)), 'pk').values_list(
+        'id', 'latitud', 'longitud', 'nombre', 'direccion', 'distancia_m',
+    )[:k]
+    return [
+        (distancia / 1000, pk, (float(lat), float(lon), nombre, direccion))
+        for pk, lat, lon, nombre, direccion, distancia in filas
+    ]
+
+
+def sucursales_cercanas(latitud, longitud, k, producto=None):
+    """
+    Las `k` sucursales más cercanas a un punto, solo entre las que tienen
+    una ubicación propia para `producto` si se indica. Según
+    CERCANIA['MOTOR']: 'grilla' (en memoria, sin dependencias) o 'postgis'.
+    """
+    if configuracion('MOTOR') == 'postgis':
+        filas = cercanas_postgis(latitud, longitud, k, producto)
+    else:
+        permitidas = None
+        if producto is not None:
+            permitidas = set(UbicacionProducto.objects.filter(producto_id=producto).values_list('sucursal_id', flat=True))
+        filas = indice_sucursales.cercanas(latitud, longitud, k, permitidas)
+    return [
+        {
+            'id': pk,
+            'nombre': nombre,
+            'direccion': direccion,
+            'latitud': lat,
+            'longitud': lon,
+            'distancia_km': round(distancia, 3),
+        }
+        for distancia, pk, (lat, lon, nombre, direccion) in filas
+    ]
@@ -0,0 +1,260 @@
+# mantenedores/cola.py
+
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+import zlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Tarea
+
+logger = logging.getLogger(__name__)
+
+# Tareas registradas con @tarea, por nombre
+REGISTRO = {}
+
+
+def configuracion(clave, defecto=None):
+    return getattr(settings, 'TAREAS', {}).get(clave, defecto)
+
+
+def configuracion_cola(cola):
+    colas = configuracion('COLAS', {})
+    return {'concurrencia': 1, 'visibilidad': 300, **colas.get(cola, colas.get('default', {}))}
+
+
+class DefinicionTarea:
+    """
+    Función registrada como tarea. Llamarla la ejecuta en el momento;
+    `encolar()` la deja para el trabajador.
+    """
+    def __init__(self, funcion, nombre, cola, prioridad, max_intentos):
+        self.funcion = funcion
+        self.nombre = nombre
+        self.cola = cola
+        self.prioridad = prioridad
+        self.max_intentos = max_intentos
+
+    def __call__(self, *args, **kwargs):
+        return self.funcion(*args, **kwargs)
+
+    def encolar(self, adjunto=None, prioridad=None, retraso=None, **argumentos):
+        """
+        Crea la tarea dentro de la transacción en curso: el trabajador solo la
+        ve si la transacción se confirma. `argumentos` debe ser serializable a
+        JSON; `adjunto` son bytes que la función recibe como `adjunto=`.
+        """
+        tarea = Tarea.objects.create(
+            cola=self.cola,
+            nombre=self.nombre,
+            argumentos=argumentos,
+            adjunto=adjunto,
+            prioridad=self.prioridad if prioridad is None else prioridad,
+            max_intentos=self.max_intentos,
+            disponible_desde=timezone.now() + (retraso or timedelta()),
+        )
+        if configuracion('SINCRONAS', False):
+            # Desarrollo sin trabajador: se ejecuta al confirmar, en este proceso
+            transaction.on_commit(lambda: ejecutar_ahora(tarea.pk))
+        return tarea
+
+
+def tarea(cola='default', prioridad=0, max_intentos=3, nombre=None):
+    """Registra una función como tarea en segundo plano."""
+    def decorador(funcion):
+        definicion = DefinicionTarea(
+            funcion, nombre or f"{funcion.__module__}.{funcion.__name__}", cola, prioridad, max_intentos,
+        )
+        REGISTRO[definicion.nombre] = definicion
+        return definicion
+    return decorador
+
+
+# --- Trabajador ---
+
+def bloquear_cola(cola):
+    """En PostgreSQL serializa la toma de tareas de una cola hasta el fin de la transacción."""
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)', [zlib.crc32(f'tareas:{cola}'.encode())])
+
+
+def tomar(cola, trabajador):
+    """
+    Reserva la siguiente tarea disponible de `cola` (mayor prioridad y más
+    antigua primero) por el plazo de visibilidad de la cola. Devuelve None si
+    no hay tareas o la cola ya tiene `concurrencia` tareas en curso.
+    """
+    ajustes = configuracion_cola(cola)
+    ahora = timezone.now()
+    with transaction.atomic():
+        bloquear_cola(cola)
+        if Tarea.objects.filter(cola=cola, estado=Tarea.EN_CURSO).count() >= ajustes['concurrencia']:
+            return None
+        candidata = (
+            Tarea.objects.filter(cola=cola, estado=Tarea.PENDIENTE, disponible_desde__lte=ahora)
+            .order_by('-prioridad', 'disponible_desde', 'pk')
+            .defer('adjunto').first()
+        )
+        if candidata is None:
+            return None
+        bloqueada_hasta = ahora + timedelta(seconds=ajustes['visibilidad'])
+        # Sin bloqueo de filas (SQLite) otro trabajador pudo tomarla antes
+        tomada = Tarea.objects.filter(pk=candidata.pk, estado=Tarea.PENDIENTE).update(
+            estado=Tarea.EN_CURSO, intentos=F('intentos') + 1, bloqueada_hasta=bloqueada_hasta, trabajador=trabajador,
+        )
+        if not tomada:
+            return None
+    candidata.estado, candidata.intentos = Tarea.EN_CURSO, candidata.intentos + 1
+    candidata.bloqueada_hasta, candidata.trabajador = bloqueada_hasta, trabajador
+    return candidata
+
+
+def ejecutar(tarea, trabajador):
+    """Corre una tarea ya tomada y registra el resultado, un reintento o la falla."""
+    definicion = REGISTRO.get(tarea.nombre)
+    # Solo se actualiza si nadie la retomó por vencer el plazo de visibilidad
+    propia = Tarea.objects.filter(pk=tarea.pk, trabajador=trabajador, intentos=tarea.intentos)
+    try:
+        if definicion is None:
+            raise LookupError(f"Tarea no registrada: {tarea.nombre}")
+        argumentos = dict(tarea.argumentos)
+        adjunto = Tarea.objects.filter(pk=tarea.pk).values_list('adjunto', flat=True).first()
+        if adjunto is not None:
+            argumentos['adjunto'] = bytes(adjunto)
+        resultado = definicion.funcion(**argumentos)
+    except Exception:
+        error = traceback.format_exc()
+        ahora = timezone.now()
+        if definicion is not None and tarea.intentos < tarea.max_intentos:
+            espera = configuracion('REINTENTO_BASE', 10) * 2 ** (tarea.intentos - 1)
+            logger.warning("Tarea %s #%s falló (intento %s), se reintenta en %ss", tarea.nombre, tarea.pk, tarea.intentos, espera)
+            propia.update(
+                estado=Tarea.PENDIENTE, disponible_desde=ahora + timedelta(seconds=espera),
+                bloqueada_hasta=None, error=error,
+            )
+        else:
+            logger.error("Tarea %s #%s falló definitivamente:\n%s", tarea.nombre, tarea.pk, error)
+            propia.update(estado=Tarea.FALLIDA, adjunto=None, bloqueada_hasta=None, terminada=ahora, error=error)
+        return False
+    propia.update(
+        estado=Tarea.COMPLETADA, resultado=resultado, adjunto=None, bloqueada_hasta=None, terminada=timezone.now(),
+    )
+    return True
+
+
+def ejecutar_ahora(pk):
+    """Modo TAREAS['SINCRONAS']: toma y corre esta tarea sin esperar al trabajador."""
+    trabajador = f"sincrono:{os.getpid()}"
+    if Tarea.objects.filter(pk=pk, estado=Tarea.PENDIENTE).update(
+        estado=Tarea.EN_CURSO, intentos=F('intentos') + 1, trabajador=trabajador,
+    ):
+        ejecutar(Tarea.objects.defer('adjunto').get(pk=pk), trabajador)
+
+
+def liberar_vencidas():
+    """
+    Tareas cuyo plazo de visibilidad venció (el trabajador murió o quedó
+    colgado): vuelven a la cola, o fallan si ya no les quedan intentos.
+    """
+    ahora = timezone.now()
+    vencidas = Tarea.objects.filter(estado=Tarea.EN_CURSO, bloqueada_hasta__lt=ahora)
+    error = "Se agotó el plazo de visibilidad sin terminar."
+    fallidas = vencidas.filter(intentos__gte=F('max_intentos')).update(
+        estado=Tarea.FALLIDA, adjunto=None, bloqueada_hasta=None, terminada=ahora, error=error,
+    )
+    reintentadas = vencidas.update(estado=Tarea.PENDIENTE, bloqueada_hasta=None, disponible_desde=ahora, error=error)
+    return reintentadas, fallidas
+
+
+def purgar_terminadas():
+    """Borra las tareas completadas o fallidas más antiguas que TAREAS['RETENCION_DIAS']."""
+    limite = timezone.now() - timedelta(days=configuracion('RETENCION_DIAS', 7))
+    return Tarea.objects.filter(
+        estado__in=[Tarea.COMPLETADA, Tarea.FALLIDA], terminada__lt=limite,
+    ).delete()[0]
+
+
+class Trabajador:
+    """
+    Proceso que atiende una o más colas con `concurrencia` hilos por cola
+    (TAREAS['COLAS']). El hilo principal libera las tareas vencidas y purga
+    las antiguas cada `intervalo_mantenimiento` segundos.
+    """
+    intervalo_mantenimiento = 30
+
+    def __init__(self, colas, hilos=None, espera=1.0, hasta_vaciar=False):
+        self.colas = colas
+        self.hilos = hilos
+        self.espera = espera
+        self.hasta_vaciar = hasta_vaciar
+        self.id = f"{socket.gethostname()}:{os.getpid()}"
+        self.detener = threading.Event()
+        self.procesadas = 0
+        self.fallidas = 0
+        self.candado = threading.Lock()
+
+    def correr(self):
+        hilos = [
+            threading.Thread(target=self.bucle, args=(cola, f"{self.id}:{cola}:{n}"), daemon=True)
+            for cola in self.colas
+            for n in range(self.hilos or configuracion_cola(cola)['concurrencia'])
+        ]
+        self.mantenimiento()
+        ultimo = time.monotonic()
+        for hilo in hilos:
+            hilo.start()
+        while any(hilo.is_alive() for hilo in hilos) and not self.detener.wait(1):
+            if time.monotonic() - ultimo >= self.intervalo_mantenimiento:
+                self.mantenimiento()
+                ultimo = time.monotonic()
+        for hilo in hilos:
+            hilo.join()
+        connection.close()
+
+    def mantenimiento(self):
+        try:
+            reintentadas, fallidas = liberar_vencidas()
+            if reintentadas or fallidas:
+                logger.warning("Tareas vencidas: %s devueltas a la cola, %s fallidas", reintentadas, fallidas)
+            purgar_terminadas()
+        except Exception:
+            logger.exception("Error en el mantenimiento de la cola de tareas")
+
+    def bucle(self, cola, nombre):
+        try:
+            while not self.detener.is_set():
+                try:
+                    if not self.atender(cola, nombre):
+                        return
+                except Exception:
+                    # Base caída, resultado no serializable...: se registra y se sigue
+                    logger.exception("Error en el hilo %s de la cola de tareas", nombre)
+                    self.detener.wait(self.espera)
+        finally:
+            connection.close()
+
+    def atender(self, cola, nombre):
+        """Toma y ejecuta una tarea; devuelve False si el hilo debe terminar."""
+        close_old_connections()
+        tarea = tomar(cola, nombre)
+        if tarea is None:
+            if self.hasta_vaciar and not Tarea.objects.filter(
+                cola=cola, estado__in=[Tarea.PENDIENTE, Tarea.EN_CURSO], disponible_desde__lte=timezone.now(),
+            ).exists():
+                return False
+            self.detener.wait(self.espera)
+            return True
+        correcta = ejecutar(tarea, nombre)
+        with self.candado:
+            self.procesadas += 1
+            self.fallidas += not correcta
+        return True
@@ -0,0 +1,203 @@
+# mantenedores/estadisticas.py
+
+from collections import Counter
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncWeek
+from django.utils import timezone
+
+from .models import Categoria, Cliente, Estadistica, Producto, Promocion, Proveedor, Sucursal, UbicacionProducto
+
+# Categorías que muestra el dashboard (las con más productos)
+CATEGORIAS_DASHBOARD = 10
+
+
+def inicio_semana(fecha):
+    """Lunes de la semana de `fecha` (mismo tramo que TruncWeek)."""
+    return fecha - timedelta(days=fecha.weekday())
+
+
+class Metrica:
+    """
+    Un contador del almacén de estadísticas. Sin `campo` es el total del
+    modelo (dimensión ''); con `campo` hay un contador por cada valor del
+    campo (categoría, sucursal...). `tramo` agrupa el valor en Python y
+    `expresion` hace lo mismo en la base al recontar (p. ej. la semana).
+    """
+    def __init__(self, nombre, modelo, campo=None, tramo=None, expresion=None):
+        self.nombre = nombre
+        self.modelo = modelo
+        self.campo = campo
+        self.tramo = tramo
+        self.expresion = expresion
+
+    def dimension(self, valor):
+        """Dimensión para un valor del campo, o None si la fila no se cuenta."""
+        if self.campo is None:
+            return ''
+        if valor is None:
+            return None
+        return str(self.tramo(valor) if self.tramo else valor)
+
+    def dimension_de(self, instancia):
+        return self.dimension(getattr(instancia, self.campo) if self.campo else None)
+
+    def recontar(self):
+        """Valores exactos {dimension: cantidad} calculados desde la tabla."""
+        if self.campo is None:
+            return {'': self.modelo.objects.count()}
+        filas = (
+            self.modelo.objects.filter(**{f'{self.campo}__isnull': False})
+            .annotate(d=self.expresion or F(self.campo))
+            .values('d').annotate(n=Count('pk')).order_by()
+        )
+        return {str(fila['d']): fila['n'] for fila in filas}
+
+
+METRICAS = [
+    Metrica('productos', Producto),
+    Metrica('promociones', Promocion),
+    Metrica('proveedores', Proveedor),
+    Metrica('clientes', Cliente),
+    Metrica('sucursales', Sucursal),
+    Metrica('productos_categoria', Producto, 'categoria_id'),
+    Metrica('productos_sucursal', UbicacionProducto, 'sucursal_id'),
+    Metrica('promociones_semana', Promocion, 'fecha_inicio', tramo=inicio_semana, expresion=TruncWeek('fecha_inicio')),
+]
+
+MODELOS_CONTADOS = {metrica.modelo for metrica in METRICAS}
+
+
+def metricas_de(modelo):
+    return [metrica for metrica in METRICAS if metrica.modelo is modelo]
+
+
+# --- Actualización incremental (desde signals.py) ---
+
+def dimensiones_guardadas(modelo, pk):
+    """
+    Dimensiones de la fila tal como está en la base, antes de guardar los
+    cambios; None si el modelo no tiene contadores por campo o la fila no
+    existe.
+    """
+    metricas = [metrica for metrica in metricas_de(modelo) if metrica.campo]
+    if not metricas:
+        return None
+    fila = modelo.objects.filter(pk=pk).values(*{metrica.campo for metrica in metricas}).first()
+    if fila is None:
+        return None
+    return {metrica.nombre: metrica.dimension(fila[metrica.campo]) for metrica in metricas}
+
+
+def dimensiones_de(instancia):
+    """Como dimensiones_guardadas(), pero de una instancia ya cargada (operaciones masivas)."""
+    return {metrica.nombre: metrica.dimension_de(instancia) for metrica in metricas_de(type(instancia)) if metrica.campo}
+
+
+def cambios_guardado(instancia, creado, anteriores=None):
+    """Deltas {(metrica, dimension): n} de crear o modificar `instancia`."""
+    cambios = Counter()
+    for metrica in metricas_de(type(instancia)):
+        nueva = metrica.dimension_de(instancia)
+        if creado or anteriores is None:
+            if creado and nueva is not None:
+                cambios[metrica.nombre, nueva] += 1
+            continue
+        # Modificación: solo cambian los contadores por campo si el campo cambió
+        anterior = anteriores.get(metrica.nombre)
+        if metrica.campo and anterior != nueva:
+            if anterior is not None:
+                cambios[metrica.nombre, anterior] -= 1
+            if nueva is not None:
+                cambios[metrica.nombre, nueva] += 1
+    return {clave: delta for clave, delta in cambios.items() if delta}
+
+
+def cambios_eliminacion(instancia):
+    cambios = {}
+    for metrica in metricas_de(type(instancia)):
+        dimension = metrica.dimension_de(instancia)
+        if dimension is not None:
+            cambios[metrica.nombre, dimension] = -1
+    return cambios
+
+
+def sumar(cambios):
+    """Aplica los deltas con UPDATE ... valor = valor + n (sin leer antes)."""
+    with transaction.atomic():
+        for (metrica, dimension), delta in cambios.items():
+            filtro = Estadistica.objects.filter(metrica=metrica, dimension=dimension)
+            if not filtro.update(valor=F('valor') + delta, actualizado=timezone.now()):
+                Estadistica.objects.get_or_create(metrica=metrica, dimension=dimension)
+                filtro.update(valor=F('valor') + delta)
+
+
+# --- Reconciliación ---
+
+def reconciliar(modelos=None):
+    """
+    Recuenta las métricas (todas o las de `modelos`) y corrige las filas que
+    se desviaron: operaciones masivas sin señales, transacciones que no
+    llegaron a ejecutar su on_commit, etc. Devuelve {metrica: filas corregidas}.
+    """
+    corregidas = {}
+    for metrica in METRICAS:
+        if modelos is not None and metrica.modelo not in modelos:
+            continue
+        exactos = metrica.recontar()
+        with transaction.atomic():
+            guardados = dict(
+                Estadistica.objects.select_for_update()
+                .filter(metrica=metrica.nombre).values_list('dimension', 'valor')
+            )
+            distintas = [d for d, n in exactos.items() if guardados.get(d) != n]
+            # Dimensiones que ya no existen (sucursal eliminada, semana sin promociones)
+            sobrantes = [d for d in guardados if d not in exactos]
+            Estadistica.objects.bulk_create(
+                [Estadistica(metrica=metrica.nombre, dimension=d, valor=exactos[d]) for d in distintas],
+                update_conflicts=True,
+                unique_fields=['metrica', 'dimension'],
+                update_fields=['valor', 'actualizado'],
+            )
+            Estadistica.objects.filter(metrica=metrica.nombre, dimension__in=sobrantes).delete()
+        corregidas[metrica.nombre] = len(distintas) + sum(1 for d in sobrantes if guardados[d])
+    return corregidas
+
+
+# --- Lectura ---
+
+def leer(metricas):
+    """{metrica: {dimension: valor}} de las métricas pedidas, en una consulta."""
+    valores = {nombre: {} for nombre in metricas}
+    for metrica, dimension, valor in Estadistica.objects.filter(metrica__in=metricas).values_list(
+        'metrica', 'dimension', 'valor'
+    ):
+        valores[metrica][dimension] = valor
+    return valores
+
+
+def resumen_dashboard(hoy=None):
+    """Totales, promociones por semana y productos por categoría del dashboard."""
+    hoy = hoy or timezone.localdate()
+    nombres = ['productos', 'promociones', 'proveedores', 'clientes', 'sucursales', 'promociones_semana', 'productos_categoria']
+    valores = leer(nombres)
+
+    semana = inicio_semana(hoy)
+    por_semana = valores['promociones_semana']
+    por_categoria = sorted(
+        ((int(pk), n) for pk, n in valores['productos_categoria'].items() if n),
+        key=lambda par: -par[1],
+    )[:CATEGORIAS_DASHBOARD]
+    nombres_categoria = dict(Categoria.objects.filter(pk__in=[pk for pk, _ in por_categoria]).values_list('pk', 'nombre'))
+    return {
+        'total_productos': valores['productos'].get('', 0),
+        'total_promociones': valores['promociones'].get('', 0),
+        'total_proveedores': valores['proveedores'].get('', 0),
+        'total_clientes': valores['clientes'].get('', 0),
+        'total_sucursales': valores['sucursales'].get('', 0),
+        'promociones_semana': por_semana.get(str(semana), 0),
+        'promociones_proxima_semana': por_semana.get(str(semana + timedelta(days=7)), 0),
+        'productos_por_categoria': [(nombres_categoria.get(pk, pk), n) for pk, n in por_categoria],
+    }
@@ -1,5 +1,9 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
+from django.db import transaction
 from .models import *
+from .imagenes import analizar_imagen
+from .tareas import encolar_imagen
 
 class ProductoForm(forms.ModelForm):
     class Meta:
@@ -19,6 +23,28 @@ class ProductoForm(forms.ModelForm):
             'imagen': forms.FileInput(attrs={'class': 'form-control'}),
         }
 
+    def clean_imagen(self):
+        # Se valida aquí; la subida a Cloudinary y las derivadas quedan para
+        # la cola de tareas (ver tareas.procesar_imagen_producto)
+        imagen = self.cleaned_data.get('imagen')
+        self.imagen_nueva = None
+        if isinstance(imagen, UploadedFile):
+            try:
+                analizar_imagen(imagen)
+            except ValueError as e:
+                raise forms.ValidationError(str(e))
+            self.imagen_nueva = imagen
+            # Hasta que el trabajador la suba se conserva la imagen actual
+            imagen = self.instance.imagen
+        return imagen
+
+    def save(self, commit=True):
+        with transaction.atomic():
+            producto = super().save(commit)
+            if commit and getattr(self, 'imagen_nueva', None) is not None:
+                encolar_imagen(producto, self.imagen_nueva)
+        return producto
+
 class CategoriaForm(forms.ModelForm):
     class Meta:
         model = Categoria
@@ -60,10 +86,12 @@ class ClienteForm(forms.ModelForm):
 class SucursalForm(forms.ModelForm):
     class Meta:
         model = Sucursal
-        fields = ['nombre', 'direccion']
+        fields = ['nombre', 'direccion', 'latitud', 'longitud']
         widgets = {
             'nombre': forms.TextInput(attrs={'class': 'form-control'}),
             'direccion': forms.TextInput(attrs={'class': 'form-control'}),
+            'latitud': forms.NumberInput(attrs={'class': 'form-control', 'step': 'any', 'placeholder': '-33.4489'}),
+            'longitud': forms.NumberInput(attrs={'class': 'form-control', 'step': 'any', 'placeholder': '-70.6693'}),
         }
 
 class UsuarioForm(forms.ModelForm):
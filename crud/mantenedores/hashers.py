@@ -0,0 +1,36 @@
+# mantenedores/hashers.py
+#
+# Hashers de contraseñas con costo configurable por despliegue (crud/settings.py).
+# Conservan el nombre de algoritmo de Django, así que verifican los hashes
+# existentes y, si el costo cambió, Django los vuelve a generar al iniciar sesión.
+
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher, BCryptSHA256PasswordHasher, PBKDF2PasswordHasher,
+)
+
+
+class PBKDF2Configurable(PBKDF2PasswordHasher):
+    @property
+    def iterations(self):
+        return getattr(settings, 'PBKDF2_ITERACIONES', None) or PBKDF2PasswordHasher.iterations
+
+
+class BCryptConfigurable(BCryptSHA256PasswordHasher):
+    @property
+    def rounds(self):
+        return getattr(settings, 'BCRYPT_ROUNDS', None) or BCryptSHA256PasswordHasher.rounds
+
+
+class Argon2Configurable(Argon2PasswordHasher):
+    @property
+    def time_cost(self):
+        return getattr(settings, 'ARGON2_TIME_COST', None) or Argon2PasswordHasher.time_cost
+
+    @property
+    def memory_cost(self):
+        return getattr(settings, 'ARGON2_MEMORY_COST', None) or Argon2PasswordHasher.memory_cost
+
+    @property
+    def parallelism(self):
+        return getattr(settings, 'ARGON2_PARALLELISM', None) or Argon2PasswordHasher.parallelism
@@ -0,0 +1,93 @@
+# mantenedores/hashing.py
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, get_hasher, identify_hasher, make_password
+from rest_framework.exceptions import APIException
+
+
+class ServicioSaturado(APIException):
+    status_code = 503
+    default_detail = "Servidor ocupado, intente nuevamente en unos segundos."
+    default_code = 'hashing_saturado'
+
+
+class PoolHashing:
+    """
+    Ejecuta los hashes de contraseña en un pool de hilos acotado.
+
+    argon2, bcrypt y PBKDF2 liberan el GIL, así que los hashes corren en
+    paralelo real; el pool limita cuántos se calculan a la vez (HILOS) y
+    cuántos pueden esperar (COLA). Si no hay cupo en `ESPERA` segundos se
+    rechaza la petición con 503 en lugar de saturar los workers.
+    Con HILOS = 0 se calcula en el hilo de la petición.
+    """
+    def __init__(self, hilos, cola, espera):
+        self.hilos = hilos
+        self.espera = espera
+        self.executor = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix='hashing') if hilos else None
+        self.cupos = threading.BoundedSemaphore(hilos + cola) if hilos else None
+
+    def ejecutar(self, funcion, *args):
+        if self.executor is None:
+            return funcion(*args)
+        if not self.cupos.acquire(timeout=self.espera):
+            raise ServicioSaturado()
+        try:
+            futuro = self.executor.submit(funcion, *args)
+        except BaseException:
+            self.cupos.release()
+            raise
+        futuro.add_done_callback(lambda _: self.cupos.release())
+        return futuro.result()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def pool_hashing():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                config = getattr(settings, 'HASH_POOL', {})
+                _pool = PoolHashing(
+                    hilos=config.get('HILOS', os.cpu_count() or 1),
+                    cola=config.get('COLA', 32),
+                    espera=config.get('ESPERA', 5),
+                )
+    return _pool
+
+
+def generar_hash(password):
+    """make_password() ejecutado en el pool."""
+    return pool_hashing().ejecutar(make_password, password)
+
+
+def requiere_actualizacion(encoded):
+    """True si el hash usa otro algoritmo o un costo distinto al configurado."""
+    try:
+        hasher = identify_hasher(encoded)
+    except ValueError:
+        return False
+    preferido = get_hasher('default')
+    return hasher.algorithm != preferido.algorithm or preferido.must_update(encoded)
+
+
+def verificar_password(usuario, password):
+    """
+    check_password() ejecutado en el pool. Si la contraseña es correcta y el
+    hash quedó desactualizado, lo regenera con la política vigente (sin
+    revocar tokens: la contraseña no cambió).
+    """
+    encoded = usuario.password
+    if not pool_hashing().ejecutar(check_password, password, encoded):
+        return False
+    if requiere_actualizacion(encoded):
+        usuario.password = generar_hash(password)
+        usuario.save(update_fields=['password'])
+    return True
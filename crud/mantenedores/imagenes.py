@@ -0,0 +1,209 @@
+# mantenedores/imagenes.py
+
+import hashlib
+import math
+from io import BytesIO
+
+from cloudinary import CloudinaryResource
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+# Lado (px) de la miniatura sobre la que se calcula el blurhash
+LADO_BLURHASH = 32
+CARACTERES_BASE83 = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~'
+
+
+def configuracion(clave):
+    return settings.IMAGENES[clave]
+
+
+# --- Blurhash (https://blurha.sh) ---
+
+def _base83(valor, largo):
+    return ''.join(CARACTERES_BASE83[(valor // 83 ** (largo - i)) % 83] for i in range(1, largo + 1))
+
+
+def _a_lineal(valor):
+    v = valor / 255
+    return v / 12.92 if v <= 0.04045 else ((v + 0.055) / 1.055) ** 2.4
+
+
+def _a_srgb(valor):
+    v = max(0.0, min(1.0, valor))
+    if v <= 0.0031308:
+        return int(v * 12.92 * 255 + 0.5)
+    return int((1.055 * v ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def _potencia_con_signo(valor, exponente):
+    return math.copysign(abs(valor) ** exponente, valor)
+
+
+def calcular_blurhash(imagen, componentes_x=4, componentes_y=3):
+    """Blurhash de una imagen RGB (conviene pasarla ya reducida)."""
+    ancho, alto = imagen.size
+    lineal = [_a_lineal(c) for c in imagen.tobytes()]
+    pixeles = [lineal[k:k + 3] for k in range(0, len(lineal), 3)]
+    cos_x = [[math.cos(math.pi * i * x / ancho) for x in range(ancho)] for i in range(componentes_x)]
+    cos_y = [[math.cos(math.pi * j * y / alto) for y in range(alto)] for j in range(componentes_y)]
+
+    factores = []
+    for j in range(componentes_y):
+        for i in range(componentes_x):
+            escala = (1 if i == j == 0 else 2) / (ancho * alto)
+            r = g = b = 0.0
+            for y in range(alto):
+                fila, base_y = y * ancho, cos_y[j][y]
+                for x in range(ancho):
+                    base = base_y * cos_x[i][x]
+                    pr, pg, pb = pixeles[fila + x]
+                    r += base * pr
+                    g += base * pg
+                    b += base * pb
+            factores.append((r * escala, g * escala, b * escala))
+
+    dc, ac = factores[0], factores[1:]
+    resultado = _base83((componentes_x - 1) + (componentes_y - 1) * 9, 1)
+    if ac:
+        maximo_real = max(abs(c) for factor in ac for c in factor)
+        maximo_cuantizado = int(max(0, min(82, math.floor(maximo_real * 166 - 0.5))))
+        maximo = (maximo_cuantizado + 1) / 166
+        resultado += _base83(maximo_cuantizado, 1)
+    else:
+        maximo = 1
+        resultado += _base83(0, 1)
+    resultado += _base83((_a_srgb(dc[0]) << 16) + (_a_srgb(dc[1]) << 8) + _a_srgb(dc[2]), 4)
+    for factor in ac:
+        r, g, b = (
+            int(max(0, min(18, math.floor(_potencia_con_signo(c / maximo, 0.5) * 9 + 9.5))))
+            for c in factor
+        )
+        resultado += _base83(r * 19 * 19 + g * 19 + b, 2)
+    return resultado
+
+
+# --- Análisis y derivadas ---
+
+class ImagenAnalizada:
+    """Imagen subida ya decodificada, orientada y medida."""
+    def __init__(self, imagen, huella):
+        self.imagen = imagen
+        self.huella = huella
+        self.ancho, self.alto = imagen.size
+        miniatura = imagen.convert('RGB')
+        miniatura.thumbnail((LADO_BLURHASH, LADO_BLURHASH))
+        componentes = (4, 3) if self.ancho >= self.alto else (3, 4)
+        self.blurhash = calcular_blurhash(miniatura, *componentes)
+
+    def anchos(self):
+        """{ancho: alto} de las derivadas: los anchos configurados menores que el original (sin agrandar)."""
+        anchos = [a for a in configuracion('ANCHOS') if a < self.ancho]
+        if self.ancho < max(configuracion('ANCHOS')):
+            anchos.append(self.ancho)
+        return {a: max(1, round(self.alto * a / self.ancho)) for a in anchos}
+
+
+def analizar_imagen(archivo):
+    """
+    Lee un archivo subido con Pillow (respetando la orientación EXIF) y deja
+    el puntero al inicio para que después se pueda subir el original.
+    Lanza ValueError si no es una imagen.
+    """
+    archivo.seek(0)
+    contenido = archivo.read()
+    archivo.seek(0)
+    try:
+        imagen = Image.open(BytesIO(contenido))
+        imagen.load()
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+        raise ValueError("El archivo no es una imagen válida.")
+    imagen = ImageOps.exif_transpose(imagen)
+    if imagen.mode not in ('RGB', 'RGBA'):
+        imagen = imagen.convert('RGBA' if 'A' in imagen.getbands() or 'transparency' in imagen.info else 'RGB')
+    return ImagenAnalizada(imagen, hashlib.sha1(contenido).hexdigest()[:20])
+
+
+def ruta_derivada(huella, ancho, formato):
+    return f"productos/derivadas/{huella}/{ancho}.{formato}"
+
+
+def generar_derivadas(analisis):
+    """Escribe con Pillow cada ancho en cada formato en el almacenamiento de archivos."""
+    calidad = configuracion('CALIDAD')
+    for ancho, alto in analisis.anchos().items():
+        reducida = analisis.imagen.resize((ancho, alto), Image.LANCZOS)
+        for formato in configuracion('FORMATOS'):
+            ruta = ruta_derivada(analisis.huella, ancho, formato)
+            if default_storage.exists(ruta):
+                continue
+            salida = BytesIO()
+            opciones = {'quality': calidad}
+            if formato == 'avif':
+                opciones['speed'] = 8
+            else:
+                opciones['method'] = 4
+            reducida.save(salida, format=formato.upper(), **opciones)
+            default_storage.save(ruta, ContentFile(salida.getvalue()))
+
+
+def aplicar_imagen(producto, analisis):
+    """
+    Guarda en `producto` (sin llamar a save) las medidas, el blurhash y las
+    derivadas del original. Con ALMACEN 'cloudinary' las derivadas son
+    transformaciones de la URL del original y no se genera ningún archivo.
+    """
+    origen = configuracion('ALMACEN')
+    if origen == 'local':
+        generar_derivadas(analisis)
+    producto.imagen_ancho = analisis.ancho
+    producto.imagen_alto = analisis.alto
+    producto.imagen_blurhash = analisis.blurhash
+    producto.imagen_derivadas = {
+        'origen': origen,
+        'huella': analisis.huella,
+        'formatos': list(configuracion('FORMATOS')),
+        'anchos': {str(ancho): alto for ancho, alto in analisis.anchos().items()},
+    }
+
+
+CAMPOS_IMAGEN = ['imagen_ancho', 'imagen_alto', 'imagen_blurhash', 'imagen_derivadas']
+
+
+def url_derivada(producto, origen, ancho, formato):
+    if origen == 'cloudinary':
+        recurso = producto.imagen if isinstance(producto.imagen, CloudinaryResource) else CloudinaryResource(producto.imagen)
+        return recurso.build_url(
+            width=ancho, crop='limit', fetch_format=formato, quality='auto', secure=True,
+        )
+    return default_storage.url(ruta_derivada(producto.imagen_derivadas['huella'], ancho, formato))
+
+
+def describir_imagen(producto):
+    """
+    Para la API: medidas, blurhash y variantes del producto, o None si la
+    imagen aún no fue procesada. `variantes` va de menor a mayor ancho y
+    `srcset` trae lo mismo en el formato del atributo HTML.
+    """
+    derivadas = producto.imagen_derivadas
+    if not producto.imagen or not derivadas:
+        return None
+    origen, formatos = derivadas['origen'], derivadas['formatos']
+    variantes = []
+    for ancho, alto in sorted((int(a), h) for a, h in derivadas['anchos'].items()):
+        variante = {'ancho': ancho, 'alto': alto}
+        for formato in formatos:
+            variante[formato] = url_derivada(producto, origen, ancho, formato)
+        variantes.append(variante)
+    return {
+        'ancho': producto.imagen_ancho,
+        'alto': producto.imagen_alto,
+        'blurhash': producto.imagen_blurhash,
+        'variantes': variantes,
+        'srcset': {
+            formato: ', '.join(f"{v[formato]} {v['ancho']}w" for v in variantes)
+            for formato in formatos
+        },
+    }
+
@@ -0,0 +1,215 @@
+# mantenedores/importacion.py
+
+import csv
+import io
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+
+from .models import Categoria, Estanteria, Pasillo, Producto
+from .estadisticas import reconciliar
+from .precios import recalcular_precios
+from .versiones import incrementar_version
+
+COLUMNAS = ['codigo', 'nombre', 'descripcion', 'categoria', 'pasillo', 'estanteria', 'precio']
+LOTE = 1000
+MAXIMO_ERRORES = 100
+
+# Límites de las columnas: una fila fuera de ellos haría fallar el lote entero en la base
+LARGO_CODIGO = Producto._meta.get_field('codigo').max_length
+_precio = Producto._meta.get_field('precio')
+MAXIMO_PRECIO = Decimal(10) ** (_precio.max_digits - _precio.decimal_places)
+CENTAVOS = Decimal(1).scaleb(-_precio.decimal_places)
+
+
+# --- Lectura ---
+
+def leer_filas(archivo, formato):
+    """
+    Recorre un archivo binario CSV o JSONL fila a fila (sin cargarlo entero)
+    y entrega tuplas (número de línea, dict).
+    """
+    texto = io.TextIOWrapper(archivo, encoding='utf-8-sig', newline='')
+    if formato == 'csv':
+        lector = csv.DictReader(texto)
+        for fila in lector:
+            yield lector.line_num, fila
+    elif formato == 'jsonl':
+        for numero, linea in enumerate(texto, start=1):
+            if linea.strip():
+                try:
+                    yield numero, json.loads(linea)
+                except json.JSONDecodeError:
+                    yield numero, None
+    else:
+        raise ValueError(f"Formato no soportado: {formato}")
+
+
+def texto(valor):
+    """Valor de una columna como texto sin espacios ('' si falta; en JSONL puede venir un número)."""
+    return '' if valor is None else str(valor).strip()
+
+
+def leer_precio(valor):
+    """Precio de una fila, validado contra max_digits/decimal_places de Producto.precio."""
+    try:
+        precio = Decimal(texto(valor))
+    except InvalidOperation:
+        raise ValueError(f"Precio inválido: {valor!r}")
+    if not precio.is_finite():
+        raise ValueError(f"Precio inválido: {valor!r}")
+    if precio < 0:
+        raise ValueError(f"Precio negativo: {valor!r}")
+    if precio >= MAXIMO_PRECIO:
+        raise ValueError(f"Precio demasiado grande (máximo {MAXIMO_PRECIO - CENTAVOS}): {valor!r}")
+    if precio != precio.quantize(CENTAVOS):
+        raise ValueError(f"Precio con más de {_precio.decimal_places} decimales: {valor!r}")
+    return precio.quantize(CENTAVOS)
+
+
+def detectar_formato(nombre_archivo, formato=None):
+    if formato:
+        return formato
+    return 'jsonl' if nombre_archivo.lower().endswith(('.jsonl', '.ndjson')) else 'csv'
+
+
+# --- Importación ---
+
+class ImportadorProductos:
+    """
+    Upsert masivo de productos por `codigo`.
+
+    Los nombres de categoría/pasillo/estantería se resuelven con diccionarios
+    en memoria cargados una vez; cada lote se escribe con un único
+    `bulk_create(update_conflicts=True)` dentro de su propia transacción.
+    Cada fila se valida antes contra los límites de las columnas, así una
+    fila mala queda en `errores` con su línea en vez de abortar la carga.
+
+    Las filas sin `codigo` no tienen con qué emparejarse: se insertan como
+    productos nuevos en cada importación (volver a importar el mismo
+    archivo los duplica).
+    """
+    def __init__(self, lote=LOTE, crear_faltantes=False):
+        self.lote = lote
+        self.crear_faltantes = crear_faltantes
+        self.mapas = {
+            Categoria: {nombre.lower(): pk for pk, nombre in Categoria.objects.values_list('id', 'nombre')},
+            Pasillo: {nombre.lower(): pk for pk, nombre in Pasillo.objects.values_list('id', 'nombre')},
+            Estanteria: {nombre.lower(): pk for pk, nombre in Estanteria.objects.values_list('id', 'nombre')},
+        }
+        self.procesadas = 0
+        self.importadas = 0
+        self.errores = []
+
+    def resolver(self, modelo, nombre):
+        nombre = texto(nombre)
+        if not nombre:
+            raise ValueError(f"Falta {modelo._meta.model_name}")
+        mapa = self.mapas[modelo]
+        pk = mapa.get(nombre.lower())
+        if pk is None:
+            if not self.crear_faltantes:
+                raise ValueError(f"{modelo._meta.model_name} '{nombre}' no existe")
+            pk = modelo.objects.create(nombre=nombre).pk
+            mapa[nombre.lower()] = pk
+        return pk
+
+    def construir(self, fila):
+        if not isinstance(fila, dict):
+            raise ValueError("Fila ilegible")
+        nombre = texto(fila.get('nombre'))
+        if not nombre:
+            raise ValueError("Falta nombre")
+        codigo = texto(fila.get('codigo'))
+        if len(codigo) > LARGO_CODIGO:
+            raise ValueError(f"Código de más de {LARGO_CODIGO} caracteres: {codigo[:LARGO_CODIGO]}...")
+        precio = leer_precio(fila.get('precio'))
+        return Producto(
+            codigo=codigo or None,
+            nombre=nombre[:100],
+            descripcion=texto(fila.get('descripcion')) or None,
+            categoria_id=self.resolver(Categoria, fila.get('categoria')),
+            pasillo_id=self.resolver(Pasillo, fila.get('pasillo')),
+            estanteria_id=self.resolver(Estanteria, fila.get('estanteria')),
+            precio=precio,
+        )
+
+    def guardar(self, productos):
+        # Un mismo código repetido dentro del lote haría fallar el ON CONFLICT
+        unicos, sin_codigo = {}, []
+        for producto in productos:
+            if producto.codigo:
+                unicos[producto.codigo] = producto
+            else:
+                sin_codigo.append(producto)
+        with transaction.atomic():
+            Producto.objects.bulk_create(
+                list(unicos.values()) + sin_codigo,
+                update_conflicts=True,
+                unique_fields=['codigo'],
+                update_fields=['nombre', 'descripcion', 'categoria', 'pasillo', 'estanteria', 'precio', 'updated_at'],
+            )
+        self.importadas += len(unicos) + len(sin_codigo)
+        # bulk_create no emite señales: el precio efectivo se recalcula aquí
+        recalcular_precios(list(Producto.objects.filter(codigo__in=list(unicos)).values_list('pk', flat=True)) +
+                           [producto.pk for producto in sin_codigo])
+
+    def importar(self, filas):
+        pendientes = []
+        for numero, fila in filas:
+            self.procesadas += 1
+            try:
+                pendientes.append(self.construir(fila))
+            except ValueError as e:
+                if len(self.errores) < MAXIMO_ERRORES:
+                    self.errores.append({'linea': numero, 'error': str(e)})
+                continue
+            if len(pendientes) >= self.lote:
+                self.guardar(pendientes)
+                pendientes = []
+        if pendientes:
+            self.guardar(pendientes)
+
+        # bulk_create no emite señales: invalidar caché/ETag/autocompletar a mano
+        if self.importadas:
+            transaction.on_commit(lambda: incrementar_version(Producto))
+            transaction.on_commit(lambda: reconciliar([Producto]))
+        return self.resumen()
+
+    def resumen(self):
+        return {
+            'procesadas': self.procesadas,
+            'importadas': self.importadas,
+            'errores': self.errores,
+        }
+
+
+# --- Exportación ---
+
+class Eco:
+    """Objeto tipo archivo cuyo write() devuelve lo escrito (para csv.writer en streaming)."""
+    def write(self, valor):
+        return valor
+
+
+def exportar_productos(formato='csv', chunk_size=2000):
+    """
+    Genera el catálogo completo línea a línea, leyendo la base con un
+    cursor (`iterator`) para no cargar la tabla en memoria.
+    """
+    filas = Producto.objects.order_by('id').values_list(
+        'codigo', 'nombre', 'descripcion', 'categoria__nombre', 'pasillo__nombre', 'estanteria__nombre', 'precio'
+    ).iterator(chunk_size=chunk_size)
+
+    if formato == 'jsonl':
+        for fila in filas:
+            datos = dict(zip(COLUMNAS, fila))
+            datos['precio'] = str(datos['precio'])
+            yield json.dumps(datos, ensure_ascii=False) + '\n'
+        return
+
+    escritor = csv.writer(Eco())
+    yield escritor.writerow(COLUMNAS)
+    for fila in filas:
+        yield escritor.writerow(fila)
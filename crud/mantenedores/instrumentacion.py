@@ -0,0 +1,277 @@
+# mantenedores/instrumentacion.py
+
+import hashlib
+import json
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger('mantenedores.instrumentacion')
+
+# Medición de la petición en curso (None fuera de una petición instrumentada)
+medicion_actual = ContextVar('medicion_actual', default=None)
+
+
+class PresupuestoExcedido(AssertionError):
+    """Una vista hizo más consultas SQL que su presupuesto declarado."""
+
+
+def configuracion(clave, defecto=None):
+    return getattr(settings, 'INSTRUMENTACION', {}).get(clave, defecto)
+
+
+def huella(sql):
+    """Identificador corto de una consulta (el SQL ya viene sin los valores de los parámetros)."""
+    return hashlib.sha1(sql.encode('utf-8')).hexdigest()[:10]
+
+
+class Medicion:
+    """
+    Consultas, tiempo de base de datos y de serialización de una petición.
+    Las consultas se capturan con `execute_wrapper`, así que funciona también
+    con DEBUG = False. Una medición anidada también suma en la que la contiene.
+    """
+    def __init__(self, padre=None):
+        self.padre = padre
+        self.consultas = 0
+        self.tiempo_bd = 0.0
+        self.tiempo_serializacion = 0.0
+        self.huellas = Counter()
+        self.sql = {}
+        self.inicio = time.perf_counter()
+        self.fin = None
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.registrar(sql, time.perf_counter() - inicio)
+
+    def registrar(self, sql, duracion):
+        clave = huella(sql)
+        medicion = self
+        while medicion is not None:
+            medicion.tiempo_bd += duracion
+            medicion.consultas += 1
+            medicion.huellas[clave] += 1
+            medicion.sql.setdefault(clave, sql)
+            medicion = medicion.padre
+
+    @property
+    def total(self):
+        return (self.fin or time.perf_counter()) - self.inicio
+
+    def repetidas(self):
+        """Consultas con el mismo SQL ejecutadas más de una vez (candidatas a N+1)."""
+        return [
+            {'huella': clave, 'veces': veces, 'sql': self.sql[clave][:300]}
+            for clave, veces in self.huellas.most_common() if veces > 1
+        ]
+
+    def server_timing(self):
+        repetidas = sum(veces - 1 for veces in self.huellas.values() if veces > 1)
+        return ', '.join([
+            f'bd;dur={self.tiempo_bd * 1000:.1f};desc="{self.consultas} consultas"',
+            f'repetidas;desc="{repetidas}"',
+            f'serializacion;dur={self.tiempo_serializacion * 1000:.1f}',
+            f'total;dur={self.total * 1000:.1f}',
+        ])
+
+
+def envoltura_consultas(execute, sql, params, many, context):
+    """
+    Wrapper permanente de cada conexión: mide solo si hay una medición en
+    curso. Como la medición viaja en una ContextVar, también cuenta las
+    consultas del ORM async, que corren en otro hilo (y otra conexión).
+    """
+    medicion = medicion_actual.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    return medicion(execute, sql, params, many, context)
+
+
+def instalar_envoltura(conexion):
+    if envoltura_consultas not in conexion.execute_wrappers:
+        conexion.execute_wrappers.append(envoltura_consultas)
+
+
+@receiver(connection_created)
+def instalar_en_conexion_nueva(sender, connection, **kwargs):
+    instalar_envoltura(connection)
+
+
+@contextmanager
+def medir_consultas():
+    """
+    Mide las consultas hechas dentro del bloque en todas las conexiones:
+
+        with medir_consultas() as medicion:
+            ...
+        medicion.consultas, medicion.repetidas()
+    """
+    for conexion in connections.all():
+        instalar_envoltura(conexion)
+    medicion = Medicion(padre=medicion_actual.get())
+    token = medicion_actual.set(medicion)
+    try:
+        yield medicion
+    finally:
+        medicion.fin = time.perf_counter()
+        medicion_actual.reset(token)
+
+
+@contextmanager
+def presupuesto_consultas(maximo, permitir_repetidas=True):
+    """
+    Ayuda para tests: falla si el bloque hace más de `maximo` consultas
+    (o, con permitir_repetidas=False, si repite alguna).
+
+        with presupuesto_consultas(3):
+            self.client.get('/api/productos/')
+    """
+    with medir_consultas() as medicion:
+        yield medicion
+    verificar_presupuesto(medicion, maximo, permitir_repetidas)
+
+
+def verificar_presupuesto(medicion, maximo, permitir_repetidas=True, nombre='bloque'):
+    if maximo is not None and medicion.consultas > maximo:
+        raise PresupuestoExcedido(
+            f"{nombre}: {medicion.consultas} consultas (presupuesto {maximo}). "
+            f"Repetidas: {json.dumps(medicion.repetidas(), ensure_ascii=False)}"
+        )
+    if not permitir_repetidas and medicion.repetidas():
+        raise PresupuestoExcedido(
+            f"{nombre}: consultas repetidas {json.dumps(medicion.repetidas(), ensure_ascii=False)}"
+        )
+
+
+def presupuesto_de(vista, request):
+    """
+    Presupuesto declarado por la vista. En un ViewSet:
+
+        presupuesto_consultas = 3                       # todas las acciones
+        presupuesto_consultas = {'list': 3, 'retrieve': 2}
+
+    Una vista de clase que atiende list y retrieve (vistas_async) usa el
+    mismo diccionario: es 'retrieve' si la ruta trae `pk`. En una vista
+    función se declara con el decorador `con_presupuesto`.
+    """
+    clase = getattr(vista, 'cls', None) or getattr(vista, 'view_class', None)
+    presupuesto = getattr(clase or vista, 'presupuesto_consultas', None)
+    if isinstance(presupuesto, dict):
+        acciones = getattr(vista, 'actions', None)
+        if acciones is None:
+            coincidencia = getattr(request, 'resolver_match', None)
+            return presupuesto.get('retrieve' if coincidencia and 'pk' in coincidencia.kwargs else 'list')
+        return presupuesto.get(acciones.get(request.method.lower()))
+    return presupuesto
+
+
+def con_presupuesto(maximo):
+    """Declara el presupuesto de consultas de una vista función."""
+    def decorador(vista):
+        vista.presupuesto_consultas = maximo
+        return vista
+    return decorador
+
+
+class SerializacionMedidaMixin:
+    """
+    Suma a la medición de la petición el tiempo pasado en `to_representation`
+    (incluye las consultas perezosas que dispare, que es donde aparecen los N+1).
+    Solo cuenta el serializer más externo para no sumar dos veces los anidados.
+    """
+    def to_representation(self, instance):
+        medicion = medicion_actual.get()
+        if medicion is None or getattr(medicion, 'serializando', False):
+            return super().to_representation(instance)
+        medicion.serializando = True
+        inicio = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            medicion.tiempo_serializacion += time.perf_counter() - inicio
+            medicion.serializando = False
+
+
+class InstrumentacionMiddleware:
+    """
+    Mide cada petición atendida por una vista de `mantenedores`:
+
+    - agrega el encabezado `Server-Timing` (si INSTRUMENTACION['HEADERS']),
+    - escribe una línea JSON en el logger 'mantenedores.instrumentacion',
+    - compara con el presupuesto de consultas de la vista; si se excede se
+      registra un warning o, con INSTRUMENTACION['ESTRICTA'] (tests), se
+      lanza PresupuestoExcedido para que el test falle.
+
+    Funciona en modo sync (WSGI) y async (ASGI) para no forzar un cambio de
+    hilo por petición en las vistas async.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.asincrono = iscoroutinefunction(get_response)
+        if self.asincrono:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.asincrono:
+            return self.__acall__(request)
+        if not configuracion('ACTIVA', True):
+            return self.get_response(request)
+
+        with medir_consultas() as medicion:
+            response = self.get_response(request)
+        return self.registrar(request, response, medicion)
+
+    async def __acall__(self, request):
+        if not configuracion('ACTIVA', True):
+            return await self.get_response(request)
+
+        with medir_consultas() as medicion:
+            response = await self.get_response(request)
+        return self.registrar(request, response, medicion)
+
+    def registrar(self, request, response, medicion):
+        coincidencia = getattr(request, 'resolver_match', None)
+        if coincidencia is None or not coincidencia.func.__module__.startswith('mantenedores'):
+            return response
+
+        presupuesto = presupuesto_de(coincidencia.func, request)
+        excedido = presupuesto is not None and medicion.consultas > presupuesto
+        response.medicion = medicion
+
+        if configuracion('HEADERS', settings.DEBUG):
+            response['Server-Timing'] = medicion.server_timing()
+
+        registro = {
+            'metodo': request.method,
+            'ruta': request.path,
+            'vista': coincidencia.view_name,
+            'estado': response.status_code,
+            'consultas': medicion.consultas,
+            'bd_ms': round(medicion.tiempo_bd * 1000, 2),
+            'serializacion_ms': round(medicion.tiempo_serializacion * 1000, 2),
+            'total_ms': round(medicion.total * 1000, 2),
+            'repetidas': medicion.repetidas()[:5],
+            'presupuesto': presupuesto,
+        }
+        if excedido:
+            logger.warning(json.dumps(registro, ensure_ascii=False))
+            if configuracion('ESTRICTA', False):
+                verificar_presupuesto(medicion, presupuesto, nombre=coincidencia.view_name)
+        else:
+            logger.info(json.dumps(registro, ensure_ascii=False))
+        return response
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from mantenedores.precios import cambio_de_dia, recalcular_precios
+
+
+class Command(BaseCommand):
+    """
+    Cambio de día de la tabla PrecioEfectivo: recalcula los productos cuya
+    promoción terminó o empieza hoy. Debe programarse a la medianoche local
+    (por ejemplo, un Cron Job de Render `0 0 * * *` con la zona horaria de
+    TIME_ZONE). Mientras no corre, las lecturas siguen siendo correctas pero
+    resuelven los productos atrasados con una consulta extra por página.
+
+    Con --todos recalcula el catálogo completo (la migración 0012 ya hace la
+    carga inicial).
+    """
+    help = 'Recalcula los precios efectivos que vencieron (rollover diario)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--todos', action='store_true', help='Recalcula todos los productos')
+        parser.add_argument('--fecha', help='Día a usar (AAAA-MM-DD); por defecto hoy')
+
+    def handle(self, *args, **options):
+        fecha = None
+        if options['fecha']:
+            fecha = parse_date(options['fecha'])
+            if fecha is None:
+                raise CommandError("Fecha inválida, use AAAA-MM-DD.")
+
+        if options['todos']:
+            escritas = recalcular_precios(fecha=fecha)
+        else:
+            escritas = cambio_de_dia(fecha=fecha)
+        self.stdout.write(self.style.SUCCESS(f"{escritas} precios recalculados."))
@@ -0,0 +1,77 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from mantenedores.benchmark import RunnerBenchmark, comparar
+from mantenedores.throttles import VentanaDeslizanteThrottle
+
+
+class Command(BaseCommand):
+    """
+    Mide latencia (p50/p95/p99) y throughput de los endpoints principales
+    sobre los datos de `generar_datos_benchmark`.
+
+    Sin --url las peticiones se hacen en el mismo proceso (Django test
+    Client) con la base configurada (SQLite o Postgres local). Con --url se
+    mide un servidor en marcha; ahí los límites de login del servidor
+    (LOGIN_RATE_IP/LOGIN_RATE_USUARIO) deben ser altos para el escenario token.
+
+    Los resultados se guardan en JSON (--salida) y se pueden comparar con
+    una corrida anterior (--comparar); el comando falla si hay regresiones.
+    """
+    help = 'Benchmark de la API: latencias p50/p95/p99 y peticiones/s'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escenarios', nargs='+', choices=RunnerBenchmark.ESCENARIOS,
+                            default=list(RunnerBenchmark.ESCENARIOS))
+        parser.add_argument('--peticiones', type=int, default=200, help='Peticiones medidas por escenario')
+        parser.add_argument('--concurrencia', type=int, default=1)
+        parser.add_argument('--calentamiento', type=int, default=10, help='Peticiones previas por hilo (no medidas)')
+        parser.add_argument('--paginas', type=int, default=100, help='Páginas distintas que se piden en los listados')
+        parser.add_argument('--url', help='Servidor a medir, p. ej. http://127.0.0.1:8000')
+        parser.add_argument('--salida', help='Archivo JSON donde guardar los resultados')
+        parser.add_argument('--comparar', help='JSON de una corrida anterior')
+        parser.add_argument('--tolerancia', type=float, default=0.15,
+                            help='Empeoramiento relativo permitido de p95 y peticiones/s')
+
+    def handle(self, *args, **options):
+        if not options['url']:
+            # En proceso se mide el costo del login, no el limitador de intentos
+            VentanaDeslizanteThrottle.THROTTLE_RATES = {'login_ip': None, 'login_usuario': None}
+
+        runner = RunnerBenchmark(
+            url=options['url'], concurrencia=max(1, options['concurrencia']), peticiones=options['peticiones'],
+            calentamiento=options['calentamiento'], paginas=options['paginas'],
+        )
+        try:
+            runner.preparar()
+        except RuntimeError as e:
+            raise CommandError(f"{e}. ¿Se ejecutó generar_datos_benchmark?")
+
+        resultados = {'entorno': runner.entorno(), 'escenarios': {}}
+        for nombre in options['escenarios']:
+            try:
+                datos = runner.ejecutar(nombre)
+            except RuntimeError as e:
+                raise CommandError(str(e))
+            resultados['escenarios'][nombre] = datos
+            estilo = self.style.WARNING if datos['errores'] else self.style.SUCCESS
+            self.stdout.write(estilo(
+                f"{nombre:<14} p50 {datos['p50_ms']} ms  p95 {datos['p95_ms']} ms  p99 {datos['p99_ms']} ms  "
+                f"{datos['rps']} pet/s  errores {datos['errores']}"
+            ))
+
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8') as archivo:
+                json.dump(resultados, archivo, indent=2, ensure_ascii=False)
+            self.stdout.write(f"Resultados guardados en {options['salida']}")
+
+        if options['comparar']:
+            try:
+                with open(options['comparar'], encoding='utf-8') as archivo:
+                    base = json.load(archivo)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"No se pudo leer {options['comparar']}: {e}")
+            regresiones = comparar(resultados, base, options['tolerancia'])
+            if regresiones:
+                raise CommandError("Regresiones:\n" + "\n".join(regresiones))
+            self.stdout.write(self.style.SUCCESS("Sin regresiones respecto a la corrida anterior."))
@@ -0,0 +1,42 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.hashers import check_password, get_hasher, make_password
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    """
+    Mide cuántas verificaciones de contraseña (el costo dominante de un
+    login) se pueden hacer por segundo con la política de hash configurada,
+    en un núcleo y usando todos los núcleos en paralelo.
+    """
+    help = 'Reporta logins/segundo por núcleo con el hasher configurado'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iteraciones', type=int, default=20)
+        parser.add_argument('--hilos', type=int, default=os.cpu_count() or 1)
+
+    def handle(self, *args, **options):
+        iteraciones = options['iteraciones']
+        hilos = options['hilos']
+        hasher = get_hasher('default')
+        encoded = make_password('benchmark-superlocaliza')
+
+        inicio = time.perf_counter()
+        for _ in range(iteraciones):
+            check_password('benchmark-superlocaliza', encoded)
+        por_nucleo = iteraciones / (time.perf_counter() - inicio)
+
+        total = iteraciones * hilos
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=hilos) as executor:
+            list(executor.map(lambda _: check_password('benchmark-superlocaliza', encoded), range(total)))
+        en_paralelo = total / (time.perf_counter() - inicio)
+
+        self.stdout.write(f"Hasher: {hasher.algorithm} ({hasher.safe_summary(encoded)})")
+        self.stdout.write(f"1 núcleo: {por_nucleo:.1f} logins/s ({1000 / por_nucleo:.1f} ms por login)")
+        self.stdout.write(self.style.SUCCESS(
+            f"{hilos} hilos: {en_paralelo:.1f} logins/s ({en_paralelo / hilos:.1f} por hilo)"
+        ))
@@ -0,0 +1,90 @@
+import asyncio
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from mantenedores.benchmark import CLIENTE_BENCH, CargaConexionesLentas, ServidorLocal
+from mantenedores.models import Cliente
+from mantenedores.serializers import ClienteTokenObtainPairSerializer
+
+# Lectura de productos equivalente en cada servidor
+RUTAS = {
+    'wsgi': '/api/productos/?page=1&page_size={page_size}',
+    'asgi': '/api/lectura/productos/?page=1&page_size={page_size}',
+}
+
+
+class Command(BaseCommand):
+    """
+    Compara la concurrencia de gunicorn (WSGI, worker gthread) contra uvicorn
+    (ASGI, vistas async de /api/lectura/) con un solo proceso cada uno, bajo
+    muchas conexiones lentas simultáneas como las de la app móvil.
+
+    Levanta cada servidor en un puerto local con la configuración actual,
+    mide peticiones/s, latencias y el RSS máximo del proceso (Linux) y los
+    detiene. Usa el cliente de `generar_datos_benchmark`.
+
+        python manage.py comparar_servidores --conexiones 1000 --lento 1
+        python manage.py comparar_servidores --conexiones 1000 --page-size 500 --kbps 100
+
+    El generador de carga corre en esta misma máquina: en equipos con pocos
+    núcleos compite por CPU con el servidor, así que conviene mirar la
+    diferencia entre servidores más que los valores absolutos.
+    """
+    help = 'Prueba de carga con conexiones lentas: gunicorn (WSGI) vs uvicorn (ASGI)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--servidores', nargs='+', choices=ServidorLocal.TIPOS, default=list(ServidorLocal.TIPOS))
+        parser.add_argument('--conexiones', type=int, default=500, help='Clientes simultáneos')
+        parser.add_argument('--duracion', type=float, default=20, help='Segundos de carga por servidor')
+        parser.add_argument('--lento', type=float, default=1.0, help='Segundos que tarda cada cliente en enviar la petición')
+        parser.add_argument('--kbps', type=float, help='Velocidad máxima de descarga de cada cliente (KB/s)')
+        parser.add_argument('--page-size', type=int, default=20, help='Productos por respuesta (tamaño del cuerpo)')
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument('--hilos', type=int, default=32, help='Hilos del worker gthread de gunicorn')
+        parser.add_argument('--puerto', type=int, default=8765)
+        parser.add_argument('--ruta', help='Ruta a pedir en todos los servidores (por defecto la lectura de productos)')
+        parser.add_argument('--salida', help='Archivo JSON donde guardar los resultados')
+
+    def handle(self, *args, **options):
+        try:
+            cliente = Cliente.objects.get(username=CLIENTE_BENCH)
+        except Cliente.DoesNotExist:
+            raise CommandError(f"No existe {CLIENTE_BENCH}. ¿Se ejecutó generar_datos_benchmark?")
+        token = str(ClienteTokenObtainPairSerializer.get_token(cliente).access_token)
+
+        resultados = {}
+        for indice, tipo in enumerate(options['servidores']):
+            servidor = ServidorLocal(tipo, options['puerto'] + indice, hilos=options['hilos'])
+            ruta = options['ruta'] or RUTAS[tipo].format(page_size=options['page_size'])
+            self.stdout.write(f"{tipo}: {' '.join(servidor.comando()[2:4])} {ruta}")
+            try:
+                servidor.iniciar()
+            except (OSError, RuntimeError) as e:
+                raise CommandError(f"No se pudo iniciar {tipo}: {e}")
+            try:
+                reposo = servidor.memoria()
+                carga = CargaConexionesLentas(
+                    servidor.puerto, ruta, token, conexiones=options['conexiones'],
+                    duracion=options['duracion'], lento=options['lento'], kbps=options['kbps'],
+                    timeout=options['timeout'],
+                )
+                # Una vuelta corta para cargar cachés y conexiones antes de medir
+                asyncio.run(CargaConexionesLentas(servidor.puerto, ruta, token, conexiones=2, duracion=1, lento=0).correr())
+                datos = asyncio.run(carga.correr(servidor))
+            finally:
+                servidor.detener()
+
+            datos['rss_mb_reposo'] = reposo[0]
+            resultados[tipo] = datos
+            estilo = self.style.WARNING if sum(datos['errores'].values()) else self.style.SUCCESS
+            self.stdout.write(estilo(
+                f"{tipo:<5} {datos['rps']} pet/s  p50 {datos['p50_ms']} ms  p95 {datos['p95_ms']} ms  "
+                f"p99 {datos['p99_ms']} ms  errores {datos['errores']}  estados {datos['estados']}  "
+                f"RSS {datos['rss_mb_reposo']} -> {datos['rss_mb_max']} MB  hilos {datos['hilos_max']}"
+            ))
+
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8') as archivo:
+                opciones = {k: options[k] for k in ('conexiones', 'duracion', 'lento', 'kbps', 'page_size', 'hilos')}
+                json.dump({'opciones': opciones, 'servidores': resultados}, archivo, indent=2, ensure_ascii=False)
+            self.stdout.write(f"Resultados guardados en {options['salida']}")
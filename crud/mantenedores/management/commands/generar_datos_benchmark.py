@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+from mantenedores.benchmark import ADMIN_BENCH, CLIENTE_BENCH, PASSWORD_BENCH, GeneradorDatos
+
+
+class Command(BaseCommand):
+    """
+    Genera el conjunto de datos grande y reproducible que usa `benchmark_api`.
+    Todo lo creado lleva el prefijo 'BENCH-'/'Bench '/'bench.' y se puede
+    borrar con --limpiar. Conviene usar una base de datos dedicada.
+    """
+    help = 'Genera productos, promociones y clientes de prueba para los benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--productos', type=int, default=100_000)
+        parser.add_argument('--promociones', type=int, default=1_000_000)
+        parser.add_argument('--clientes', type=int, default=200_000)
+        parser.add_argument('--sucursales', type=int, default=20)
+        parser.add_argument('--lote', type=int, default=5000)
+        parser.add_argument('--semilla', type=int, default=42)
+        parser.add_argument('--limpiar', action='store_true',
+                            help='Borra los datos de benchmark existentes antes de generar')
+        parser.add_argument('--solo-limpiar', action='store_true')
+
+    def handle(self, *args, **options):
+        generador = GeneradorDatos(
+            lote=options['lote'], semilla=options['semilla'],
+            salida=lambda mensaje: self.stdout.write(mensaje),
+        )
+        if options['limpiar'] or options['solo_limpiar']:
+            generador.limpiar()
+            self.stdout.write("Datos de benchmark anteriores borrados.")
+            if options['solo_limpiar']:
+                return
+        elif generador.existen():
+            raise CommandError("Ya hay datos de benchmark; use --limpiar para regenerarlos.")
+
+        generador.generar(
+            productos=options['productos'], promociones=options['promociones'],
+            clientes=options['clientes'], sucursales=options['sucursales'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Listo. Cliente: {CLIENTE_BENCH} / Admin: {ADMIN_BENCH} (contraseña '{PASSWORD_BENCH}')."
+        ))
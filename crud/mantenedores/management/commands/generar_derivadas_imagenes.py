@@ -0,0 +1,49 @@
+from io import BytesIO
+from urllib.error import URLError
+from urllib.request import urlopen
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from mantenedores.imagenes import CAMPOS_IMAGEN, aplicar_imagen, analizar_imagen
+from mantenedores.models import Producto
+from mantenedores.versiones import incrementar_version
+
+
+class Command(BaseCommand):
+    """
+    Procesa las imágenes de productos subidas antes del pipeline de
+    derivadas (o todas con --todos): descarga el original, calcula medidas
+    y blurhash y, con IMAGENES['ALMACEN'] = 'local', genera los archivos
+    WebP/AVIF. Guarda con update() (sin señales) y al final invalida los
+    ETags de productos una sola vez.
+    """
+    help = 'Genera medidas, blurhash y derivadas de las imágenes de productos ya subidas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--todos', action='store_true', help='Reprocesa también las imágenes ya procesadas')
+        parser.add_argument('--timeout', type=float, default=30, help='Segundos máximos por descarga')
+
+    def handle(self, *args, **options):
+        productos = Producto.objects.exclude(imagen__isnull=True).exclude(imagen='')
+        if not options['todos']:
+            productos = productos.filter(imagen_ancho__isnull=True)
+
+        procesadas, fallidas = 0, 0
+        for producto in productos.only('pk', 'imagen').iterator(chunk_size=200):
+            try:
+                with urlopen(producto.imagen.url, timeout=options['timeout']) as respuesta:
+                    analisis = analizar_imagen(BytesIO(respuesta.read()))
+            except (URLError, OSError, ValueError) as e:
+                fallidas += 1
+                self.stderr.write(f"Producto {producto.pk}: {e}")
+                continue
+            aplicar_imagen(producto, analisis)
+            Producto.objects.filter(pk=producto.pk).update(
+                updated_at=timezone.now(), **{campo: getattr(producto, campo) for campo in CAMPOS_IMAGEN}
+            )
+            procesadas += 1
+
+        if procesadas:
+            incrementar_version(Producto)
+        estilo = self.style.WARNING if fallidas else self.style.SUCCESS
+        self.stdout.write(estilo(f"{procesadas} imágenes procesadas, {fallidas} con error."))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from mantenedores.importacion import LOTE, ImportadorProductos, detectar_formato, leer_filas
+
+
+class Command(BaseCommand):
+    """
+    Importa (upsert por código) un catálogo de productos desde CSV o JSONL.
+    Columnas: codigo, nombre, descripcion, categoria, pasillo, estanteria, precio.
+    """
+    help = 'Importa productos masivamente desde un archivo CSV o JSONL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo')
+        parser.add_argument('--formato', choices=['csv', 'jsonl'])
+        parser.add_argument('--lote', type=int, default=LOTE)
+        parser.add_argument('--crear-faltantes', action='store_true',
+                            help='Crea las categorías/pasillos/estanterías que no existan')
+
+    def handle(self, *args, **options):
+        formato = detectar_formato(options['archivo'], options['formato'])
+        importador = ImportadorProductos(lote=options['lote'], crear_faltantes=options['crear_faltantes'])
+        try:
+            with open(options['archivo'], 'rb') as archivo:
+                resumen = importador.importar(leer_filas(archivo, formato))
+        except OSError as e:
+            raise CommandError(str(e))
+
+        for error in resumen['errores']:
+            self.stdout.write(self.style.WARNING(f"Línea {error['linea']}: {error['error']}"))
+        self.stdout.write(self.style.SUCCESS(
+            f"{resumen['importadas']} de {resumen['procesadas']} filas importadas."
+        ))
@@ -0,0 +1,42 @@
+import signal
+
+from django.core.management.base import BaseCommand, CommandError
+from mantenedores.cola import REGISTRO, Trabajador, configuracion
+
+
+class Command(BaseCommand):
+    """
+    Trabajador de la cola de tareas en la base de datos (mantenedores/cola.py):
+    subida de imágenes, importaciones diferidas, etc. No necesita broker;
+    basta con la misma DATABASE_URL que la web.
+
+        python manage.py procesar_tareas
+        python manage.py procesar_tareas --colas imagenes --hilos 2
+        python manage.py procesar_tareas --hasta-vaciar
+
+    Cada cola se atiende con TAREAS['COLAS'][cola]['concurrencia'] hilos
+    (o --hilos). SIGTERM/SIGINT terminan las tareas en curso y salen.
+    """
+    help = 'Ejecuta las tareas en segundo plano encoladas en la base de datos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--colas', nargs='+', help='Colas a atender (por defecto todas las de TAREAS)')
+        parser.add_argument('--hilos', type=int, help='Hilos por cola (por defecto su concurrencia)')
+        parser.add_argument('--espera', type=float, default=1.0, help='Segundos entre consultas con la cola vacía')
+        parser.add_argument('--hasta-vaciar', action='store_true', help='Termina cuando no quedan tareas disponibles')
+
+    def handle(self, *args, **options):
+        conocidas = set(configuracion('COLAS', {})) | {definicion.cola for definicion in REGISTRO.values()}
+        colas = options['colas'] or sorted(conocidas)
+        desconocidas = set(colas) - conocidas
+        if desconocidas:
+            raise CommandError(f"Colas desconocidas: {', '.join(sorted(desconocidas))}")
+
+        trabajador = Trabajador(colas, hilos=options['hilos'], espera=options['espera'], hasta_vaciar=options['hasta_vaciar'])
+        for senal in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(senal, lambda *_: trabajador.detener.set())
+
+        self.stdout.write(f"Trabajador {trabajador.id} atendiendo: {', '.join(colas)}")
+        trabajador.correr()
+        estilo = self.style.WARNING if trabajador.fallidas else self.style.SUCCESS
+        self.stdout.write(estilo(f"{trabajador.procesadas} tareas procesadas, {trabajador.fallidas} con error."))
@@ -0,0 +1,26 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from mantenedores.models import Eliminacion
+
+
+class Command(BaseCommand):
+    """
+    Borra los tombstones de Eliminacion más antiguos que
+    SINCRONIZACION['RETENCION_ELIMINACIONES_DIAS']; sin esto la tabla crece
+    con cada baja del catálogo. Una app que sincronice con un `since` más
+    antiguo recibe el catálogo completo. Conviene programarlo una vez al día
+    (por ejemplo, un Cron Job de Render `30 0 * * *`).
+    """
+    help = 'Borra los registros de eliminaciones que ya no necesita la sincronización'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, help='Días a conservar (por defecto los de la configuración)')
+
+    def handle(self, *args, **options):
+        dias = options['dias'] if options['dias'] is not None else settings.SINCRONIZACION['RETENCION_ELIMINACIONES_DIAS']
+        limite = timezone.now() - timedelta(days=dias)
+        borradas = Eliminacion.objects.filter(fecha__lt=limite).delete()[0]
+        self.stdout.write(self.style.SUCCESS(f"{borradas} eliminaciones purgadas."))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from mantenedores.estadisticas import reconciliar
+
+
+class Command(BaseCommand):
+    """
+    Recuenta las estadísticas precalculadas del dashboard y corrige las que
+    se desviaron de las tablas (operaciones masivas sin señales, cambios
+    hechos directo en la base, procesos caídos antes del on_commit).
+    Conviene programarlo cada hora, por ejemplo un Cron Job de Render
+    `0 * * * *`; cada métrica es un COUNT/GROUP BY sobre su tabla.
+    """
+    help = 'Recalcula los contadores del dashboard y corrige las desviaciones'
+
+    def handle(self, *args, **options):
+        corregidas = reconciliar()
+        for metrica, filas in corregidas.items():
+            estilo = self.style.WARNING if filas else self.style.SUCCESS
+            self.stdout.write(estilo(f"{metrica}: {filas} contadores corregidos"))
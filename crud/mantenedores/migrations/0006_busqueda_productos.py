@@ -0,0 +1,65 @@
+# Índices de búsqueda de productos (solo PostgreSQL).
+
+from django.contrib.postgres.operations import TrigramExtension, UnaccentExtension
+from django.db import migrations
+
+CREAR_SQL = [
+    # Configuración de texto en español que ignora acentos
+    """
+    DO $$ BEGIN
+        IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'es_unaccent') THEN
+            CREATE TEXT SEARCH CONFIGURATION es_unaccent (COPY = pg_catalog.spanish);
+            ALTER TEXT SEARCH CONFIGURATION es_unaccent
+                ALTER MAPPING FOR hword, hword_part, word WITH unaccent, spanish_stem;
+        END IF;
+    END $$;
+    """,
+    # unaccent() no es IMMUTABLE; este envoltorio permite usarlo en índices
+    """
+    CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+        AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$;
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS producto_busqueda_fts_idx ON mantenedores_producto
+        USING gin (to_tsvector('es_unaccent', nombre || ' ' || coalesce(descripcion, '')));
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS producto_nombre_trgm_idx ON mantenedores_producto
+        USING gin (f_unaccent(lower(nombre)) gin_trgm_ops);
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS categoria_nombre_trgm_idx ON mantenedores_categoria
+        USING gin (f_unaccent(lower(nombre)) gin_trgm_ops);
+    """,
+]
+
+ELIMINAR_SQL = [
+    "DROP INDEX IF EXISTS categoria_nombre_trgm_idx;",
+    "DROP INDEX IF EXISTS producto_nombre_trgm_idx;",
+    "DROP INDEX IF EXISTS producto_busqueda_fts_idx;",
+    "DROP FUNCTION IF EXISTS f_unaccent(text);",
+    "DROP TEXT SEARCH CONFIGURATION IF EXISTS es_unaccent;",
+]
+
+
+def ejecutar(sentencias):
+    def operacion(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for sql in sentencias:
+            schema_editor.execute(sql)
+    return operacion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mantenedores', '0005_versionmodelo'),
+    ]
+
+    operations = [
+        UnaccentExtension(),
+        TrigramExtension(),
+        migrations.RunPython(ejecutar(CREAR_SQL), ejecutar(ELIMINAR_SQL)),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mantenedores', '0006_busqueda_productos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UbicacionProducto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('posicion', models.PositiveIntegerField(blank=True, help_text='Posición dentro de la estantería', null=True)),
+                ('estanteria', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='mantenedores.estanteria')),
+                ('pasillo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='mantenedores.pasillo')),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ubicaciones', to='mantenedores.producto')),
+                ('sucursal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ubicaciones', to='mantenedores.sucursal')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['sucursal', 'pasillo', 'estanteria'], name='mantenedore_sucursa_fd4119_idx')],
+                'constraints': [models.UniqueConstraint(fields=('sucursal', 'producto'), name='ubicacion_unica_por_sucursal')],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mantenedores', '0007_ubicacion_producto'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NodoPasillo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('x', models.FloatField()),
+                ('y', models.FloatField()),
+                ('es_entrada', models.BooleanField(default=False, help_text='El recorrido comienza en este pasillo')),
+                ('pasillo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='mantenedores.pasillo')),
+                ('sucursal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='nodos_pasillo', to='mantenedores.sucursal')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ConexionPasillo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('distancia', models.FloatField(blank=True, null=True)),
+                ('sucursal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conexiones_pasillo', to='mantenedores.sucursal')),
+                ('destino', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='mantenedores.nodopasillo')),
+                ('origen', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='mantenedores.nodopasillo')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='nodopasillo',
+            constraint=models.UniqueConstraint(fields=('sucursal', 'pasillo'), name='nodo_pasillo_unico_por_sucursal'),
+        ),
+    ]
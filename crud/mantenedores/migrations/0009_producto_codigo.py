@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mantenedores', '0008_plano_sucursal'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='codigo',
+            field=models.CharField(blank=True, help_text='SKU / código del proveedor', max_length=50, null=True, unique=True),
+        ),
+    ]
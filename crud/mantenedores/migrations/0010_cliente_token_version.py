@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mantenedores', '0009_producto_codigo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cliente',
+            name='token_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,78 @@
+# Índices para las consultas de promociones vigentes y restricciones de fechas.
+# La restricción de exclusión (sin solapes por producto) es solo de PostgreSQL.
+
+import django.db.models.deletion
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.db import migrations, models
+from django.db.models import Exists, F, OuterRef
+
+CREAR_SQL = [
+    """
+    ALTER TABLE mantenedores_promocion ADD CONSTRAINT promocion_sin_solape
+        EXCLUDE USING gist (producto_id WITH =, daterange(fecha_inicio, fecha_fin, '[]') WITH &&);
+    """,
+]
+
+ELIMINAR_SQL = [
+    "ALTER TABLE mantenedores_promocion DROP CONSTRAINT IF EXISTS promocion_sin_solape;",
+]
+
+
+def ejecutar(sentencias):
+    def operacion(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for sql in sentencias:
+            schema_editor.execute(sql)
+    return operacion
+
+
+def verificar_datos(apps, schema_editor):
+    """Falla con un mensaje claro si hay datos que impiden crear las restricciones."""
+    Promocion = apps.get_model('mantenedores', 'Promocion')
+    invertidas = list(Promocion.objects.filter(fecha_fin__lt=F('fecha_inicio')).values_list('id', flat=True)[:20])
+    if invertidas:
+        raise RuntimeError(f"Promociones con fecha_fin anterior a fecha_inicio (corregir antes de migrar): {invertidas}")
+
+    otra = Promocion.objects.filter(
+        producto_id=OuterRef('producto_id'),
+        fecha_inicio__lte=OuterRef('fecha_fin'),
+        fecha_fin__gte=OuterRef('fecha_inicio'),
+    ).exclude(pk=OuterRef('pk'))
+    solapadas = list(Promocion.objects.filter(Exists(otra)).values_list('id', flat=True)[:20])
+    if solapadas:
+        raise RuntimeError(f"Promociones con fechas cruzadas en un mismo producto (corregir antes de migrar): {solapadas}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mantenedores', '0010_cliente_token_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='promocion',
+            index=models.Index(fields=['producto', 'fecha_inicio', 'fecha_fin'], name='promocion_producto_fechas_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='promocion',
+            index=models.Index(fields=['fecha_fin', 'fecha_inicio'], name='promocion_vigencia_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='promocion',
+            index=models.Index(fields=['fecha_inicio'], name='promocion_inicio_idx'),
+        ),
+        migrations.AlterField(
+            model_name='promocion',
+            name='producto',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='mantenedores.producto'),
+        ),
+        migrations.RunPython(verificar_datos, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='promocion',
+            constraint=models.CheckConstraint(condition=models.Q(('fecha_fin__gte', models.F('fecha_inicio'))), name='promocion_fechas_validas'),
+        ),
+        BtreeGistExtension(),
+        migrations.RunPython(ejecutar(CREAR_SQL), ejecutar(ELIMINAR_SQL)),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:55
+
+from datetime import timedelta
+from decimal import ROUND_HALF_UP, Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+LOTE = 2000
+
+
+def calcular_precios(apps, schema_editor):
+    """
+    Llena la tabla con el catálogo existente, para no servir la consulta de
+    respaldo por producto hasta la primera corrida de actualizar_precios_efectivos.
+    Mismo cálculo que precios.recalcular_precios(), pero con los modelos
+    históricos: no depende de cómo evolucione el código de la app.
+    """
+    Producto = apps.get_model('mantenedores', 'Producto')
+    Promocion = apps.get_model('mantenedores', 'Promocion')
+    PrecioEfectivo = apps.get_model('mantenedores', 'PrecioEfectivo')
+
+    hoy = timezone.localdate()
+    vigente = Promocion.objects.filter(
+        producto=OuterRef('pk'), fecha_inicio__lte=hoy, fecha_fin__gte=hoy,
+    ).order_by('pk')
+    siguiente = Promocion.objects.filter(producto=OuterRef('pk'), fecha_inicio__gt=hoy).order_by('fecha_inicio')
+    filas = Producto.objects.annotate(
+        promo_id=Subquery(vigente.values('pk')[:1]),
+        promo_descuento=Subquery(vigente.values('descuento')[:1]),
+        promo_fin=Subquery(vigente.values('fecha_fin')[:1]),
+        proximo_inicio=Subquery(siguiente.values('fecha_inicio')[:1]),
+    ).order_by('pk').values_list('pk', 'precio', 'promo_id', 'promo_descuento', 'promo_fin', 'proximo_inicio')
+
+    pendientes = []
+    for pk, precio, promo_id, descuento, fin, proximo in filas.iterator(chunk_size=LOTE):
+        hasta = [f for f in (fin, proximo - timedelta(days=1) if proximo else None) if f is not None]
+        con_descuento = precio if descuento is None else (
+            (precio - precio * descuento / 100).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+        )
+        pendientes.append(PrecioEfectivo(
+            producto_id=pk,
+            precio_base=precio,
+            precio=con_descuento,
+            descuento=descuento,
+            promocion_id=promo_id,
+            vigente_hasta=min(hasta) if hasta else None,
+        ))
+        if len(pendientes) >= LOTE:
+            PrecioEfectivo.objects.bulk_create(pendientes)
+            pendientes = []
+    PrecioEfectivo.objects.bulk_create(pendientes)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mantenedores', '0011_promocion_indices_vigencia'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PrecioEfectivo',
+            fields=[
+                ('producto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='precio_efectivo', serialize=False, to='mantenedores.producto')),
+                ('precio_base', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('precio', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('descuento', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('vigente_hasta', models.DateField(blank=True, db_index=True, null=True)),
+                ('calculado', models.DateTimeField(auto_now=True)),
+                ('promocion', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='mantenedores.promocion')),
+            ],
+        ),
+        migrations.RunPython(calcular_precios, migrations.RunPython.noop),
+    ]
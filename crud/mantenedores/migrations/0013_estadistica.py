@@ -0,0 +1,67 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:25
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncWeek
+
+
+def cargar_contadores(apps, schema_editor):
+    """
+    Cuenta los datos existentes antes de que las señales empiecen a sumar
+    deltas: sin esto el primer guardado crea el contador en 1. Son las
+    métricas de estadisticas.METRICAS a esta altura, recontadas con los
+    modelos históricos; las que se agreguen después las carga reconciliar()
+    (comando reconciliar_estadisticas).
+    """
+    Estadistica = apps.get_model('mantenedores', 'Estadistica')
+
+    def modelo(nombre):
+        return apps.get_model('mantenedores', nombre).objects
+
+    def por_campo(queryset, campo, expresion=None):
+        filas = (
+            queryset.filter(**{f'{campo}__isnull': False})
+            .annotate(d=expresion or models.F(campo))
+            .values('d').annotate(n=Count('pk')).order_by()
+        )
+        return {str(fila['d']): fila['n'] for fila in filas}
+
+    metricas = {
+        'productos': {'': modelo('Producto').count()},
+        'promociones': {'': modelo('Promocion').count()},
+        'proveedores': {'': modelo('Proveedor').count()},
+        'clientes': {'': modelo('Cliente').count()},
+        'sucursales': {'': modelo('Sucursal').count()},
+        'productos_categoria': por_campo(modelo('Producto'), 'categoria_id'),
+        'productos_sucursal': por_campo(modelo('UbicacionProducto'), 'sucursal_id'),
+        'promociones_semana': por_campo(modelo('Promocion'), 'fecha_inicio', TruncWeek('fecha_inicio')),
+    }
+    Estadistica.objects.bulk_create([
+        Estadistica(metrica=metrica, dimension=dimension, valor=valor)
+        for metrica, valores in metricas.items()
+        for dimension, valor in valores.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mantenedores', '0012_precio_efectivo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Estadistica',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metrica', models.CharField(max_length=50)),
+                ('dimension', models.CharField(blank=True, default='', max_length=50)),
+                ('valor', models.BigIntegerField(default=0)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('metrica', 'dimension'), name='estadistica_unica')],
+            },
+        ),
+        migrations.RunPython(cargar_contadores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mantenedores', '0013_estadistica'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='imagen_alto',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='imagen_ancho',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='imagen_blurhash',
+            field=models.CharField(blank=True, default='', max_length=60),
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='imagen_derivadas',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:40
+
+import django.core.validators
+from django.db import migrations, models
+
+# Índice KNN para CERCANIA['MOTOR'] = 'postgis'. Solo se crea si la extensión
+# postgis ya está instalada; la expresión debe coincidir con GEOGRAFIA_SQL
+# de cercania.py para que el planificador lo use.
+CREAR_SQL = """
+    CREATE INDEX IF NOT EXISTS sucursal_geografia_idx ON mantenedores_sucursal USING gist (
+        (geography(ST_SetSRID(ST_MakePoint(longitud::float8, latitud::float8), 4326)))
+    ) WHERE latitud IS NOT NULL AND longitud IS NOT NULL;
+"""
+
+ELIMINAR_SQL = "DROP INDEX IF EXISTS sucursal_geografia_idx;"
+
+
+def hay_postgis(connection):
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'postgis'")
+        return cursor.fetchone() is not None
+
+
+def crear_indice(apps, schema_editor):
+    if hay_postgis(schema_editor.connection):
+        schema_editor.execute(CREAR_SQL)
+
+
+def eliminar_indice(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(ELIMINAR_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mantenedores', '0015_tarea'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sucursal',
+            name='latitud',
+            field=models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True, validators=[django.core.validators.MinValueValidator(-90), django.core.validators.MaxValueValidator(90)]),
+        ),
+        migrations.AddField(
+            model_name='sucursal',
+            name='longitud',
+            field=models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True, validators=[django.core.validators.MinValueValidator(-180), django.core.validators.MaxValueValidator(180)]),
+        ),
+        migrations.RunPython(crear_indice, eliminar_indice),
+    ]
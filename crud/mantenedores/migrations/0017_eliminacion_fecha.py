@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mantenedores', '0016_sucursal_coordenadas'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='eliminacion',
+            index=models.Index(fields=['fecha'], name='eliminacion_fecha_idx'),
+        ),
+    ]
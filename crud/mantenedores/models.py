@@ -1,29 +1,83 @@
+from decimal import ROUND_HALF_UP, Decimal
+
 from django.utils import timezone
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.contrib.auth.models import AbstractUser, Group, Permission
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
+from django.contrib.auth.hashers import check_password, make_password
 from django.db import models
+from django.db.models import Case, F, FilteredRelation, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.utils.functional import cached_property
 from cloudinary.models import CloudinaryField
 
+from .imagenes import describir_imagen
+
 class Categoria(models.Model):
     nombre = models.CharField(max_length=100)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return self.nombre
     
 class Estanteria(models.Model):
     nombre = models.CharField(max_length=100)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return self.nombre
     
 class Pasillo(models.Model):
     nombre = models.CharField(max_length=100)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return self.nombre
 
+def calcular_precio(precio, descuento):
+    """Precio con `descuento` (%) aplicado, redondeado a 2 decimales."""
+    if descuento is None:
+        return precio
+    return (precio - precio * descuento / 100).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+class ProductoQuerySet(models.QuerySet):
+    def con_promocion_activa(self, fecha=None):
+        """
+        Anota en cada producto el descuento de su promoción vigente
+        (`descuento_vigente`) usando una sola subconsulta para todo el queryset.
+        """
+        hoy = fecha or timezone.now().date()
+        vigentes = Promocion.objects.filter(
+            producto=OuterRef('pk'),
+            fecha_inicio__lte=hoy,
+            fecha_fin__gte=hoy
+        ).order_by('pk')
+        return self.annotate(descuento_vigente=Subquery(vigentes.values('descuento')[:1]))
+
+    def ubicados_en(self, sucursal_id):
+        """
+        Anota pasillo/estantería/posición de cada producto en una sucursal,
+        usando la ubicación general del producto si la sucursal no tiene una
+        propia. Todo se resuelve con un único SELECT con LEFT JOIN.
+        """
+        return self.annotate(
+            ubicacion_sucursal=FilteredRelation(
+                'ubicaciones', condition=Q(ubicaciones__sucursal_id=sucursal_id)
+            ),
+        ).annotate(
+            pasillo_nombre=Coalesce(F('ubicacion_sucursal__pasillo__nombre'), F('pasillo__nombre')),
+            estanteria_nombre=Coalesce(F('ubicacion_sucursal__estanteria__nombre'), F('estanteria__nombre')),
+            pasillo_ubicado_id=Coalesce(F('ubicacion_sucursal__pasillo_id'), F('pasillo_id')),
+            posicion=F('ubicacion_sucursal__posicion'),
+            origen_ubicacion=Case(
+                When(ubicacion_sucursal__id__isnull=False, then=Value('sucursal')),
+                default=Value('general'),
+            ),
+        )
+
 class Producto(models.Model):
+    codigo = models.CharField(max_length=50, unique=True, blank=True, null=True, help_text="SKU / código del proveedor")
     nombre = models.CharField(max_length=100)
     descripcion = models.TextField(blank=True, null=True)
     categoria = models.ForeignKey(Categoria, on_delete=models.CASCADE)
@@ -31,31 +85,84 @@ class Producto(models.Model):
     pasillo = models.ForeignKey(Pasillo, on_delete=models.CASCADE)
     precio = models.DecimalField(max_digits=10, decimal_places=2)
     imagen = CloudinaryField('image', blank=True, null=True)
+    # Medidas del original, placeholder y derivadas por ancho (ver imagenes.py)
+    imagen_ancho = models.PositiveIntegerField(blank=True, null=True)
+    imagen_alto = models.PositiveIntegerField(blank=True, null=True)
+    imagen_blurhash = models.CharField(max_length=60, blank=True, default='')
+    imagen_derivadas = models.JSONField(blank=True, default=dict)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = ProductoQuerySet.as_manager()
+
+    @cached_property
+    def imagen_info(self):
+        """Medidas, blurhash y variantes de la imagen (None si no fue procesada)."""
+        return describir_imagen(self)
+
+    def precio_efectivo_vigente(self):
+        """
+        Fila de PrecioEfectivo del producto si sigue siendo válida hoy, o None
+        si no existe o quedó atrasada (cambio de día antes del rollover, o un
+        cambio de precio aún no recalculado). Para no consultar por producto
+        hay que cargarla con `select_related('precio_efectivo')`.
+        """
+        try:
+            efectivo = self.precio_efectivo
+        except PrecioEfectivo.DoesNotExist:
+            return None
+        if efectivo.precio_base != self.precio:
+            return None
+        if efectivo.vigente_hasta is not None and efectivo.vigente_hasta < timezone.localdate():
+            return None
+        return efectivo
+
+    @property
+    def descuento_activo(self):
+        """
+        Descuento (%) de la promoción vigente o None.
+        Usa la anotación de `con_promocion_activa()`, el valor resuelto por
+        `precios.completar_descuentos()` o la tabla PrecioEfectivo si están
+        disponibles; si no, consulta una sola vez y guarda el resultado en la
+        instancia.
+        """
+        if 'descuento_vigente' not in self.__dict__:
+            efectivo = self.precio_efectivo_vigente()
+            if efectivo is not None:
+                self.descuento_vigente = efectivo.descuento
+                return self.descuento_vigente
+            hoy = timezone.now().date()
+            self.descuento_vigente = Promocion.objects.filter(
+                producto=self,
+                fecha_inicio__lte=hoy,
+                fecha_fin__gte=hoy
+            ).order_by('pk').values_list('descuento', flat=True).first()
+        return self.descuento_vigente
 
     @property
     def precio_con_descuento(self):
-        hoy = timezone.now().date()
-        promocion_activa = Promocion.objects.filter(
-            producto=self,
-            fecha_inicio__lte=hoy,
-            fecha_fin__gte=hoy
-        ).first()
-        if promocion_activa:
-            return self.precio - (self.precio * (promocion_activa.descuento / 100))
+        efectivo = self.precio_efectivo_vigente() if 'descuento_vigente' not in self.__dict__ else None
+        if efectivo is not None:
+            return efectivo.precio
+        descuento = self.descuento_activo
+        if descuento is not None:
+            return calcular_precio(self.precio, descuento)
         return self.precio
 
     def __str__(self):
         return self.nombre
 
 class ClienteManager(BaseUserManager):
-    def create_user(self, username, email, password=None, **extra_fields):
+    def create_user(self, username, email, password=None, password_hash=None, **extra_fields):
         if not username:
             raise ValueError("El usuario debe tener un username")
         if not email:
             raise ValueError("El usuario debe tener un email")
         email = self.normalize_email(email)
         user = self.model(username=username, email=email, **extra_fields)
-        user.set_password(password)  # Hashea la contraseña
+        if password_hash:
+            user.asignar_password_hash(password_hash)  # Hash ya calculado (ver hashing.py)
+        else:
+            user.set_password(password)  # Hashea la contraseña
         user.save(using=self._db)
         return user
 
@@ -74,22 +181,102 @@ class Cliente(AbstractBaseUser, PermissionsMixin):
     fecha_registro = models.DateTimeField(auto_now_add=True)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    # Se incrementa al cambiar la contraseña: invalida los tokens ya emitidos
+    token_version = models.PositiveIntegerField(default=0)
 
     objects = ClienteManager()
 
     USERNAME_FIELD = 'username'
     REQUIRED_FIELDS = ['email']
 
+    def set_password(self, raw_password):
+        self.asignar_password_hash(make_password(raw_password))
+
+    def asignar_password_hash(self, encoded):
+        """Asigna una contraseña ya hasheada y revoca los tokens emitidos."""
+        self.password = encoded
+        self.token_version += 1
+
+    def check_password(self, raw_password):
+        # Igual que AbstractBaseUser, pero el rehash por cambio de política
+        # no cuenta como cambio de contraseña (no revoca tokens).
+        def setter(raw_password):
+            self.password = make_password(raw_password)
+            self.save(update_fields=['password'])
+        return check_password(raw_password, self.password, setter)
+
     def __str__(self):
         return f"{self.nombre} {self.apellido}"
 
 class Sucursal(models.Model):
     nombre = models.CharField(max_length=100)
     direccion = models.CharField(max_length=200)
+    # Coordenadas WGS84 para buscar las sucursales cercanas (ver cercania.py)
+    latitud = models.DecimalField(
+        max_digits=9, decimal_places=6, blank=True, null=True,
+        validators=[MinValueValidator(-90), MaxValueValidator(90)],
+    )
+    longitud = models.DecimalField(
+        max_digits=9, decimal_places=6, blank=True, null=True,
+        validators=[MinValueValidator(-180), MaxValueValidator(180)],
+    )
+
+    def clean(self):
+        super().clean()
+        if (self.latitud is None) != (self.longitud is None):
+            raise ValidationError("Indique latitud y longitud, o ninguna de las dos.")
 
     def __str__(self):
         return self.nombre
 
+class UbicacionProducto(models.Model):
+    """Ubicación de un producto dentro de una sucursal específica."""
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='ubicaciones')
+    sucursal = models.ForeignKey(Sucursal, on_delete=models.CASCADE, related_name='ubicaciones')
+    pasillo = models.ForeignKey(Pasillo, on_delete=models.CASCADE)
+    estanteria = models.ForeignKey(Estanteria, on_delete=models.CASCADE)
+    posicion = models.PositiveIntegerField(blank=True, null=True, help_text="Posición dentro de la estantería")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['sucursal', 'producto'], name='ubicacion_unica_por_sucursal'),
+        ]
+        indexes = [
+            models.Index(fields=['sucursal', 'pasillo', 'estanteria']),
+        ]
+
+    def __str__(self):
+        return f"{self.producto} @ {self.sucursal}: {self.pasillo} / {self.estanteria}"
+
+class NodoPasillo(models.Model):
+    """Posición (en metros, sobre el plano) de un pasillo en una sucursal."""
+    sucursal = models.ForeignKey(Sucursal, on_delete=models.CASCADE, related_name='nodos_pasillo')
+    pasillo = models.ForeignKey(Pasillo, on_delete=models.CASCADE)
+    x = models.FloatField()
+    y = models.FloatField()
+    es_entrada = models.BooleanField(default=False, help_text="El recorrido comienza en este pasillo")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['sucursal', 'pasillo'], name='nodo_pasillo_unico_por_sucursal'),
+        ]
+
+    def __str__(self):
+        return f"{self.pasillo} @ {self.sucursal} ({self.x}, {self.y})"
+
+class ConexionPasillo(models.Model):
+    """
+    Pasillos conectados directamente (se puede caminar de uno a otro).
+    Si no se indica distancia se usa la distancia entre sus coordenadas.
+    """
+    sucursal = models.ForeignKey(Sucursal, on_delete=models.CASCADE, related_name='conexiones_pasillo')
+    origen = models.ForeignKey(NodoPasillo, on_delete=models.CASCADE, related_name='+')
+    destino = models.ForeignKey(NodoPasillo, on_delete=models.CASCADE, related_name='+')
+    distancia = models.FloatField(blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.origen.pasillo} <-> {self.destino.pasillo}"
+
 class Usuario(AbstractUser):
     # Campos adicionales opcionales
     rol = models.CharField(max_length=50, choices=[('admin', 'Administrador'), ('staff', 'Staff')], default='staff')
@@ -132,7 +319,8 @@ class Proveedor(models.Model):
 class Promocion(models.Model):
     nombre = models.CharField(max_length=100)
     descripcion = models.TextField(blank=True, null=True)
-    producto = models.ForeignKey(Producto, on_delete=models.CASCADE)
+    # Sin índice propio: lo cubre promocion_producto_fechas_idx (producto es su primera columna)
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, db_index=False)
     descuento = models.DecimalField(
     max_digits=5, 
     decimal_places=2, 
@@ -140,13 +328,173 @@ class Promocion(models.Model):
     help_text="Descuento en %")
     fecha_inicio = models.DateField()
     fecha_fin = models.DateField()
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            # Promoción vigente de un producto (con_promocion_activa, descuento_activo)
+            models.Index(fields=['producto', 'fecha_inicio', 'fecha_fin'], name='promocion_producto_fechas_idx'),
+            # Promociones vigentes/futuras de todo el catálogo: el rango fecha_fin >= hoy
+            # recorre solo las no vencidas, que son una parte pequeña del historial
+            models.Index(fields=['fecha_fin', 'fecha_inicio'], name='promocion_vigencia_idx'),
+            # Promociones que empezaron desde una fecha (sincronización incremental)
+            models.Index(fields=['fecha_inicio'], name='promocion_inicio_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(condition=Q(fecha_fin__gte=F('fecha_inicio')), name='promocion_fechas_validas'),
+            # En PostgreSQL además existe la restricción de exclusión promocion_sin_solape
+            # (ver migración 0011): un producto no puede tener dos promociones con fechas cruzadas.
+        ]
+
     @property
     def is_active(self):
         """Devuelve True si la promoción está actualmente vigente."""
         hoy = timezone.now().date()
         return self.fecha_inicio <= hoy <= self.fecha_fin
 
+    def solapadas(self):
+        """Otras promociones del mismo producto cuyas fechas se cruzan con las de esta."""
+        return Promocion.objects.filter(
+            producto_id=self.producto_id,
+            fecha_inicio__lte=self.fecha_fin,
+            fecha_fin__gte=self.fecha_inicio,
+        ).exclude(pk=self.pk)
+
+    def validar_fechas(self):
+        """Reglas de clean() que no consultan la base."""
+        if self.fecha_fin < self.fecha_inicio:
+            raise ValidationError({'fecha_fin': "La fecha de fin no puede ser anterior a la fecha de inicio."})
+
+    def clean(self):
+        super().clean()
+        if self.fecha_inicio is None or self.fecha_fin is None:
+            return
+        self.validar_fechas()
+        if self.producto_id is not None:
+            otra = self.solapadas().order_by('fecha_inicio').first()
+            if otra is not None:
+                raise ValidationError(otra.aviso_solape())
+
+    def aviso_solape(self):
+        """Mensaje de validación para otra promoción que se cruza con esta."""
+        return (
+            f"El producto ya tiene la promoción '{self.nombre}' entre "
+            f"{self.fecha_inicio:%d/%m/%Y} y {self.fecha_fin:%d/%m/%Y}."
+        )
+
     def __str__(self):
         return f"{self.nombre} ({self.descuento}%)"
+
+class PrecioEfectivo(models.Model):
+    """
+    Precio final precalculado de cada producto (precio base con la promoción
+    vigente aplicada). Se recalcula al cambiar un producto o una promoción
+    (signals.py) y en el cambio de día (comando actualizar_precios_efectivos).
+    `vigente_hasta` es el último día en que la fila es válida: el fin de la
+    promoción vigente o el día antes de que empiece la siguiente.
+    """
+    producto = models.OneToOneField(Producto, on_delete=models.CASCADE, primary_key=True, related_name='precio_efectivo')
+    precio_base = models.DecimalField(max_digits=10, decimal_places=2)
+    precio = models.DecimalField(max_digits=10, decimal_places=2)
+    descuento = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    promocion = models.ForeignKey(Promocion, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    vigente_hasta = models.DateField(null=True, blank=True, db_index=True)
+    calculado = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.producto_id}: {self.precio}"
+
+class Eliminacion(models.Model):
+    """
+    Registro (tombstone) de un objeto del catálogo eliminado, para que la
+    sincronización incremental de la app pueda informar las bajas.
+    """
+    modelo = models.CharField(max_length=50)
+    objeto_id = models.BigIntegerField()
+    fecha = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['modelo', 'fecha']),
+            # Sincronización (fecha > since) y purgar_eliminaciones (fecha < límite)
+            models.Index(fields=['fecha'], name='eliminacion_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.modelo} #{self.objeto_id}"
+
+class VersionModelo(models.Model):
+    """
+    Contador de versión por modelo. Se incrementa al guardar/eliminar
+    (ver signals.py) y sirve para generar ETag/Last-Modified de la API.
+    """
+    modelo = models.CharField(max_length=50, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    actualizado = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.modelo} v{self.version}"
+
+class Estadistica(models.Model):
+    """
+    Contador precalculado para el dashboard (ver estadisticas.py): una fila
+    por métrica y dimensión (id de categoría/sucursal, semana o '' para el
+    total). Lo mantienen las señales al confirmar cada transacción y lo
+    corrige el comando reconciliar_estadisticas.
+    """
+    metrica = models.CharField(max_length=50)
+    dimension = models.CharField(max_length=50, blank=True, default='')
+    valor = models.BigIntegerField(default=0)
+    actualizado = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['metrica', 'dimension'], name='estadistica_unica'),
+        ]
+
+    def __str__(self):
+        return f"{self.metrica}[{self.dimension}] = {self.valor}"
+
+class Tarea(models.Model):
+    """
+    Trabajo en segundo plano (ver cola.py): lo encolan las vistas y lo
+    ejecuta el comando procesar_tareas. `adjunto` lleva el archivo subido que
+    el trabajo necesita, así la cola solo depende de la base de datos; se
+    vacía cuando la tarea termina, completada o fallida.
+    """
+    PENDIENTE = 'pendiente'
+    EN_CURSO = 'en_curso'
+    COMPLETADA = 'completada'
+    FALLIDA = 'fallida'
+    ESTADOS = [
+        (PENDIENTE, 'Pendiente'),
+        (EN_CURSO, 'En curso'),
+        (COMPLETADA, 'Completada'),
+        (FALLIDA, 'Fallida'),
+    ]
+
+    cola = models.CharField(max_length=50, default='default')
+    nombre = models.CharField(max_length=100)
+    argumentos = models.JSONField(default=dict, blank=True)
+    adjunto = models.BinaryField(null=True, blank=True)
+    prioridad = models.SmallIntegerField(default=0, help_text="Las de mayor prioridad se toman primero")
+    estado = models.CharField(max_length=20, choices=ESTADOS, default=PENDIENTE)
+    intentos = models.PositiveSmallIntegerField(default=0)
+    max_intentos = models.PositiveSmallIntegerField(default=3)
+    disponible_desde = models.DateTimeField(default=timezone.now)
+    # Fin del plazo de visibilidad: si vence sin terminar, otro trabajador la retoma
+    bloqueada_hasta = models.DateTimeField(null=True, blank=True)
+    trabajador = models.CharField(max_length=100, blank=True, default='')
+    resultado = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default='')
+    creada = models.DateTimeField(auto_now_add=True)
+    terminada = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Siguiente tarea de una cola: pendientes por prioridad y antigüedad
+            models.Index(fields=['cola', 'estado', '-prioridad', 'disponible_desde'], name='tarea_siguiente_idx'),
+        ]
+
     def __str__(self):
-        return f"{self.nombre} ({self.descuento}%)"
\ No newline at end of file
+        return f"{self.nombre} #{self.pk} ({self.estado})"
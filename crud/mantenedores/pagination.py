@@ -0,0 +1,63 @@
+# mantenedores/pagination.py
+
+from rest_framework.pagination import BasePagination, CursorPagination, PageNumberPagination
+
+
+class PaginaPagination(PageNumberPagination):
+    """
+    Paginación por número de página: ?page=3&page_size=50
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+class IdCursorPagination(CursorPagination):
+    """
+    Paginación keyset estable sobre `id`: ?paginacion=cursor y luego ?cursor=...
+    No usa OFFSET, por lo que el costo por página no crece con la tabla.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = 'id'
+
+
+class MantenedoresPagination(BasePagination):
+    """
+    Paginación por defecto de los ViewSets de la API.
+
+    Es opcional para no romper a los clientes que esperan una lista completa
+    (la app móvil actual): sin parámetros de paginación se devuelve la lista
+    tal cual. Con ?cursor= o ?paginacion=cursor se usa el modo keyset; con
+    ?page= o ?page_size= se usa la paginación por número de página.
+    """
+    def __init__(self):
+        self.pagina = PaginaPagination()
+        self.cursor = IdCursorPagination()
+        self.activa = None
+
+    def elegir(self, request):
+        params = request.query_params
+        if 'cursor' in params or params.get('paginacion') == 'cursor':
+            return self.cursor
+        if 'page' in params or 'page_size' in params or params.get('paginacion') == 'pagina':
+            return self.pagina
+        return None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.activa = self.elegir(request)
+        if self.activa is None:
+            return None
+        if self.activa is self.pagina and not queryset.ordered:
+            queryset = queryset.order_by('id')
+        return self.activa.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.activa.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return self.pagina.get_paginated_response_schema(schema)
+
+    def get_schema_operation_parameters(self, view):
+        return self.pagina.get_schema_operation_parameters(view)
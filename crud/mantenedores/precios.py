@@ -0,0 +1,139 @@
+# mantenedores/precios.py
+
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import OuterRef, QuerySet, Subquery
+from django.utils import timezone
+
+from .models import PrecioEfectivo, Producto, Promocion, calcular_precio
+from .versiones import incrementar_version
+
+LOTE = 2000
+
+
+def recalcular_precios(productos=None, fecha=None, lote=LOTE):
+    """
+    Recalcula (upsert) la fila de PrecioEfectivo de `productos`: un queryset
+    de Producto, una lista de ids o None para todo el catálogo. La promoción
+    vigente se elige igual que en `con_promocion_activa()`.
+    Devuelve la cantidad de filas escritas.
+    """
+    hoy = fecha or timezone.localdate()
+    if productos is None:
+        queryset = Producto.objects.all()
+    elif isinstance(productos, QuerySet):
+        queryset = productos
+    else:
+        # Por tramos para no armar un IN con demasiados parámetros
+        ids = sorted({pk for pk in productos if pk is not None})
+        return sum(
+            recalcular_precios(Producto.objects.filter(pk__in=ids[i:i + lote]), fecha=hoy, lote=lote)
+            for i in range(0, len(ids), lote)
+        )
+
+    vigente = Promocion.objects.filter(
+        producto=OuterRef('pk'), fecha_inicio__lte=hoy, fecha_fin__gte=hoy,
+    ).order_by('pk')
+    siguiente = Promocion.objects.filter(producto=OuterRef('pk'), fecha_inicio__gt=hoy).order_by('fecha_inicio')
+    filas = queryset.annotate(
+        promo_id=Subquery(vigente.values('pk')[:1]),
+        promo_descuento=Subquery(vigente.values('descuento')[:1]),
+        promo_fin=Subquery(vigente.values('fecha_fin')[:1]),
+        proximo_inicio=Subquery(siguiente.values('fecha_inicio')[:1]),
+    ).order_by('pk').values_list('pk', 'precio', 'promo_id', 'promo_descuento', 'promo_fin', 'proximo_inicio')
+
+    escritas, pendientes = 0, []
+    for pk, precio, promo_id, descuento, fin, proximo in filas.iterator(chunk_size=lote):
+        hasta = [f for f in (fin, proximo - timedelta(days=1) if proximo else None) if f is not None]
+        pendientes.append(PrecioEfectivo(
+            producto_id=pk,
+            precio_base=precio,
+            precio=calcular_precio(precio, descuento),
+            descuento=descuento,
+            promocion_id=promo_id,
+            vigente_hasta=min(hasta) if hasta else None,
+        ))
+        if len(pendientes) >= lote:
+            escritas += guardar(pendientes)
+            pendientes = []
+    if pendientes:
+        escritas += guardar(pendientes)
+    return escritas
+
+
+def guardar(filas):
+    with transaction.atomic():
+        PrecioEfectivo.objects.bulk_create(
+            filas,
+            update_conflicts=True,
+            unique_fields=['producto'],
+            update_fields=['precio_base', 'precio', 'descuento', 'promocion', 'vigente_hasta', 'calculado'],
+        )
+    return len(filas)
+
+
+def cambio_de_dia(fecha=None):
+    """
+    Rollover diario: recalcula solo los productos cuya fila venció (terminó
+    su promoción o empieza una nueva) y los que aún no tienen fila.
+    """
+    hoy = fecha or timezone.localdate()
+    vencidos = list(PrecioEfectivo.objects.filter(vigente_hasta__lt=hoy).values_list('producto_id', flat=True))
+    faltantes = list(Producto.objects.filter(precio_efectivo__isnull=True).values_list('pk', flat=True))
+    escritas = recalcular_precios(vencidos + faltantes, fecha=hoy)
+    if escritas:
+        incrementar_version(PrecioEfectivo)
+    return escritas
+
+
+def productos_atrasados(productos):
+    """
+    {pk: producto} de los que aún no tienen descuento resuelto y cuya fila de
+    PrecioEfectivo falta o quedó atrasada. Los productos deben venir con
+    `select_related('precio_efectivo')`.
+    """
+    return {
+        p.pk: p for p in productos
+        if 'descuento_vigente' not in p.__dict__ and p.precio_efectivo_vigente() is None
+    }
+
+
+def descuentos_vigentes(ids, hoy):
+    """(producto_id, descuento) de las promociones vigentes; la primera por producto es la que aplica."""
+    return Promocion.objects.filter(
+        producto_id__in=ids, fecha_inicio__lte=hoy, fecha_fin__gte=hoy,
+    ).order_by('producto_id', 'pk').values_list('producto_id', 'descuento')
+
+
+def completar_descuentos(productos, fecha=None):
+    """
+    Resuelve en una consulta (por tramo de LOTE) el descuento de los
+    productos cuya fila de PrecioEfectivo falta o quedó atrasada (antes del
+    primer cálculo o del rollover diario), así la serialización no hace la
+    consulta de respaldo del modelo una vez por producto.
+    """
+    atrasados = productos_atrasados(productos)
+    if not atrasados:
+        return
+    hoy = fecha or timezone.localdate()
+    descuentos, ids = {}, list(atrasados)
+    for i in range(0, len(ids), LOTE):
+        for producto_id, descuento in descuentos_vigentes(ids[i:i + LOTE], hoy):
+            descuentos.setdefault(producto_id, descuento)
+    for pk, producto in atrasados.items():
+        producto.descuento_vigente = descuentos.get(pk)
+
+
+async def acompletar_descuentos(productos, fecha=None):
+    """Versión async de `completar_descuentos` para las vistas de vistas_async.py."""
+    atrasados = productos_atrasados(productos)
+    if not atrasados:
+        return
+    hoy = fecha or timezone.localdate()
+    descuentos, ids = {}, list(atrasados)
+    for i in range(0, len(ids), LOTE):
+        async for producto_id, descuento in descuentos_vigentes(ids[i:i + LOTE], hoy):
+            descuentos.setdefault(producto_id, descuento)
+    for pk, producto in atrasados.items():
+        producto.descuento_vigente = descuentos.get(pk)
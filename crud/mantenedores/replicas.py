@@ -0,0 +1,251 @@
+# mantenedores/replicas.py
+
+import hashlib
+import logging
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from .instrumentacion import medicion_actual
+
+logger = logging.getLogger(__name__)
+
+METODOS_LECTURA = ('GET', 'HEAD', 'OPTIONS')
+
+
+def configuracion(clave, defecto=None):
+    return getattr(settings, 'REPLICAS', {}).get(clave, defecto)
+
+
+def alias_replicas():
+    return [alias for alias in settings.DATABASES if alias != DEFAULT_DB_ALIAS]
+
+
+class LecturaReplica:
+    """Réplica elegida para la petición en curso (una sola por petición)."""
+    def __init__(self):
+        self.alias = None
+
+
+# Presente solo en peticiones que pueden leer de una réplica
+lectura_actual = ContextVar('lectura_replica', default=None)
+
+
+def medir_atraso(alias):
+    """
+    Segundos de atraso de una réplica (0 si ya aplicó todo lo de la
+    primaria) o None si no responde. Con primaria inactiva el timestamp de
+    la última transacción envejece aunque no haya atraso, por eso primero
+    se comparan las posiciones del WAL.
+    """
+    try:
+        replica = connections[alias]
+        if replica.vendor != 'postgresql':
+            with replica.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            return 0.0
+        with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+            cursor.execute('SELECT pg_current_wal_lsn()::text')
+            lsn_primaria = cursor.fetchone()[0]
+        with replica.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT pg_wal_lsn_diff(%s::pg_lsn, pg_last_wal_replay_lsn()),
+                       EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+                """,
+                [lsn_primaria],
+            )
+            pendiente, segundos = cursor.fetchone()
+    except Exception as e:
+        logger.warning("Réplica %s no disponible: %s", alias, e)
+        return None
+    if pendiente is None or pendiente <= 0:
+        return 0.0
+    return float(segundos or 0.0)
+
+
+class MonitorReplicas:
+    """
+    Estado de las réplicas en este proceso. Se vuelve a medir como mucho cada
+    REPLICAS['INTERVALO'] segundos; mientras un hilo mide, el resto usa el
+    último estado conocido.
+    """
+    def __init__(self):
+        self.atrasos = {}
+        self.medido = 0.0
+        self.candado = threading.Lock()
+
+    def actualizar(self, forzar=False):
+        vencido = time.monotonic() - self.medido >= configuracion('INTERVALO', 5)
+        if not (forzar or vencido) or not self.candado.acquire(blocking=forzar):
+            return self.atrasos
+        # Las consultas de la medición no cuentan en el presupuesto de la petición
+        token = medicion_actual.set(None)
+        try:
+            self.atrasos = {alias: medir_atraso(alias) for alias in alias_replicas()}
+            self.medido = time.monotonic()
+        finally:
+            medicion_actual.reset(token)
+            self.candado.release()
+        return self.atrasos
+
+    def disponibles(self):
+        maximo = configuracion('LAG_MAXIMO', 5)
+        return [
+            alias for alias, atraso in self.actualizar().items()
+            if atraso is not None and atraso <= maximo
+        ]
+
+
+monitor = MonitorReplicas()
+
+
+def estado_bases(detalle=False):
+    """
+    Para el health check: primaria (responde o no) y atraso de cada réplica.
+    Las réplicas se informan con el último estado del monitor, sin forzar
+    una medición. `detalle` agrega tiempos y si la réplica está en uso; el
+    texto de los errores solo va al log.
+    """
+    inicio = time.perf_counter()
+    try:
+        with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+            cursor.execute('SELECT 1')
+        primaria = {'ok': True}
+    except Exception as e:
+        logger.error("Base primaria no disponible: %s", e)
+        primaria = {'ok': False}
+    if detalle:
+        primaria['ms'] = round((time.perf_counter() - inicio) * 1000, 1)
+
+    estado = {DEFAULT_DB_ALIAS: primaria}
+    maximo = configuracion('LAG_MAXIMO', 5)
+    atrasos = monitor.actualizar()
+    for alias in alias_replicas():
+        # Sin medición todavía (otro hilo está midiendo) cuenta como no disponible
+        atraso = atrasos.get(alias)
+        estado[alias] = {
+            'ok': atraso is not None,
+            'atraso_s': None if atraso is None else round(atraso, 2),
+        }
+        if detalle:
+            estado[alias]['en_uso'] = atraso is not None and atraso <= maximo
+    return estado
+
+
+class ReplicaRouter:
+    """
+    Escrituras, migraciones y todo lo que no sea una lectura de la API van a
+    la primaria. Las lecturas de una petición marcada por ReplicaMiddleware
+    van a una réplica al día (elegida una vez por petición); si ninguna lo
+    está, a la primaria.
+    """
+    def db_for_read(self, model, **hints):
+        lectura = lectura_actual.get()
+        if lectura is None:
+            return DEFAULT_DB_ALIAS
+        if lectura.alias is None:
+            disponibles = monitor.disponibles()
+            lectura.alias = random.choice(disponibles) if disponibles else DEFAULT_DB_ALIAS
+        return lectura.alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Mismos datos en todas las bases
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+def clave_escritura(request):
+    """Identifica al cliente por su token o su sesión (sin guardarlos en claro)."""
+    credencial = request.META.get('HTTP_AUTHORIZATION') or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if not credencial:
+        return None
+    return 'replica:escritura:' + hashlib.sha1(credencial.encode()).hexdigest()
+
+
+class ReplicaMiddleware:
+    """
+    Marca los GET/HEAD de REPLICAS['RUTAS'] (la API) como lecturas que pueden
+    ir a una réplica. Después de una escritura exitosa, el mismo cliente lee
+    de la primaria durante REPLICAS['LECTURA_PROPIA'] segundos para ver sus
+    propios cambios aunque la réplica venga atrasada.
+    Sin réplicas configuradas no hace nada.
+
+    La marca de escritura va a la caché `default`: en memoria local solo la
+    vería el worker que atendió la escritura, así que con réplicas se exige
+    una caché compartida (CACHE_URL), igual que CLIENTE_JWT_MODO='stateless'.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.activo = bool(alias_replicas())
+        if self.activo and isinstance(caches['default'], (LocMemCache, DummyCache)):
+            raise ImproperlyConfigured(
+                "Las réplicas de lectura requieren CACHE_URL con Redis o archivos: en memoria "
+                "local la lectura propia tras escribir no llega a los demás workers."
+            )
+        self.asincrono = iscoroutinefunction(get_response)
+        if self.asincrono:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.asincrono:
+            return self.__acall__(request)
+        if not self.activo:
+            return self.get_response(request)
+
+        clave = clave_escritura(request)
+        lectura = self.es_lectura(request) and not (clave and cache.get(clave))
+        lectura = LecturaReplica() if lectura else None
+        token = lectura_actual.set(lectura)
+        try:
+            response = self.get_response(request)
+        finally:
+            lectura_actual.reset(token)
+        if self.es_escritura(request, response) and clave:
+            cache.set(clave, 1, configuracion('LECTURA_PROPIA', 10))
+        return self.marcar(response, lectura)
+
+    async def __acall__(self, request):
+        if not self.activo:
+            return await self.get_response(request)
+
+        clave = clave_escritura(request)
+        lectura = self.es_lectura(request) and not (clave and await cache.aget(clave))
+        lectura = LecturaReplica() if lectura else None
+        token = lectura_actual.set(lectura)
+        try:
+            response = await self.get_response(request)
+        finally:
+            lectura_actual.reset(token)
+        if self.es_escritura(request, response) and clave:
+            await cache.aset(clave, 1, configuracion('LECTURA_PROPIA', 10))
+        return self.marcar(response, lectura)
+
+    def es_lectura(self, request):
+        return request.method in METODOS_LECTURA and request.path_info.startswith(configuracion('RUTAS', ('/api/',)))
+
+    def es_escritura(self, request, response):
+        return request.method not in METODOS_LECTURA and response.status_code < 400
+
+    def marcar(self, response, lectura):
+        # En desarrollo indica de qué base se leyó
+        if settings.DEBUG:
+            response['X-Lectura-BD'] = (lectura and lectura.alias) or DEFAULT_DB_ALIAS
+        return response
@@ -0,0 +1,155 @@
+# mantenedores/rutas.py
+
+import heapq
+import math
+import threading
+
+from .models import ConexionPasillo, NodoPasillo, VersionModelo
+
+
+class PlanoSucursal:
+    """
+    Grafo de pasillos de una sucursal con las distancias mínimas entre todos
+    los pares precalculadas (Dijkstra desde cada pasillo).
+    Si la sucursal no tiene conexiones cargadas, se asume que todos los
+    pasillos se conectan en línea recta.
+    """
+    def __init__(self, nodos, conexiones):
+        # nodos: {pasillo_id: (x, y, es_entrada)}; conexiones: [(pasillo_a, pasillo_b, distancia|None)]
+        self.nodos = nodos
+        self.entrada = next((p for p, (_, _, entrada) in nodos.items() if entrada), None)
+        self.distancias = self.calcular_distancias(conexiones)
+
+    def recta(self, a, b):
+        (xa, ya, _), (xb, yb, _) = self.nodos[a], self.nodos[b]
+        return math.hypot(xa - xb, ya - yb)
+
+    def calcular_distancias(self, conexiones):
+        if not conexiones:
+            return {a: {b: self.recta(a, b) for b in self.nodos} for a in self.nodos}
+
+        vecinos = {p: [] for p in self.nodos}
+        for a, b, distancia in conexiones:
+            if a in vecinos and b in vecinos:
+                d = distancia if distancia is not None else self.recta(a, b)
+                vecinos[a].append((b, d))
+                vecinos[b].append((a, d))
+
+        distancias = {}
+        for origen in self.nodos:
+            mejor = {origen: 0.0}
+            pendientes = [(0.0, origen)]
+            while pendientes:
+                d, actual = heapq.heappop(pendientes)
+                if d > mejor[actual]:
+                    continue
+                for siguiente, peso in vecinos[actual]:
+                    nueva = d + peso
+                    if nueva < mejor.get(siguiente, math.inf):
+                        mejor[siguiente] = nueva
+                        heapq.heappush(pendientes, (nueva, siguiente))
+            distancias[origen] = mejor
+        return distancias
+
+    def distancia(self, a, b):
+        return self.distancias[a].get(b, math.inf)
+
+    def largo(self, ruta):
+        return sum(self.distancia(a, b) for a, b in zip(ruta, ruta[1:]))
+
+    def ordenar(self, pasillos):
+        """
+        Orden de visita casi óptimo de `pasillos`: vecino más cercano desde
+        la entrada (o desde el primero) y luego mejora 2-opt del recorrido.
+        """
+        pendientes = set(pasillos)
+        if not pendientes:
+            return []
+
+        inicio = self.entrada if self.entrada is not None else min(pendientes)
+        ruta = [inicio]
+        pendientes.discard(inicio)
+        while pendientes:
+            actual = ruta[-1]
+            siguiente = min(pendientes, key=lambda p: (self.distancia(actual, p), p))
+            ruta.append(siguiente)
+            pendientes.remove(siguiente)
+
+        # 2-opt sobre un camino abierto con el inicio fijo
+        mejorado = True
+        while mejorado:
+            mejorado = False
+            for i in range(1, len(ruta) - 1):
+                for j in range(i + 1, len(ruta)):
+                    a, b = ruta[i - 1], ruta[i]
+                    c = ruta[j]
+                    d = ruta[j + 1] if j + 1 < len(ruta) else None
+                    antes = self.distancia(a, b) + (self.distancia(c, d) if d is not None else 0)
+                    despues = self.distancia(a, c) + (self.distancia(b, d) if d is not None else 0)
+                    if despues + 1e-9 < antes:
+                        ruta[i:j + 1] = reversed(ruta[i:j + 1])
+                        mejorado = True
+
+        if self.entrada is not None and self.entrada not in pasillos:
+            ruta = ruta[1:]
+        return ruta
+
+
+class CachePlanos:
+    """
+    Planos por sucursal guardados en memoria del proceso. Se reconstruyen
+    cuando cambian los contadores de versión de NodoPasillo/ConexionPasillo.
+    """
+    MODELOS = ('nodopasillo', 'conexionpasillo')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.planos = {}
+        self.versiones = None
+
+    def obtener(self, sucursal_id):
+        versiones = dict(VersionModelo.objects.filter(modelo__in=self.MODELOS).values_list('modelo', 'version'))
+        with self.lock:
+            if versiones != self.versiones:
+                self.planos = {}
+                self.versiones = versiones
+            plano = self.planos.get(sucursal_id)
+        if plano is None:
+            plano = self.construir(sucursal_id)
+            with self.lock:
+                self.planos[sucursal_id] = plano
+        return plano
+
+    def construir(self, sucursal_id):
+        nodos = {
+            pasillo_id: (x, y, es_entrada)
+            for pasillo_id, x, y, es_entrada in
+            NodoPasillo.objects.filter(sucursal_id=sucursal_id).values_list('pasillo_id', 'x', 'y', 'es_entrada')
+        }
+        conexiones = list(
+            ConexionPasillo.objects.filter(sucursal_id=sucursal_id)
+            .values_list('origen__pasillo_id', 'destino__pasillo_id', 'distancia')
+        )
+        return PlanoSucursal(nodos, conexiones)
+
+
+planos_sucursal = CachePlanos()
+
+
+def planificar_ruta(sucursal_id, filas):
+    """
+    Agrupa las filas de `Producto.objects.ubicados_en()` por pasillo y las
+    ordena según el recorrido. Devuelve (tramos, distancia_total, sin_plano).
+    """
+    plano = planos_sucursal.obtener(sucursal_id)
+    por_pasillo = {}
+    for fila in filas:
+        por_pasillo.setdefault(fila['pasillo_ubicado_id'], []).append(fila)
+
+    con_plano = [p for p in por_pasillo if p in plano.nodos]
+    orden = plano.ordenar(con_plano)
+    tramos = [(pasillo, por_pasillo[pasillo]) for pasillo in orden]
+    sin_plano = [(pasillo, por_pasillo[pasillo]) for pasillo in por_pasillo if pasillo not in plano.nodos]
+
+    recorrido = ([plano.entrada] if plano.entrada is not None and plano.entrada not in orden else []) + orden
+    return tramos, plano.largo(recorrido), sin_plano
@@ -1,10 +1,23 @@
 # mantenedores/serializers.py
 
+from collections import defaultdict
+
 from rest_framework import serializers
+from rest_framework.settings import api_settings
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import models, transaction
+from django.utils import timezone
 from .models import * # Importa todos tus modelos
+from .authentication import CLAIM_ACTIVO, CLAIM_VERSION
+from .hashing import generar_hash, verificar_password
+from .instrumentacion import SerializacionMedidaMixin
+from .estadisticas import cambios_guardado, dimensiones_de
+from .signals import en_lote
+from .throttles import LoginUsuarioThrottle
+from .precios import completar_descuentos
 
 # -------------------------------------------------------------------
 # --- NUEVOS SERIALIZERS PARA AUTENTICACIÓN DE CLIENTES (APP MÓVIL) ---
@@ -15,6 +28,14 @@ class ClienteTokenObtainPairSerializer(TokenObtainPairSerializer):
     Serializer para el login de Clientes.
     Valida las credenciales contra el modelo Cliente.
     """
+    @classmethod
+    def get_token(cls, user):
+        # Claims para validar el access token sin consultar la tabla Cliente
+        token = super().get_token(user)
+        token[CLAIM_VERSION] = user.token_version
+        token[CLAIM_ACTIVO] = user.is_active
+        return token
+
     def validate(self, attrs):
         username = attrs.get(self.username_field)
         password = attrs.get('password')
@@ -22,11 +43,14 @@ class ClienteTokenObtainPairSerializer(TokenObtainPairSerializer):
         try:
             cliente = Cliente.objects.get(username=username)
         except Cliente.DoesNotExist:
-            raise serializers.ValidationError("Usuario o contraseña incorrecta")
+            cliente = None
 
-        if not cliente.check_password(password):
+        if cliente is None or not verificar_password(cliente, password):
+            # Solo las credenciales incorrectas cuentan para el límite por usuario
+            if 'request' in self.context:
+                LoginUsuarioThrottle().registrar_fallo(self.context['request'])
             raise serializers.ValidationError("Usuario o contraseña incorrecta")
-        
+
         refresh = self.get_token(cliente)
 
         data = {
@@ -46,13 +70,17 @@ class ClienteTokenRefreshSerializer(TokenRefreshSerializer):
         try:
             # Verificamos que el user_id del token exista en la tabla Cliente.
             user_id = refresh.get('user_id')
-            Cliente.objects.get(id=user_id)
+            cliente = Cliente.objects.get(id=user_id)
+            if not cliente.is_active or refresh.get(CLAIM_VERSION, cliente.token_version) < cliente.token_version:
+                raise serializers.ValidationError("Token inválido o sesión de cliente expirada.")
             
             # Si el cliente existe, generamos un nuevo access token
             data = {'access': str(refresh.access_token)}
             return data
         except Cliente.DoesNotExist:
             raise serializers.ValidationError("Token inválido o sesión de cliente expirada.")
+        except serializers.ValidationError:
+            raise
         except Exception as e:
             raise serializers.ValidationError(str(e))
 
@@ -61,12 +89,43 @@ class ClienteTokenRefreshSerializer(TokenRefreshSerializer):
 # --- OTROS SERIALIZERS DE TU APLICACIÓN (SIN CAMBIOS) ---
 # ---------------------------------------------------------
 
-class ProductoSerializer(serializers.ModelSerializer):
+class CamposDinamicosMixin(SerializacionMedidaMixin):
+    """
+    Permite pedir solo algunos campos en las lecturas: ?fields=id,nombre,precio
+    Los campos no pedidos no se serializan (ni se calculan sus métodos).
+    También mide el tiempo de serialización (ver instrumentacion.py).
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method != 'GET':
+            return
+        campos = request.query_params.get('fields')
+        if not campos:
+            return
+        pedidos = {c.strip() for c in campos.split(',') if c.strip()}
+        for nombre in set(self.fields) - pedidos:
+            self.fields.pop(nombre)
+
+class ProductoListSerializer(SerializacionMedidaMixin, serializers.ListSerializer):
+    """
+    Antes de serializar, resuelve en una sola consulta el descuento de los
+    productos sin fila de PrecioEfectivo vigente (ver precios.py), en vez de
+    una consulta de respaldo por producto.
+    """
+    def to_representation(self, data):
+        productos = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        completar_descuentos(productos)
+        return super().to_representation(productos)
+
+class ProductoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     categoria = serializers.StringRelatedField()
     pasillo = serializers.StringRelatedField()
     estante = serializers.StringRelatedField(source='estanteria')
 
     imagen = serializers.SerializerMethodField()  # 👈 CAMBIO IMPORTANTE
+    # Medidas, blurhash y URLs por ancho/formato para no bajar el original
+    imagenes = serializers.SerializerMethodField()
 
     precio_con_descuento = serializers.ReadOnlyField()
     descuento_activo = serializers.SerializerMethodField()
@@ -74,10 +133,11 @@ class ProductoSerializer(serializers.ModelSerializer):
     class Meta:
         model = Producto
         fields = [
-            'id', 'imagen', 'nombre', 'precio', 'categoria', 'estante', 'pasillo', 'descripcion',
+            'id', 'codigo', 'imagen', 'imagenes', 'nombre', 'precio', 'categoria', 'estante', 'pasillo', 'descripcion',
             'precio_con_descuento',
             'descuento_activo',
         ]
+        list_serializer_class = ProductoListSerializer
 
     def get_imagen(self, obj):
         """
@@ -90,22 +150,217 @@ class ProductoSerializer(serializers.ModelSerializer):
             return None
         return None
 
+    def get_imagenes(self, obj):
+        return obj.imagen_info
+
     def get_descuento_activo(self, obj):
-        from django.utils import timezone
-        hoy = timezone.now().date()
-        promocion = obj.promocion_set.filter(
-            fecha_inicio__lte=hoy, fecha_fin__gte=hoy
-        ).first()
-        if promocion:
-            return promocion.descuento
+        # Lee PrecioEfectivo o el descuento resuelto por ProductoListSerializer
+        # (o la consulta de respaldo del modelo, compartida con precio_con_descuento).
+        return obj.descuento_activo
+
+def a_entero(valor):
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
         return None
 
-class PromocionSerializer(serializers.ModelSerializer):
+
+# --- Operaciones en lote ---
+
+# Ítems máximos por petición en los endpoints de lote
+MAXIMO_LOTE = 500
+
+class ProductoPrecargadoField(serializers.PrimaryKeyRelatedField):
+    """
+    FK a producto que, dentro de un lote, se busca entre los productos que
+    el lote ya cargó en una consulta (PromocionLoteSerializer) en vez de
+    hacer un get() por ítem.
+    """
+    def to_internal_value(self, data):
+        precargados = getattr(self.root, 'productos_precargados', None)
+        if precargados is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool) or a_entero(data) is None:
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        producto = precargados.get(a_entero(data))
+        if producto is None:
+            self.fail('does_not_exist', pk_value=data)
+        return producto
+
+
+class PromocionLoteSerializer(serializers.ListSerializer):
+    """
+    Varias promociones en una pasada (PromocionViewSet.lote). Sin `instance`
+    crea; con `instance` (las promociones a modificar) cada ítem trae su
+    `id`. En vez de 2-3 consultas por ítem, los productos y los solapes de
+    todo el lote (entre sus ítems y contra la base) se resuelven con una
+    consulta cada uno. Los errores quedan en la posición de cada ítem.
+    """
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            productos = {a_entero(item.get('producto')) for item in data if isinstance(item, dict)}
+            self.productos_precargados = Producto.objects.only('pk').in_bulk(productos - {None})
+            self.promociones = {promocion.pk: promocion for promocion in self.instance or []}
+            self.repetidas = set()
+        validados = super().to_internal_value(data)
+        errores = self.revisar_solapes(validados)
+        if any(errores):
+            raise serializers.ValidationError(errores)
+        return validados
+
+    def run_child_validation(self, data):
+        if self.instance is None:
+            return super().run_child_validation(data)
+        pk = a_entero(data.get('id')) if isinstance(data, dict) else None
+        promocion = self.promociones.get(pk)
+        if promocion is None:
+            raise serializers.ValidationError({'id': ["No existe una promoción con este id."]})
+        if pk in self.repetidas:
+            raise serializers.ValidationError({'id': ["La promoción está repetida en el lote."]})
+        self.repetidas.add(pk)
+        self.child.instance = promocion
+        return {**super().run_child_validation(data), 'id': pk}
+
+    def revisar_solapes(self, validados):
+        """Errores por ítem: fechas cruzadas con otra promoción del mismo producto."""
+        errores = [{} for _ in validados]
+        fechas = []
+        for attrs in validados:
+            anterior = self.promociones.get(attrs.get('id'))
+            producto = attrs['producto'].pk if 'producto' in attrs else anterior.producto_id
+            inicio = attrs.get('fecha_inicio', getattr(anterior, 'fecha_inicio', None))
+            fin = attrs.get('fecha_fin', getattr(anterior, 'fecha_fin', None))
+            fechas.append((producto, inicio, fin))
+        if not fechas:
+            return errores
+
+        # Las promociones que se modifican cuentan con sus fechas nuevas, no las guardadas
+        guardadas = defaultdict(list)
+        for promocion in Promocion.objects.filter(
+            producto_id__in={producto for producto, _, _ in fechas},
+            fecha_inicio__lte=max(fin for _, _, fin in fechas),
+            fecha_fin__gte=min(inicio for _, inicio, _ in fechas),
+        ).exclude(pk__in=list(self.promociones)).order_by('fecha_inicio').only(
+            'nombre', 'producto_id', 'fecha_inicio', 'fecha_fin',
+        ):
+            guardadas[promocion.producto_id].append(promocion)
+
+        del_lote = defaultdict(list)
+        for indice, (producto, inicio, fin) in enumerate(fechas):
+            otra = next((p for p in guardadas[producto] if p.fecha_inicio <= fin and p.fecha_fin >= inicio), None)
+            previo = next((i for i, ini, f in del_lote[producto] if ini <= fin and f >= inicio), None)
+            if otra is not None:
+                errores[indice] = {api_settings.NON_FIELD_ERRORS_KEY: [otra.aviso_solape()]}
+            elif previo is not None:
+                errores[indice] = {api_settings.NON_FIELD_ERRORS_KEY: [f"Se cruza con las fechas del ítem {previo} de este lote."]}
+            del_lote[producto].append((indice, inicio, fin))
+        return errores
+
+    def create(self, validated_data):
+        promociones = [Promocion(**attrs) for attrs in validated_data]
+        with transaction.atomic(), en_lote() as efectos:
+            Promocion.objects.bulk_create(promociones)
+            # bulk_create no emite señales: lo que harían los receptores
+            efectos.modelos.add(Promocion)
+            for promocion in promociones:
+                efectos.productos.add(promocion.producto_id)
+                efectos.contar(cambios_guardado(promocion, creado=True))
+        return promociones
+
+    def update(self, instance, validated_data):
+        campos, promociones = {'updated_at'}, []
+        ahora = timezone.now()
+        with transaction.atomic(), en_lote() as efectos:
+            for attrs in validated_data:
+                promocion = self.promociones[attrs.pop('id')]
+                anteriores = dimensiones_de(promocion)
+                efectos.productos.add(promocion.producto_id)
+                for campo, valor in attrs.items():
+                    setattr(promocion, campo, valor)
+                promocion.updated_at = ahora
+                campos.update(attrs)
+                efectos.productos.add(promocion.producto_id)
+                efectos.contar(cambios_guardado(promocion, False, anteriores))
+                promociones.append(promocion)
+            Promocion.objects.bulk_update(promociones, sorted(campos))
+            efectos.modelos.add(Promocion)
+        return promociones
+
+
+class PreciosLoteSerializer(serializers.ListSerializer):
+    """
+    Cambio de precio de varios productos: los productos se cargan en una
+    consulta y se guardan con un bulk_update, en una transacción.
+    """
+    def to_internal_value(self, data):
+        validados = super().to_internal_value(data)
+        self.productos = Producto.objects.only('pk', 'precio').in_bulk([attrs['id'] for attrs in validados])
+        errores, vistos = [], set()
+        for attrs in validados:
+            if attrs['id'] not in self.productos:
+                errores.append({'id': ["No existe un producto con este id."]})
+            elif attrs['id'] in vistos:
+                errores.append({'id': ["El producto está repetido en el lote."]})
+            else:
+                errores.append({})
+            vistos.add(attrs['id'])
+        if any(errores):
+            raise serializers.ValidationError(errores)
+        return validados
+
+    def create(self, validated_data):
+        resultados, productos = [], []
+        ahora = timezone.now()
+        for attrs in validated_data:
+            producto = self.productos[attrs['id']]
+            resultados.append({**attrs, 'precio_anterior': producto.precio})
+            producto.precio, producto.updated_at = attrs['precio'], ahora
+            productos.append(producto)
+        with transaction.atomic(), en_lote() as efectos:
+            Producto.objects.bulk_update(productos, ['precio', 'updated_at'])
+            # bulk_update no emite señales: ETag de productos y precio efectivo
+            efectos.modelos.add(Producto)
+            efectos.productos.update(self.productos)
+        return resultados
+
+
+class PrecioLoteSerializer(serializers.Serializer):
+    """Un ítem de ProductoViewSet.precios: {"id": 1, "precio": "990.00"}."""
+    id = serializers.IntegerField()
+    precio = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0)
+    precio_anterior = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+
+    class Meta:
+        list_serializer_class = PreciosLoteSerializer
+
+
+class PromocionSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+    producto = ProductoPrecargadoField(queryset=Producto.objects.all())
+
     class Meta:
         model = Promocion
         fields = ['id', 'nombre', 'producto', 'descuento', 'fecha_inicio', 'fecha_fin']
+        list_serializer_class = PromocionLoteSerializer
 
-class ClienteSerializer(serializers.ModelSerializer):
+    def validate(self, attrs):
+        # Mismas reglas de fechas que Promocion.clean() (el formulario del panel)
+        # producto_id y no producto: en los lotes cargar el FK sería una consulta por ítem
+        promocion = Promocion(pk=getattr(self.instance, 'pk', None), producto_id=getattr(self.instance, 'producto_id', None))
+        if 'producto' in attrs:
+            promocion.producto = attrs['producto']
+        for campo in ('fecha_inicio', 'fecha_fin'):
+            setattr(promocion, campo, attrs.get(campo, getattr(self.instance, campo, None)))
+        try:
+            if isinstance(self.parent, PromocionLoteSerializer):
+                # Los solapes los revisa el lote completo en una consulta
+                promocion.validar_fechas()
+            else:
+                promocion.clean()
+        except DjangoValidationError as e:
+            raise serializers.ValidationError(e.message_dict if hasattr(e, 'error_dict') else e.messages)
+        return attrs
+
+class ClienteSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     username = serializers.CharField(
         max_length=150,
         validators=[UnicodeUsernameValidator()],
@@ -131,34 +386,70 @@ class ClienteSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         # Usar el manager 'create_user' es una mejor práctica que ya tenías en tu modelo.
+        # El hash se calcula en el pool acotado de hashing.
+        validated_data['password_hash'] = generar_hash(validated_data.pop('password'))
         user = Cliente.objects.create_user(**validated_data)
         return user
 
-class ProveedorSerializer(serializers.ModelSerializer):
+class ProveedorSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Proveedor
         fields = ['id', 'nombre', 'email', 'telefono']
 
-class SucursalSerializer(serializers.ModelSerializer):
+class SucursalSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Sucursal
-        fields = ['id', 'nombre', 'direccion']
+        fields = ['id', 'nombre', 'direccion', 'latitud', 'longitud']
+
+    def validate(self, attrs):
+        sucursal = Sucursal(**{
+            campo: attrs.get(campo, getattr(self.instance, campo, None)) for campo in ('latitud', 'longitud')
+        })
+        try:
+            sucursal.clean()
+        except DjangoValidationError as e:
+            raise serializers.ValidationError(e.messages)
+        return attrs
+
+class UbicacionProductoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+    class Meta:
+        model = UbicacionProducto
+        fields = ['id', 'producto', 'sucursal', 'pasillo', 'estanteria', 'posicion']
+
+class UbicacionSerializer(serializers.Serializer):
+    """
+    Resultado de `Producto.objects.ubicados_en(sucursal)` (filas de values()).
+    """
+    producto = serializers.IntegerField(source='id')
+    nombre = serializers.CharField()
+    pasillo = serializers.CharField(source='pasillo_nombre')
+    estante = serializers.CharField(source='estanteria_nombre')
+    posicion = serializers.IntegerField(allow_null=True)
+    origen = serializers.CharField(source='origen_ubicacion')
 
-class CategoriaSerializer(serializers.ModelSerializer):
+class CategoriaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Categoria
         fields = ['id', 'nombre']
 
-class EstanteriaSerializer(serializers.ModelSerializer):
+class EstanteriaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Estanteria
-        fields = ['id', 'nombre', 'pasillo']
+        fields = ['id', 'nombre']
 
-class PasilloSerializer(serializers.ModelSerializer):
+class PasilloSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Pasillo
         fields = ['id', 'nombre']
 
+class TareaSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Tarea
+        fields = [
+            'id', 'cola', 'nombre', 'estado', 'intentos', 'max_intentos', 'resultado', 'error',
+            'creada', 'terminada',
+        ]
+
 class ChangePasswordSerializer(serializers.Serializer):
     """
     Serializer para el cambio de contraseña.
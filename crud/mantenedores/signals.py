@@ -0,0 +1,228 @@
+# mantenedores/signals.py
+
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from .models import (
+    Categoria, Cliente, Eliminacion, Estanteria, Pasillo, Producto, Promocion, Proveedor, Sucursal,
+    UbicacionProducto, NodoPasillo, ConexionPasillo,
+)
+from .versiones import incrementar_version
+from .autocompletar import indice_autocompletar
+from .cercania import indice_sucursales
+from .authentication import VERSION_ELIMINADO, publicar_estado_cliente
+from .precios import recalcular_precios
+from .estadisticas import MODELOS_CONTADOS, cambios_eliminacion, cambios_guardado, dimensiones_guardadas, sumar
+
+# Modelos del catálogo que la app sincroniza de forma incremental.
+MODELOS_SINCRONIZADOS = (Producto, Promocion, Categoria, Estanteria, Pasillo)
+
+# Modelos expuestos por la API con ETag por contador de versión.
+MODELOS_VERSIONADOS = MODELOS_SINCRONIZADOS + (
+    Cliente, Proveedor, Sucursal, UbicacionProducto, NodoPasillo, ConexionPasillo,
+)
+
+
+def conectar(senal, modelos):
+    """
+    Como @receiver, pero conecta el receptor a cada modelo de `modelos`.
+    Un receptor sin `sender` escucha a todos los modelos, y en post_delete
+    eso desactiva el borrado rápido de Django en cualquier tabla (cada
+    DELETE y cada cascada pasan a cargar las filas para emitir la señal).
+    """
+    def decorador(funcion):
+        for modelo in modelos:
+            senal.connect(funcion, sender=modelo)
+        return funcion
+    return decorador
+
+
+# Efectos juntados por la operación masiva en curso (ver en_lote)
+lote_actual = ContextVar('lote_actual', default=None)
+
+
+class EfectosLote:
+    """
+    Lo que los receptores de este módulo harían objeto por objeto, juntado
+    para aplicarlo una sola vez: tombstones, versiones, precios efectivos y
+    contadores. Las escrituras que no emiten señales (bulk_create,
+    bulk_update) registran aquí lo mismo a mano.
+    """
+    def __init__(self):
+        self.modelos = set()
+        self.productos = set()
+        self.estadisticas = Counter()
+        self.eliminaciones = []
+
+    def contar(self, cambios):
+        self.estadisticas.update(cambios)
+
+    def aplicar(self):
+        Eliminacion.objects.bulk_create(self.eliminaciones)
+        productos, modelos = set(self.productos), set(self.modelos)
+        cambios = {clave: delta for clave, delta in self.estadisticas.items() if delta}
+
+        def al_confirmar():
+            if productos:
+                recalcular_precios(productos)
+            for modelo in modelos:
+                incrementar_version(modelo)
+            if cambios:
+                sumar(cambios)
+        transaction.on_commit(al_confirmar)
+
+
+@contextmanager
+def en_lote():
+    """
+    Agrupa los efectos de las señales de una operación masiva: en vez de un
+    on_commit por objeto, un recálculo de precios, un incremento de versión
+    por modelo y una pasada de contadores al confirmar. Se usa dentro de
+    transaction.atomic(); si el bloque falla no se aplica nada.
+
+        with transaction.atomic(), en_lote() as efectos:
+            Promocion.objects.filter(pk__in=ids).delete()
+    """
+    efectos = EfectosLote()
+    token = lote_actual.set(efectos)
+    try:
+        yield efectos
+    finally:
+        lote_actual.reset(token)
+    efectos.aplicar()
+
+
+@conectar(post_delete, MODELOS_SINCRONIZADOS)
+def registrar_eliminacion(sender, instance, **kwargs):
+    """Guarda un tombstone por cada objeto del catálogo eliminado (incluye cascadas)."""
+    eliminacion = Eliminacion(modelo=sender._meta.model_name, objeto_id=instance.pk)
+    efectos = lote_actual.get()
+    if efectos is not None:
+        efectos.eliminaciones.append(eliminacion)
+    else:
+        eliminacion.save()
+
+
+@conectar(post_save, MODELOS_VERSIONADOS)
+@conectar(post_delete, MODELOS_VERSIONADOS)
+def versionar_modelo(sender, **kwargs):
+    """
+    Incrementa la versión del modelo al confirmar la transacción, para que
+    un ETag nuevo nunca se asocie a datos aún no confirmados.
+    (Las operaciones masivas update()/bulk_create() no emiten señales y
+    deben llamar a incrementar_version() explícitamente o usar en_lote().)
+    """
+    efectos = lote_actual.get()
+    if efectos is not None:
+        efectos.modelos.add(sender)
+    else:
+        transaction.on_commit(lambda: incrementar_version(sender))
+
+
+@receiver(post_save, sender=Producto)
+def autocompletar_guardar_producto(sender, instance, **kwargs):
+    transaction.on_commit(lambda: indice_autocompletar.guardar_producto(instance))
+
+
+@receiver(post_delete, sender=Producto)
+def autocompletar_eliminar_producto(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: indice_autocompletar.quitar_producto(pk))
+
+
+@receiver(post_save, sender=Pasillo)
+@receiver(post_save, sender=Estanteria)
+def autocompletar_guardar_ubicacion(sender, instance, **kwargs):
+    transaction.on_commit(lambda: indice_autocompletar.guardar_ubicacion(instance))
+
+
+@receiver(post_delete, sender=Pasillo)
+@receiver(post_delete, sender=Estanteria)
+def autocompletar_eliminar_ubicacion(sender, instance, **kwargs):
+    transaction.on_commit(lambda: indice_autocompletar.guardar_ubicacion(instance, eliminada=True))
+
+
+@receiver(post_save, sender=Sucursal)
+def cercania_guardar_sucursal(sender, instance, **kwargs):
+    transaction.on_commit(lambda: indice_sucursales.guardar_sucursal(instance))
+
+
+@receiver(post_delete, sender=Sucursal)
+def cercania_eliminar_sucursal(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: indice_sucursales.quitar_sucursal(pk))
+
+
+@receiver(post_save, sender=Cliente)
+def publicar_version_token(sender, instance, **kwargs):
+    """Avisa a la autenticación sin estado que los tokens anteriores ya no valen."""
+    cliente_id, version, activo = instance.pk, instance.token_version, instance.is_active
+    transaction.on_commit(lambda: publicar_estado_cliente(cliente_id, version, activo))
+
+
+@receiver(post_delete, sender=Cliente)
+def revocar_tokens_eliminado(sender, instance, **kwargs):
+    cliente_id = instance.pk
+    transaction.on_commit(lambda: publicar_estado_cliente(cliente_id, VERSION_ELIMINADO, False))
+
+
+@receiver(pre_save, sender=Promocion)
+def recordar_producto_promocion(sender, instance, **kwargs):
+    """Si la promoción cambia de producto, el precio del anterior también se recalcula."""
+    instance._producto_anterior = (
+        Promocion.objects.filter(pk=instance.pk).values_list('producto_id', flat=True).first()
+        if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=Promocion)
+@receiver(post_delete, sender=Promocion)
+def recalcular_precio_promocion(sender, instance, **kwargs):
+    productos = {instance.producto_id, getattr(instance, '_producto_anterior', None)}
+    efectos = lote_actual.get()
+    if efectos is not None:
+        efectos.productos.update(productos)
+    else:
+        transaction.on_commit(lambda: recalcular_precios(productos))
+
+
+@receiver(post_save, sender=Producto)
+def recalcular_precio_producto(sender, instance, **kwargs):
+    pk = instance.pk
+    efectos = lote_actual.get()
+    if efectos is not None:
+        efectos.productos.add(pk)
+    else:
+        transaction.on_commit(lambda: recalcular_precios([pk]))
+
+
+@conectar(pre_save, MODELOS_CONTADOS)
+def recordar_dimensiones(sender, instance, raw=False, **kwargs):
+    """Valores contados por campo (categoría, sucursal, semana) antes de guardar."""
+    if instance.pk is not None and not raw:
+        instance._dimensiones_anteriores = dimensiones_guardadas(sender, instance.pk)
+
+
+@conectar(post_save, MODELOS_CONTADOS)
+def contar_guardado(sender, instance, created, **kwargs):
+    """Ajusta los contadores de estadisticas.py al confirmar la transacción."""
+    cambios = cambios_guardado(instance, created, getattr(instance, '_dimensiones_anteriores', None))
+    efectos = lote_actual.get()
+    if efectos is not None:
+        efectos.contar(cambios)
+    elif cambios:
+        transaction.on_commit(lambda: sumar(cambios))
+
+
+@conectar(post_delete, MODELOS_CONTADOS)
+def contar_eliminacion(sender, instance, **kwargs):
+    cambios = cambios_eliminacion(instance)
+    efectos = lote_actual.get()
+    if efectos is not None:
+        efectos.contar(cambios)
+    else:
+        transaction.on_commit(lambda: sumar(cambios))
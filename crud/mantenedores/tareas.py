@@ -0,0 +1,41 @@
+# mantenedores/tareas.py
+
+import io
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from .cola import tarea
+from .imagenes import CAMPOS_IMAGEN, aplicar_imagen, analizar_imagen
+from .importacion import ImportadorProductos, leer_filas
+from .models import Producto
+
+
+@tarea(cola='imagenes', max_intentos=5)
+def procesar_imagen_producto(producto_id, nombre_archivo, adjunto):
+    """Sube el original a Cloudinary y guarda medidas, blurhash y derivadas."""
+    producto = Producto.objects.filter(pk=producto_id).first()
+    if producto is None:
+        return {'omitida': "El producto ya no existe."}
+    archivo = SimpleUploadedFile(nombre_archivo, adjunto)
+    analisis = analizar_imagen(archivo)
+    producto.imagen = archivo
+    aplicar_imagen(producto, analisis)
+    # Solo los campos de la imagen: el resto pudo editarse mientras esperaba
+    producto.save(update_fields=['imagen', *CAMPOS_IMAGEN, 'updated_at'])
+    return {'producto': producto_id, 'imagen': str(producto.imagen)}
+
+
+def encolar_imagen(producto, archivo):
+    """Deja la subida de `archivo` como imagen de `producto` para el trabajador."""
+    archivo.seek(0)
+    return procesar_imagen_producto.encolar(
+        adjunto=archivo.read(), producto_id=producto.pk, nombre_archivo=archivo.name,
+    )
+
+
+@tarea(cola='importaciones', max_intentos=1)
+def importar_productos(formato, crear_faltantes, adjunto):
+    """Importación CSV/JSONL diferida; el resumen queda como resultado de la tarea."""
+    # Un solo intento: las filas sin código no son idempotentes
+    importador = ImportadorProductos(crear_faltantes=crear_faltantes)
+    return importador.importar(leer_filas(io.BytesIO(adjunto), formato))
@@ -1,3 +1,780 @@
-from django.test import TestCase
+import math
+import random
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from itertools import permutations
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q
+from django.test import AsyncClient, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.response import Response
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .cache_api import CacheVersionadaMixin
+from .cercania import distancia_km, indice_sucursales, sucursales_cercanas
+from .cola import ejecutar_ahora, purgar_terminadas, tarea
+from .hashing import ServicioSaturado
+from .importacion import ImportadorProductos
+from .instrumentacion import presupuesto_consultas
+from .models import (
+    Categoria, Cliente, ConexionPasillo, Estanteria, NodoPasillo, Pasillo, Producto, Promocion, Proveedor, Sucursal,
+    Tarea, UbicacionProducto, Usuario,
+)
+from .precios import recalcular_precios
+from .replicas import ReplicaMiddleware
+from .rutas import PlanoSucursal, planos_sucursal
+from .serializers import ClienteTokenObtainPairSerializer, PromocionSerializer
+from .throttles import VentanaDeslizanteThrottle
+
+
+def crear_catalogo(productos=3):
+    categoria = Categoria.objects.create(nombre='Lácteos')
+    estanteria = Estanteria.objects.create(nombre='E1')
+    pasillo = Pasillo.objects.create(nombre='P1')
+    for i in range(productos):
+        Producto.objects.create(
+            codigo=f'P-{i}', nombre=f'Producto {i}', precio=Decimal('1000'),
+            categoria=categoria, estanteria=estanteria, pasillo=pasillo,
+        )
+    return categoria, estanteria, pasillo
+
+
+def cliente_api(cliente=None):
+    """APIClient con el access token de un Cliente (app móvil)."""
+    cliente = cliente or Cliente.objects.create_user('cliente.test', 'cliente@test.cl', 'clave-segura-123')
+    api = APIClient()
+    token = ClienteTokenObtainPairSerializer.get_token(cliente).access_token
+    api.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+    return api
+
+
+def usuario_api(usuario):
+    """APIClient con el access token de un usuario del panel."""
+    api = APIClient()
+    api.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(usuario).access_token}')
+    return api
+
+
+class CacheVersionadaTests(TestCase):
+    """Caché de respuestas de la API (cache_api.py) sobre el LocMemCache de pruebas."""
+
+    def setUp(self):
+        caches['api'].clear()
+        self.categoria, self.estanteria, self.pasillo = crear_catalogo()
+        self.api = cliente_api()
+
+    def test_segunda_lectura_sale_de_cache(self):
+        primera = self.api.get('/api/productos/')
+        self.assertEqual(primera.status_code, 200)
+        # Se leen los contadores de versión para armar la clave, no los productos
+        with CaptureQueriesContext(connection) as consultas:
+            segunda = self.api.get('/api/productos/')
+        self.assertEqual(segunda.status_code, 200)
+        self.assertFalse([q for q in consultas.captured_queries if 'mantenedores_producto' in q['sql']])
+        self.assertEqual(segunda.json(), primera.json())
+
+    def test_escritura_invalida_la_respuesta(self):
+        self.assertEqual(len(self.api.get('/api/productos/').json()), 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            Producto.objects.create(
+                codigo='P-nuevo', nombre='Nuevo', precio=Decimal('10'),
+                categoria=self.categoria, estanteria=self.estanteria, pasillo=self.pasillo,
+            )
+        nombres = [p['nombre'] for p in self.api.get('/api/productos/').json()]
+        self.assertIn('Nuevo', nombres)
+        self.assertEqual(len(nombres), 4)
+
+
+class RevocacionTokensTests(TestCase):
+    """Cambiar la contraseña revoca los access tokens ya emitidos, en ambos modos."""
+
+    def setUp(self):
+        caches['revocaciones'].clear()
+        self.cliente = Cliente.objects.create_user('cliente.test', 'cliente@test.cl', 'clave-segura-123')
+
+    def revocar_y_pedir(self):
+        api = cliente_api(self.cliente)
+        self.assertEqual(api.get('/api/promociones/').status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cliente.set_password('otra-clave-segura-456')
+            self.cliente.save()
+        return api.get('/api/promociones/')
+
+    @override_settings(CLIENTE_JWT_MODO='db')
+    def test_modo_db(self):
+        self.assertEqual(self.revocar_y_pedir().status_code, 401)
+
+    @override_settings(CLIENTE_JWT_MODO='stateless')
+    def test_modo_stateless(self):
+        self.assertEqual(self.revocar_y_pedir().status_code, 401)
+
+
+class CandadoCacheTests(SimpleTestCase):
+    """Ante fallos de caché simultáneos solo un hilo reconstruye la respuesta."""
+
+    def setUp(self):
+        caches['api'].clear()
+
+    def pedir_a_la_vez(self, generar, hilos=8):
+        respuestas = []
+        inicio = threading.Barrier(hilos)
+
+        def pedir():
+            request = RequestFactory().get('/api/categorias/')
+            inicio.wait()
+            response = CacheVersionadaMixin().generar_respuesta(request, '"etag-prueba"', generar)
+            respuestas.append((response.status_code, response.data))
+
+        lista = [threading.Thread(target=pedir) for _ in range(hilos)]
+        for hilo in lista:
+            hilo.start()
+        for hilo in lista:
+            hilo.join()
+        return respuestas
+
+    def generador(self, espera, estado=200):
+        generadas = []
+        candado = threading.Lock()
+
+        def generar():
+            with candado:
+                generadas.append(1)
+            time.sleep(espera)
+            return Response({'ok': True}, status=estado)
+        return generar, generadas
+
+    def test_una_sola_reconstruccion(self):
+        generar, generadas = self.generador(0.2)
+        self.assertEqual(self.pedir_a_la_vez(generar), [(200, {'ok': True})] * 8)
+        self.assertEqual(len(generadas), 1)
+
+    def test_reconstruccion_lenta(self):
+        # Más que los 2 s que antes se esperaba antes de reconstruir cada uno por su cuenta
+        generar, generadas = self.generador(2.5)
+        self.assertEqual(self.pedir_a_la_vez(generar, hilos=4), [(200, {'ok': True})] * 4)
+        self.assertEqual(len(generadas), 1)
+
+    def test_respuesta_no_cacheable(self):
+        # Sin respuesta en caché al soltar el candado, cada uno la calcula por turno
+        generar, generadas = self.generador(0.05, estado=404)
+        self.assertEqual(self.pedir_a_la_vez(generar, hilos=4), [(404, {'ok': True})] * 4)
+        self.assertEqual(len(generadas), 4)
+
+
+ESTRICTA = {'ACTIVA': True, 'HEADERS': False, 'ESTRICTA': True}
+
+
+@override_settings(INSTRUMENTACION=ESTRICTA)
+class PresupuestoConsultasTests(TestCase):
+    """
+    Cada listado y detalle de la API debe cumplir el `presupuesto_consultas`
+    de su ViewSet: con INSTRUMENTACION['ESTRICTA'] el middleware lanza
+    PresupuestoExcedido. Con FILAS filas un N+1 se pasa de cualquier presupuesto.
+    """
+    FILAS = 30
+
+    @classmethod
+    def setUpTestData(cls):
+        categoria, estanteria, pasillo = crear_catalogo(cls.FILAS)
+        hoy = timezone.localdate()
+        productos = list(Producto.objects.order_by('pk'))
+        for i, producto in enumerate(productos):
+            sucursal = Sucursal.objects.create(nombre=f'Sucursal {i}', direccion=f'Calle {i}')
+            Proveedor.objects.create(nombre=f'Proveedor {i}')
+            UbicacionProducto.objects.create(producto=producto, sucursal=sucursal, pasillo=pasillo, estanteria=estanteria)
+            if i % 2:
+                Promocion.objects.create(
+                    nombre=f'Promo {i}', producto=producto, descuento=Decimal('10'),
+                    fecha_inicio=hoy - timedelta(days=1), fecha_fin=hoy + timedelta(days=1),
+                )
+        cls.cliente = Cliente.objects.create_user('cliente.test', 'cliente@test.cl', 'clave-segura-123')
+        cls.usuario = Usuario.objects.create_user('panel.test', 'panel@test.cl', 'clave-segura-123', is_staff=True)
+
+    def setUp(self):
+        caches['api'].clear()
+        self.api_cliente = cliente_api(self.cliente)
+        self.api_usuario = usuario_api(self.usuario)
+
+    def leer(self, ruta, api):
+        for url in (f'/api/{ruta}/', f'/api/{ruta}/?page=1', f'/api/{ruta}/?paginacion=cursor'):
+            self.assertEqual(api.get(url).status_code, 200, url)
+        pk = api.get(f'/api/{ruta}/?page=1').json()['results'][0]['id']
+        self.assertEqual(api.get(f'/api/{ruta}/{pk}/').status_code, 200)
+
+    def test_api_del_cliente(self):
+        for ruta in ('productos', 'promociones', 'clientes'):
+            with self.subTest(ruta=ruta):
+                self.leer(ruta, self.api_cliente)
+
+    def test_api_del_panel(self):
+        for ruta in ('categorias', 'estanterias', 'pasillos', 'proveedores', 'sucursales', 'ubicaciones'):
+            with self.subTest(ruta=ruta):
+                self.leer(ruta, self.api_usuario)
+
+    def test_productos_con_precio_efectivo(self):
+        recalcular_precios()
+        self.leer('productos', self.api_cliente)
+
+    def test_sincronizacion(self):
+        desde = (timezone.now() - timedelta(hours=1)).isoformat()
+        for parametros in ({}, {'since': desde}):
+            self.assertEqual(self.api_cliente.get('/api/productos/changes/', parametros).status_code, 200, parametros)
+
+    def test_productos_sin_precio_efectivo_al_dia(self):
+        # Filas faltantes o de ayer (antes del rollover): se resuelven en lote
+        recalcular_precios(fecha=timezone.localdate() - timedelta(days=2))
+        productos = self.api_cliente.get('/api/productos/').json()
+        self.assertEqual(sum(1 for p in productos if p['descuento_activo'] is not None), self.FILAS // 2)
+
+    def test_panel_de_productos(self):
+        self.client.force_login(self.usuario)
+        # Sesión, usuario, productos, descuentos atrasados y las listas de los formularios
+        with presupuesto_consultas(10):
+            respuesta = self.client.get('/producto')
+        self.assertEqual(respuesta.status_code, 200)
+
+
+class SolapePromocionesTests(TestCase):
+    """Un producto no puede tener dos promociones con fechas cruzadas."""
+
+    @classmethod
+    def setUpTestData(cls):
+        crear_catalogo(1)
+        cls.producto = Producto.objects.get()
+        cls.hoy = timezone.localdate()
+        Promocion.objects.create(
+            nombre='Vigente', producto=cls.producto, descuento=Decimal('10'),
+            fecha_inicio=cls.hoy, fecha_fin=cls.hoy + timedelta(days=7),
+        )
+        cls.usuario = Usuario.objects.create_user('panel.test', 'panel@test.cl', 'clave-segura-123', is_staff=True)
+
+    def datos(self, inicio, fin, nombre='Otra'):
+        return {
+            'nombre': nombre, 'producto': self.producto.pk, 'descuento': '5',
+            'fecha_inicio': (self.hoy + timedelta(days=inicio)).isoformat(),
+            'fecha_fin': (self.hoy + timedelta(days=fin)).isoformat(),
+        }
+
+    def test_clean_rechaza_solape(self):
+        promocion = Promocion(
+            nombre='Otra', producto=self.producto, descuento=Decimal('5'),
+            fecha_inicio=self.hoy + timedelta(days=7), fecha_fin=self.hoy + timedelta(days=9),
+        )
+        with self.assertRaises(ValidationError):
+            promocion.full_clean()
+
+    def test_serializer_rechaza_solape(self):
+        self.assertFalse(PromocionSerializer(data=self.datos(3, 10)).is_valid())
+        self.assertTrue(PromocionSerializer(data=self.datos(8, 10)).is_valid())
+
+    def test_lote_rechaza_solape_entre_items(self):
+        api = usuario_api(self.usuario)
+        respuesta = api.post('/api/promociones/lote/', [self.datos(10, 12, 'A'), self.datos(12, 14, 'B')], format='json')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(Promocion.objects.count(), 1)
+
+    @skipUnless(connection.vendor == 'postgresql', 'La restricción de exclusión es de PostgreSQL')
+    def test_restriccion_en_la_base(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Promocion.objects.create(
+                nombre='Sin validar', producto=self.producto, descuento=Decimal('5'),
+                fecha_inicio=self.hoy + timedelta(days=3), fecha_fin=self.hoy + timedelta(days=4),
+            )
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Los planes esperados son los de PostgreSQL')
+class PlanesPromocionesTests(TestCase):
+    """
+    Las consultas frecuentes sobre promociones usan sus índices (EXPLAIN).
+    Con pocas filas el planificador prefiere un Seq Scan aunque el índice
+    sirva, así que se desactivan para comprobar que el índice es utilizable.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        crear_catalogo(5)
+        hoy = timezone.localdate()
+        for i, producto in enumerate(Producto.objects.all()):
+            Promocion.objects.create(
+                nombre=f'Promo {i}', producto=producto, descuento=Decimal('10'),
+                fecha_inicio=hoy - timedelta(days=i), fecha_fin=hoy + timedelta(days=i),
+            )
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            # Dura hasta el fin de la transacción del test
+            cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def assertUsaIndice(self, queryset, indices):
+        plan = queryset.explain()
+        self.assertNotRegex(plan, r'Seq Scan on mantenedores_promocion\b')
+        self.assertTrue(any(indice in plan for indice in indices), f"No usa {' ni '.join(sorted(indices))}:\n{plan}")
+
+    def test_descuento_activo(self):
+        hoy = timezone.localdate()
+        producto_id = Producto.objects.values_list('id', flat=True).first()
+        self.assertUsaIndice(
+            Promocion.objects.filter(producto_id=producto_id, fecha_inicio__lte=hoy, fecha_fin__gte=hoy)
+            .order_by('pk').values_list('descuento', flat=True)[:1],
+            {'promocion_producto_fechas_idx'},
+        )
+
+    def test_listado_con_descuento(self):
+        self.assertUsaIndice(Producto.objects.con_promocion_activa().order_by('id')[:50], {'promocion_producto_fechas_idx'})
+
+    def test_promociones_vigentes(self):
+        hoy = timezone.localdate()
+        self.assertUsaIndice(
+            Promocion.objects.filter(fecha_inicio__lte=hoy, fecha_fin__gte=hoy),
+            {'promocion_vigencia_idx', 'promocion_inicio_idx'},
+        )
+
+    def test_sincronizacion_por_fecha(self):
+        hoy = timezone.localdate()
+        desde = hoy - timedelta(days=3)
+        self.assertUsaIndice(
+            Promocion.objects.filter(
+                Q(fecha_inicio__gt=desde, fecha_inicio__lte=hoy) | Q(fecha_fin__gte=desde, fecha_fin__lt=hoy)
+            ).values('producto_id'),
+            {'promocion_inicio_idx', 'promocion_vigencia_idx'},
+        )
+
+
+class ImportacionTests(TestCase):
+    """Filas fuera de los límites de las columnas quedan como error de su línea."""
+
+    def test_filas_invalidas_no_abortan_la_carga(self):
+        crear_catalogo(productos=0)
+        base = {'nombre': 'Leche', 'categoria': 'Lácteos', 'pasillo': 'P1', 'estanteria': 'E1'}
+        filas = [
+            {**base, 'codigo': 'A-1', 'precio': '990'},
+            {**base, 'codigo': 'X' * 51, 'precio': '990'},
+            {**base, 'codigo': 'A-2', 'precio': '123456789'},
+            {**base, 'codigo': 'A-3', 'precio': '9.999'},
+            {**base, 'codigo': 'A-4', 'precio': 'NaN'},
+            {**base, 'codigo': 'A-5', 'precio': 'Infinity'},
+            {**base, 'codigo': 'A-6', 'precio': '-1'},
+            {**base, 'codigo': 7, 'precio': 1500.5},
+        ]
+        resumen = ImportadorProductos(lote=2).importar(enumerate(filas, start=2))
+
+        self.assertEqual(resumen['importadas'], 2)
+        self.assertEqual([error['linea'] for error in resumen['errores']], [3, 4, 5, 6, 7, 8])
+        self.assertEqual(
+            dict(Producto.objects.values_list('codigo', 'precio')),
+            {'A-1': Decimal('990.00'), '7': Decimal('1500.50')},
+        )
+
+
+@tarea(max_intentos=1, nombre='tests.fallar')
+def fallar(adjunto):
+    raise RuntimeError("falla de prueba")
+
+
+class ColaTareasTests(TestCase):
+    """Una tarea fallida no conserva su adjunto y se purga como las completadas."""
+
+    def test_fallida_libera_adjunto_y_se_purga(self):
+        pendiente = fallar.encolar(adjunto=b'x' * 1024)
+        ejecutar_ahora(pendiente.pk)
+
+        fallida = Tarea.objects.get(pk=pendiente.pk)
+        self.assertEqual(fallida.estado, Tarea.FALLIDA)
+        self.assertIsNone(fallida.adjunto)
+        self.assertIn("falla de prueba", fallida.error)
+
+        self.assertEqual(purgar_terminadas(), 0)
+        Tarea.objects.filter(pk=fallida.pk).update(terminada=timezone.now() - timedelta(days=30))
+        self.assertEqual(purgar_terminadas(), 1)
+
+
+class ListaProductosSucursalTests(TestCase):
+    """`ubicar-lista` y `ruta` aceptan solo una lista de ids enteros."""
+
+    @classmethod
+    def setUpTestData(cls):
+        crear_catalogo(2)
+        cls.sucursal = Sucursal.objects.create(nombre='Centro', direccion='Calle 1')
+        cls.ids = list(Producto.objects.order_by('pk').values_list('pk', flat=True))
+
+    def setUp(self):
+        self.api = cliente_api()
+        self.url = f'/api/sucursales/{self.sucursal.pk}/ubicar-lista/'
+
+    def test_cuerpos_invalidos(self):
+        for cuerpo in ([1, 2], {'productos': '123'}, {'productos': 12}, {'productos': [1, 'x']}, {'productos': [True]}):
+            with self.subTest(cuerpo=cuerpo):
+                respuesta = self.api.post(self.url, cuerpo, format='json')
+                self.assertEqual(respuesta.status_code, 400)
+                self.assertIn('productos', respuesta.json())
+        self.assertEqual(self.api.get(self.url, {'productos': '1,x'}).status_code, 400)
+
+    def test_lista_valida(self):
+        respuesta = self.api.post(self.url, {'productos': self.ids + [0]}, format='json')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual([fila['producto'] for fila in respuesta.json()['ubicaciones']], self.ids)
+        self.assertEqual(respuesta.json()['no_encontrados'], [0])
+        self.assertEqual(self.api.get(self.url, {'productos': ','.join(map(str, self.ids))}).status_code, 200)
+
+
+class PanelClientesTests(TestCase):
+    """Si el pool de hashing está saturado la edición no se pierde en silencio."""
+
+    def test_edicion_con_hashing_saturado(self):
+        cliente = Cliente.objects.create_user('cliente.test', 'cliente@test.cl', 'clave-segura-123')
+        self.client.force_login(Usuario.objects.create_user('panel.test', 'panel@test.cl', 'clave-segura-123', is_staff=True))
+        datos = {
+            'editar_cliente': '1', 'id': cliente.pk, 'username': 'cliente.test', 'nombre': 'Nuevo',
+            'apellido': 'Test', 'email': 'cliente@test.cl', 'password': 'otra-clave-456',
+        }
+        with mock.patch('mantenedores.views.generar_hash', side_effect=ServicioSaturado()):
+            respuesta = self.client.post('/cliente/', datos, follow=True)
+
+        self.assertContains(respuesta, "No se guardaron los cambios de cliente.test")
+        cliente.refresh_from_db()
+        self.assertNotEqual(cliente.nombre, 'Nuevo')
+
+
+class SaludTests(TestCase):
+    """El health check es público: sin staff solo informa ok/atraso, sin detalles internos."""
+
+    def test_anonimo(self):
+        respuesta = self.client.get('/salud/')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json(), {'estado': 'ok', 'primaria': {'ok': True}, 'replicas': {}})
+
+    def test_error_de_la_primaria_no_se_publica(self):
+        with mock.patch('mantenedores.replicas.connections') as conexiones, self.assertLogs('mantenedores.replicas'):
+            conexiones.__getitem__.return_value.cursor.side_effect = Exception("password authentication failed")
+            respuesta = self.client.get('/salud/')
+        self.assertEqual(respuesta.status_code, 503)
+        self.assertNotIn("password", respuesta.content.decode())
+
+    def test_staff_ve_el_detalle(self):
+        self.client.force_login(Usuario.objects.create_user('panel.test', 'panel@test.cl', 'clave-segura-123', is_staff=True))
+        self.assertIn('ms', self.client.get('/salud/').json()['primaria'])
+
+
+class SincronizacionTests(TestCase):
+    """El delta de `changes` trae los productos afectados por un renombre."""
+
+    def setUp(self):
+        categoria, estanteria, pasillo = crear_catalogo(2)
+        otra = Categoria.objects.create(nombre='Bebidas')
+        Producto.objects.create(
+            codigo='B-1', nombre='Jugo', precio=Decimal('900'), categoria=otra, estanteria=estanteria, pasillo=pasillo,
+        )
+        antes = timezone.now() - timedelta(hours=1)
+        for modelo in (Producto, Categoria, Estanteria, Pasillo):
+            modelo.objects.update(updated_at=antes)
+        self.categoria, self.estanteria, self.pasillo = categoria, estanteria, pasillo
+        self.since = (timezone.now() - timedelta(minutes=30)).isoformat()
+        self.api = cliente_api()
+
+    def cambios(self):
+        respuesta = self.api.get('/api/productos/changes/', {'since': self.since})
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta.json()
+
+    def test_sin_cambios(self):
+        datos = self.cambios()
+        self.assertFalse(datos['completo'])
+        self.assertEqual(datos['productos'], [])
+
+    def test_renombrar_categoria(self):
+        self.categoria.nombre = 'Lácteos y huevos'
+        self.categoria.save()
+        datos = self.cambios()
+        self.assertEqual([c['nombre'] for c in datos['categorias']], ['Lácteos y huevos'])
+        self.assertEqual(sorted(p['codigo'] for p in datos['productos']), ['P-0', 'P-1'])
+        self.assertEqual({p['categoria'] for p in datos['productos']}, {'Lácteos y huevos'})
+
+    def test_renombrar_pasillo_y_estanteria(self):
+        for instancia in (self.pasillo, self.estanteria):
+            with self.subTest(modelo=type(instancia).__name__):
+                instancia.nombre += ' nuevo'
+                instancia.save()
+                self.assertEqual(sorted(p['codigo'] for p in self.cambios()['productos']), ['B-1', 'P-0', 'P-1'])
+                type(instancia).objects.update(updated_at=timezone.now() - timedelta(hours=1))
+
+
+@override_settings(INSTRUMENTACION=ESTRICTA)
+class LecturaAsyncTests(TestCase):
+    """Vistas async de /api/lectura/: mismas respuestas y presupuestos de consultas que los ViewSets."""
+
+    @classmethod
+    def setUpTestData(cls):
+        crear_catalogo(5)
+        producto = Producto.objects.order_by('pk').first()
+        hoy = timezone.localdate()
+        Promocion.objects.create(
+            nombre='Promo', producto=producto, descuento=Decimal('10'),
+            fecha_inicio=hoy - timedelta(days=1), fecha_fin=hoy + timedelta(days=1),
+        )
+        cls.producto = producto
+        cliente = Cliente.objects.create_user('cliente.test', 'cliente@test.cl', 'clave-segura-123')
+        usuario = Usuario.objects.create_user('panel.test', 'panel@test.cl', 'clave-segura-123', is_staff=True)
+        cls.token_cliente = str(ClienteTokenObtainPairSerializer.get_token(cliente).access_token)
+        cls.token_usuario = str(RefreshToken.for_user(usuario).access_token)
+
+    def setUp(self):
+        caches['api'].clear()
+
+    async def pedir(self, ruta, parametros=None, token=None, **cabeceras):
+        # Las cabeceras van por petición: AsyncClient(headers=...) las duplica con HTTP_
+        token = self.token_cliente if token is None else token
+        if token:
+            cabeceras['Authorization'] = f'Bearer {token}'
+        return await AsyncClient().get(ruta, parametros, headers=cabeceras)
+
+    async def test_listas(self):
+        respuesta = await self.pedir('/api/lectura/productos/')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(len(respuesta.json()), 5)
+        self.assertEqual(sum(1 for p in respuesta.json() if p['descuento_activo'] is not None), 1)
+
+        respuesta = await self.pedir('/api/lectura/productos/', {'page': 1, 'page_size': 2})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()['count'], 5)
+        self.assertEqual(len(respuesta.json()['results']), 2)
+        self.assertIsNotNone(respuesta.json()['next'])
+
+        respuesta = await self.pedir('/api/lectura/promociones/', {'page': 1})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()['count'], 1)
+
+        respuesta = await self.pedir('/api/lectura/categorias/', {'page': 1}, token=self.token_usuario)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()['count'], 1)
+
+    async def test_detalle_y_no_encontrado(self):
+        respuesta = await self.pedir(f'/api/lectura/productos/{self.producto.pk}/')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()['id'], self.producto.pk)
+        self.assertEqual((await self.pedir('/api/lectura/productos/0/')).status_code, 404)
+        self.assertEqual((await self.pedir('/api/lectura/productos/', {'page': 99})).status_code, 404)
+
+    async def test_etag(self):
+        respuesta = await self.pedir('/api/lectura/productos/')
+        etag = respuesta['ETag']
+        respuesta = await self.pedir('/api/lectura/productos/', **{'If-None-Match': etag})
+        self.assertEqual(respuesta.status_code, 304)
+
+    async def test_sin_token(self):
+        respuesta = await self.pedir('/api/lectura/productos/', token='')
+        self.assertEqual(respuesta.status_code, 401)
+        self.assertIn('WWW-Authenticate', respuesta)
+
+
+class LimiteLoginTests(TestCase):
+    """Límites del login de clientes: 5 fallos/min por usuario e IP, 20 intentos/min por IP."""
+    URL = '/api/clientes/token/'
+
+    @classmethod
+    def setUpTestData(cls):
+        Cliente.objects.create_user('cliente.test', 'cliente@test.cl', 'clave-segura-123')
+
+    def setUp(self):
+        caches['default'].clear()
+        self.api = APIClient()
+        # Reloj fijo a mitad de ventana: la prueba no depende de cruzar un minuto
+        reloj = mock.patch.object(VentanaDeslizanteThrottle, 'timer', return_value=1_800_000_030.0)
+        reloj.start()
+        self.addCleanup(reloj.stop)
+
+    def login(self, password, ip='10.0.0.1'):
+        return self.api.post(self.URL, {'username': 'cliente.test', 'password': password}, REMOTE_ADDR=ip).status_code
+
+    def test_fallos_bloquean_al_usuario_desde_esa_ip(self):
+        self.assertEqual([self.login('mala') for _ in range(5)], [400] * 5)
+        self.assertEqual(self.login('clave-segura-123'), 429)
+        # Los rechazos no alargan el bloqueo
+        self.assertEqual([self.login('mala') for _ in range(3)], [429] * 3)
+        # El dueño de la cuenta entra desde otra red
+        self.assertEqual(self.login('clave-segura-123', ip='10.0.0.2'), 200)
+
+    def test_logins_correctos_no_cuentan(self):
+        self.assertEqual([self.login('clave-segura-123') for _ in range(6)], [200] * 6)
+
+    def test_limite_por_ip(self):
+        estados = [
+            self.api.post(self.URL, {'username': f'otro{i}', 'password': 'mala'}, REMOTE_ADDR='10.0.0.3').status_code
+            for i in range(21)
+        ]
+        self.assertEqual(estados, [400] * 20 + [429])
+
+
+class PlanoSucursalTests(SimpleTestCase):
+    """
+    Pasillos en línea: 1 (x=-2) - 2 (x=0, entrada) - 3 (x=1) - 4 (x=4),
+    conectados en cadena. El 5 está en x=2 pero sin conexiones: en línea
+    recta quedaría cerca, por el grafo es inalcanzable.
+    """
+
+    def setUp(self):
+        nodos = {1: (-2, 0, False), 2: (0, 0, True), 3: (1, 0, False), 4: (4, 0, False), 5: (2, 0, False)}
+        self.plano = PlanoSucursal(nodos, [(1, 2, None), (2, 3, None), (3, 4, None)])
+
+    def test_distancias_por_el_grafo(self):
+        self.assertEqual(self.plano.distancia(1, 4), 6)
+        self.assertEqual(self.plano.distancia(4, 1), 6)
+        self.assertEqual(self.plano.distancia(3, 5), math.inf)
+
+    def test_orden_optimo(self):
+        # El vecino más cercano iría 3, 1, 4 (10 m); 2-opt lo deja en 1, 3, 4 (8 m)
+        orden = self.plano.ordenar([4, 3, 1])
+        self.assertEqual(orden, [1, 3, 4])
+        optimo = min(self.plano.largo([2, *ruta]) for ruta in permutations([1, 3, 4]))
+        self.assertEqual(self.plano.largo([2, *orden]), optimo)
+
+    def test_entrada_en_la_lista(self):
+        self.assertEqual(self.plano.ordenar([3, 2]), [2, 3])
+
+    def test_inalcanzable_al_final(self):
+        orden = self.plano.ordenar([5, 3, 4])
+        self.assertEqual(orden, [3, 4, 5])
+        self.assertEqual(self.plano.largo([2, *orden]), math.inf)
+
+    def test_sin_conexiones_en_linea_recta(self):
+        plano = PlanoSucursal({1: (0, 0, True), 2: (3, 4, False)}, [])
+        self.assertEqual(plano.distancia(1, 2), 5)
+
+
+class RutaSucursalTests(TestCase):
+    """Endpoint `ruta` y caché de planos por sucursal."""
+
+    def setUp(self):
+        planos_sucursal.planos, planos_sucursal.versiones = {}, None
+        categoria = Categoria.objects.create(nombre='Lácteos')
+        estanteria = Estanteria.objects.create(nombre='E1')
+        self.sucursal = Sucursal.objects.create(nombre='Centro', direccion='Calle 1')
+        self.pasillos = [Pasillo.objects.create(nombre=f'P{i}') for i in range(4)]
+        self.nodos = [
+            NodoPasillo.objects.create(sucursal=self.sucursal, pasillo=pasillo, x=x, y=0, es_entrada=(x == 0))
+            for pasillo, x in zip(self.pasillos[:3], (0, 10, 20))
+        ]
+        ConexionPasillo.objects.create(sucursal=self.sucursal, origen=self.nodos[0], destino=self.nodos[1])
+        ConexionPasillo.objects.create(sucursal=self.sucursal, origen=self.nodos[1], destino=self.nodos[2])
+        # Uno por pasillo; el del último pasillo no tiene nodo en el plano
+        self.productos = [
+            Producto.objects.create(
+                nombre=f'Producto {i}', precio=Decimal('1000'), categoria=categoria, estanteria=estanteria, pasillo=pasillo,
+            ).pk
+            for i, pasillo in enumerate(self.pasillos)
+        ]
+        self.api = cliente_api()
+
+    def test_ruta(self):
+        pedidos = [self.productos[2], self.productos[3], self.productos[1], 0]
+        respuesta = self.api.post(f'/api/sucursales/{self.sucursal.pk}/ruta/', {'productos': pedidos}, format='json')
+        self.assertEqual(respuesta.status_code, 200)
+        datos = respuesta.json()
+        self.assertEqual([t['pasillo'] for t in datos['ruta']], ['P1', 'P2'])
+        self.assertEqual(datos['distancia_total'], 20)
+        self.assertEqual([t['pasillo'] for t in datos['sin_plano']], ['P3'])
+        self.assertEqual(datos['no_encontrados'], [0])
+
+    def test_cache_de_planos(self):
+        plano = planos_sucursal.obtener(self.sucursal.pk)
+        self.assertIs(planos_sucursal.obtener(self.sucursal.pk), plano)
+        self.assertEqual(plano.distancia(self.pasillos[0].pk, self.pasillos[2].pk), 20)
+
+        # Un atajo nuevo cambia la versión de ConexionPasillo y el plano se reconstruye
+        with self.captureOnCommitCallbacks(execute=True):
+            ConexionPasillo.objects.create(
+                sucursal=self.sucursal, origen=self.nodos[0], destino=self.nodos[2], distancia=5,
+            )
+        plano = planos_sucursal.obtener(self.sucursal.pk)
+        self.assertEqual(plano.distancia(self.pasillos[0].pk, self.pasillos[2].pk), 5)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            NodoPasillo.objects.create(sucursal=self.sucursal, pasillo=self.pasillos[3], x=30, y=0)
+        self.assertIn(self.pasillos[3].pk, planos_sucursal.obtener(self.sucursal.pk).nodos)
+
+
+class SucursalesCercanasTests(TestCase):
+    """La grilla en memoria devuelve lo mismo que medir todas las sucursales (haversine)."""
+    K = 5
+
+    @classmethod
+    def setUpTestData(cls):
+        azar = random.Random(7)
+        # Repartidas por el mundo, un grupo denso en Santiago y algunas sin coordenadas
+        puntos = [(azar.uniform(-85, 85), azar.uniform(-180, 180)) for _ in range(150)]
+        puntos += [(-33.45 + azar.uniform(-0.3, 0.3), -70.66 + azar.uniform(-0.3, 0.3)) for _ in range(150)]
+        Sucursal.objects.bulk_create(
+            [Sucursal(nombre=f'S{i}', direccion='-', latitud=round(Decimal(lat), 6), longitud=round(Decimal(lon), 6))
+             for i, (lat, lon) in enumerate(puntos)] +
+            [Sucursal(nombre=f'Sin coordenadas {i}', direccion='-') for i in range(5)]
+        )
+        cls.coordenadas = {
+            pk: (float(lat), float(lon))
+            for pk, lat, lon in Sucursal.objects.filter(latitud__isnull=False).values_list('id', 'latitud', 'longitud')
+        }
+        cls.sin_coordenadas = set(Sucursal.objects.filter(latitud__isnull=True).values_list('id', flat=True))
+
+        categoria, estanteria, pasillo = crear_catalogo(1)
+        cls.producto = Producto.objects.get()
+        cls.con_producto = set(azar.sample(sorted(cls.coordenadas), 40)) | cls.sin_coordenadas
+        UbicacionProducto.objects.bulk_create([
+            UbicacionProducto(producto=cls.producto, sucursal_id=pk, pasillo=pasillo, estanteria=estanteria)
+            for pk in cls.con_producto
+        ])
+        cls.consultas = [(azar.uniform(-85, 85), azar.uniform(-180, 180)) for _ in range(40)]
+        cls.consultas += [(-33.45 + azar.uniform(-0.5, 0.5), -70.66 + azar.uniform(-0.5, 0.5)) for _ in range(20)]
+        cls.consultas += [(0.0, 179.99), (0.0, -179.99), (89.9, 0.0), (-89.9, 120.0)]
+
+    def setUp(self):
+        indice_sucursales.construido = False
+
+    def fuerza_bruta(self, latitud, longitud, ids):
+        distancias = sorted((distancia_km(latitud, longitud, *self.coordenadas[pk]), pk) for pk in ids)
+        return [pk for _, pk in distancias[:self.K]]
+
+    def comparar(self, producto=None):
+        ids = self.coordenadas if producto is None else self.con_producto - self.sin_coordenadas
+        for latitud, longitud in self.consultas:
+            with self.subTest(latitud=latitud, longitud=longitud):
+                filas = sucursales_cercanas(latitud, longitud, self.K, producto)
+                self.assertEqual([fila['id'] for fila in filas], self.fuerza_bruta(latitud, longitud, ids))
+                self.assertEqual([fila['distancia_km'] for fila in filas], sorted(fila['distancia_km'] for fila in filas))
+
+    def test_igual_a_fuerza_bruta(self):
+        self.comparar()
+
+    def test_filtro_por_producto_medido_directo(self):
+        self.comparar(self.producto.pk)
+
+    @override_settings(CERCANIA={'MOTOR': 'grilla', 'PRECISION': 5, 'MAXIMO_DIRECTO': 0})
+    def test_filtro_por_producto_en_la_grilla(self):
+        self.comparar(self.producto.pk)
+
+    def test_sin_coordenadas_no_aparecen(self):
+        filas = sucursales_cercanas(-33.45, -70.66, len(self.coordenadas) + 10)
+        self.assertEqual({fila['id'] for fila in filas}, set(self.coordenadas))
+
+
+class ReplicasCacheTests(SimpleTestCase):
+    """La lectura propia tras escribir necesita una caché común a todos los workers."""
+
+    def setUp(self):
+        replicas = mock.patch('mantenedores.replicas.alias_replicas', return_value=['replica_1'])
+        replicas.start()
+        self.addCleanup(replicas.stop)
+
+    def test_memoria_local_no_sirve(self):
+        with self.assertRaises(ImproperlyConfigured):
+            ReplicaMiddleware(lambda request: None)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                                           'LOCATION': '/tmp/superlocaliza-tests-replicas'}})
+    def test_cache_compartida(self):
+        self.assertTrue(ReplicaMiddleware(lambda request: None).activo)
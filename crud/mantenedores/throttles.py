@@ -0,0 +1,98 @@
+# mantenedores/throttles.py
+
+import time
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class VentanaDeslizanteThrottle(SimpleRateThrottle):
+    """
+    Limitador con contador de ventana deslizante: estima los intentos del
+    último período como el contador de la ventana actual más la parte
+    proporcional de la ventana anterior. Usa dos claves enteras por
+    identidad con `incr` (atómico en Redis), en vez de la lista de
+    timestamps de SimpleRateThrottle. La caché es la `default` de Django:
+    compartida si CACHE_URL apunta a Redis, memoria local si no.
+
+    Los intentos rechazados también cuentan, así un ataque sostenido sigue
+    bloqueado hasta que se detenga (salvo en LoginUsuarioThrottle, que solo
+    cuenta fallos).
+    """
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        return self.estimar(self.key, sumar=True) <= self.num_requests
+
+    def estimar(self, clave, sumar):
+        """
+        Intentos del último período: el contador de la ventana actual (más
+        uno si `sumar`) y la parte proporcional de la anterior. Deja en
+        `espera` el tiempo hasta que el peso de la ventana anterior baje.
+        """
+        ahora = self.timer()
+        ventana = int(ahora // self.duration)
+        actual = f"{clave}:{ventana}"
+        if not sumar:
+            intentos = self.cache.get(actual, 0)
+        elif not self.cache.add(actual, 1, self.duration * 2):
+            try:
+                intentos = self.cache.incr(actual)
+            except ValueError:  # expiró entre add() e incr()
+                self.cache.set(actual, 1, self.duration * 2)
+                intentos = 1
+        else:
+            intentos = 1
+        anteriores = self.cache.get(f"{clave}:{ventana - 1}", 0)
+        transcurrido = (ahora % self.duration) / self.duration
+        self.espera = self.duration * (1 - transcurrido) if anteriores else self.duration - ahora % self.duration
+        return anteriores * (1 - transcurrido) + intentos
+
+    def wait(self):
+        return getattr(self, 'espera', None)
+
+    def timer(self):
+        return time.time()
+
+
+class LoginIPThrottle(VentanaDeslizanteThrottle):
+    """Intentos de login por IP."""
+    scope = 'login_ip'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class LoginUsuarioThrottle(VentanaDeslizanteThrottle):
+    """
+    Logins fallidos por nombre de usuario e IP. A diferencia de los otros
+    límites solo cuentan las credenciales incorrectas (las registra el
+    serializer con `registrar_fallo`), no los intentos rechazados ni los
+    exitosos; y con la IP en la clave, quien conoce un usuario no puede
+    dejar a su dueño sin entrar desde otra red. Los ataques desde una sola
+    IP los frena además LoginIPThrottle.
+    """
+    scope = 'login_usuario'
+
+    def get_cache_key(self, request, view):
+        username = request.data.get('username') if hasattr(request.data, 'get') else None
+        if not username:
+            return None
+        ident = f"{str(username).strip().lower()[:150]}:{self.get_ident(request)}"
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        return self.estimar(self.key, sumar=False) < self.num_requests
+
+    def registrar_fallo(self, request):
+        if self.rate is None:
+            return
+        clave = self.get_cache_key(request, None)
+        if clave is not None:
+            self.estimar(clave, sumar=True)
@@ -12,6 +12,9 @@ urlpatterns = [
     path('usuario/', views.usuarios_list, name='usuarios_list'),
     path('proveedor/', views.proveedores_list, name='proveedores_list'),
     path('promocion/', views.promociones_list, name='promociones_list'),
+    path('<str:tipo>/<int:pk>/formulario/', views.formulario_edicion, name='formulario_edicion'),
+
+    path('salud/', views.salud, name='salud'),
 
     path('login/', auth_views.LoginView.as_view(template_name='core/login.html'), name='login'),
     path('logout/', auth_views.LogoutView.as_view(next_page='login'), name='logout'),
@@ -0,0 +1,95 @@
+# mantenedores/versiones.py
+
+import hashlib
+from datetime import datetime, time
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from .models import VersionModelo
+
+
+def incrementar_version(modelo):
+    """Incrementa el contador de versión de un modelo (clase o nombre)."""
+    nombre = modelo if isinstance(modelo, str) else modelo._meta.model_name
+    ahora = timezone.now()
+    actualizados = VersionModelo.objects.filter(modelo=nombre).update(
+        version=F('version') + 1, actualizado=ahora
+    )
+    if not actualizados:
+        VersionModelo.objects.get_or_create(modelo=nombre, defaults={'version': 1, 'actualizado': ahora})
+
+
+def obtener_versiones(modelos):
+    """Devuelve {nombre_modelo: (version, actualizado)} en una sola consulta."""
+    nombres = [m._meta.model_name for m in modelos]
+    filas = VersionModelo.objects.filter(modelo__in=nombres).values_list('modelo', 'version', 'actualizado')
+    return {modelo: (version, actualizado) for modelo, version, actualizado in filas}
+
+
+async def aobtener_versiones(modelos):
+    """`obtener_versiones` con el ORM async."""
+    nombres = [m._meta.model_name for m in modelos]
+    filas = VersionModelo.objects.filter(modelo__in=nombres).values_list('modelo', 'version', 'actualizado')
+    return {modelo: (version, actualizado) async for modelo, version, actualizado in filas}
+
+
+def calcular_validadores(request, modelos, versiones, depende_de_fecha=False):
+    """ETag y Last-Modified (timestamp o None) de una lectura de `modelos`."""
+    partes = [
+        request.get_full_path(),
+        request.META.get('HTTP_ACCEPT', ''),
+    ]
+    fechas = []
+    for modelo in modelos:
+        version, actualizado = versiones.get(modelo._meta.model_name, (0, None))
+        partes.append(f"{modelo._meta.model_name}:{version}")
+        if actualizado:
+            fechas.append(actualizado)
+    if depende_de_fecha:
+        hoy = timezone.localdate()
+        partes.append(hoy.isoformat())
+        fechas.append(timezone.make_aware(datetime.combine(hoy, time.min)))
+
+    etag = '"%s"' % hashlib.sha1('|'.join(partes).encode()).hexdigest()
+    last_modified = int(max(fechas).timestamp()) if fechas else None
+    return etag, last_modified
+
+
+class ETagVersionMixin:
+    """
+    Agrega ETag fuerte y Last-Modified a `list` y `retrieve` de un ViewSet,
+    derivados de los contadores de versión de `modelos_version`. Si el cliente
+    envía If-None-Match / If-Modified-Since vigentes se responde 304 sin
+    consultar la tabla ni serializar.
+
+    `depende_de_fecha` indica que la respuesta cambia con el día aunque no
+    cambien los datos (p. ej. promociones vigentes).
+    """
+    modelos_version = ()
+    depende_de_fecha = False
+
+    def validadores(self, request):
+        modelos = self.modelos_version or (self.queryset.model,)
+        return calcular_validadores(request, modelos, obtener_versiones(modelos), self.depende_de_fecha)
+
+    def respuesta_condicional(self, request, generar):
+        etag, last_modified = self.validadores(request)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = self.generar_respuesta(request, etag, generar)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def generar_respuesta(self, request, etag, generar):
+        """Punto de extensión para servir la respuesta desde caché (ver cache_api.py)."""
+        return generar()
+
+    def list(self, request, *args, **kwargs):
+        return self.respuesta_condicional(request, lambda: super(ETagVersionMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.respuesta_condicional(request, lambda: super(ETagVersionMixin, self).retrieve(request, *args, **kwargs))
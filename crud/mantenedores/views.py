@@ -1,23 +1,72 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.conf import settings
+from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.core.paginator import Paginator
+from django.http import Http404, JsonResponse
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from .authentication import ClienteJWTAuthentication 
-from django.contrib.auth.hashers import make_password
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import status
+# Con alias: `from .models import *` trae el ValidationError de Django
+from rest_framework.exceptions import ValidationError as ErrorValidacion
+import math
+from datetime import timedelta
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from .models import *
 from .forms import *
 
-from rest_framework.viewsets import ModelViewSet
-from rest_framework.permissions import IsAuthenticated, AllowAny 
+from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
+from rest_framework.authentication import SessionAuthentication
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from django.http import StreamingHttpResponse
 from .serializers import *
 from .models import *
+from .versiones import ETagVersionMixin
+from .cache_api import CacheVersionadaMixin
+from .busqueda import buscar_productos
+from .autocompletar import indice_autocompletar
+from .rutas import planificar_ruta
+from .hashing import ServicioSaturado, generar_hash, verificar_password
+from .throttles import LoginIPThrottle, LoginUsuarioThrottle
+from .importacion import ImportadorProductos, detectar_formato, exportar_productos, leer_filas
+from .instrumentacion import con_presupuesto
+from .replicas import estado_bases
+from .estadisticas import resumen_dashboard
+from .imagenes import analizar_imagen
+from .tareas import encolar_imagen, importar_productos
+from .signals import en_lote
+from .precios import completar_descuentos
+from .cercania import sucursales_cercanas
+
+# Filas por página en las tablas del panel de administración
+POR_PAGINA = 25
+
+
+def filtrar_y_paginar(request, queryset, campos_busqueda):
+    """
+    Filtra en la base por ?q= (icontains sobre `campos_busqueda`) y devuelve
+    solo la página pedida (?page=), para no renderizar la tabla completa.
+    """
+    q = request.GET.get('q', '').strip()
+    if q:
+        filtro = Q()
+        for campo in campos_busqueda:
+            filtro |= Q(**{f'{campo}__icontains': q})
+        queryset = queryset.filter(filtro)
+    pagina = Paginator(queryset.order_by('id'), POR_PAGINA).get_page(request.GET.get('page'))
+    return pagina, q
+
 
 # Create your views here.
 @login_required
 def productos_list(request):
-    productos = Producto.objects.all()
+    productos = Producto.objects.select_related('categoria', 'estanteria', 'pasillo', 'precio_efectivo')
     form = ProductoForm()
 
     if request.method == 'POST':
@@ -49,6 +98,10 @@ def productos_list(request):
     estanteria = Estanteria.objects.all()
     pasillo = Pasillo.objects.all()
 
+    # Descuentos de los productos con PrecioEfectivo atrasado en una sola consulta
+    productos = list(productos)
+    completar_descuentos(productos)
+
     return render(request, 'core/productos_list.html', {
     'productos': productos,
     'form': form,
@@ -144,9 +197,9 @@ def pasillo_list(request):
         'form': form               # 🔹 pasar el form
     })
 
+@con_presupuesto(6)
 @login_required
 def clientes_list(request):
-    clientes = Cliente.objects.all()
     form = ClienteForm()  # Form para crear
 
     if request.method == 'POST':
@@ -156,9 +209,13 @@ def clientes_list(request):
             if form.is_valid():
                 cliente = form.save(commit=False)
                 # Guardar la contraseña de forma segura
-                cliente.password = make_password(form.cleaned_data['password'])
-                cliente.save()
-                return redirect('cliente_list')
+                try:
+                    cliente.asignar_password_hash(generar_hash(form.cleaned_data['password']))
+                except ServicioSaturado as e:
+                    form.add_error(None, str(e.detail))
+                else:
+                    cliente.save()
+                    return redirect(request.get_full_path())
 
         # Editar cliente
         if "editar_cliente" in request.POST:
@@ -168,24 +225,30 @@ def clientes_list(request):
                 cliente_editado = form_editar.save(commit=False)
                 # Solo actualizar la contraseña si se ingresó una nueva
                 password = form_editar.cleaned_data.get('password')
-                if password:
-                    cliente_editado.password = make_password(password)
-                cliente_editado.save()
-                return redirect('cliente_list')
+                try:
+                    if password:
+                        # asignar_password_hash también revoca los tokens de la app
+                        cliente_editado.asignar_password_hash(generar_hash(password))
+                except ServicioSaturado as e:
+                    # El form de edición vive en un modal que se pide aparte: se avisa arriba de la lista
+                    messages.error(request, f"No se guardaron los cambios de {cliente.username}: {e.detail}")
+                else:
+                    cliente_editado.save()
+                return redirect(request.get_full_path())
 
 
         # Eliminar cliente
         if "eliminar_cliente" in request.POST:
             cliente = get_object_or_404(Cliente, id=request.POST.get("id"))
             cliente.delete()
-            return redirect('cliente_list')
+            return redirect(request.get_full_path())
 
-    # Crear un form de edición para cada cliente
-    for c in clientes:
-        c.form_editar = ClienteForm(instance=c)
+    # El form de edición se pide por fila al abrir el modal (formulario_edicion)
+    clientes, q = filtrar_y_paginar(request, Cliente.objects.all(), ['username', 'nombre', 'apellido', 'email'])
 
     return render(request, 'core/clientes_list.html', {
         'clientes': clientes,
+        'q': q,
         'form': form,
     })
 
@@ -218,15 +281,11 @@ def sucursal_list(request):
         'form': form               # 🔹 pasar el form
     })
 
+@con_presupuesto(6)
 @login_required
 def usuarios_list(request):
-    usuarios = Usuario.objects.all()
     form = UsuarioForm()  # Para crear
 
-    # Generar forms de edición y meterlos dentro del usuario
-    for u in usuarios:
-        u.form_editar = UsuarioForm(instance=u)
-
     if request.method == 'POST':
         if "crear_usuario" in request.POST:
             form = UsuarioForm(request.POST)
@@ -235,7 +294,7 @@ def usuarios_list(request):
                 if form.cleaned_data['password']:
                     usuario.set_password(form.cleaned_data['password'])
                 usuario.save()
-                return redirect('usuarios_list')
+                return redirect(request.get_full_path())
 
         if "editar_usuario" in request.POST:
             usuario = get_object_or_404(Usuario, id=request.POST.get("id"))
@@ -245,21 +304,26 @@ def usuarios_list(request):
                 if form.cleaned_data['password']:
                     usuario.set_password(form.cleaned_data['password'])
                 usuario.save()
-                return redirect('usuarios_list')
+                return redirect(request.get_full_path())
 
         if "eliminar_usuario" in request.POST:
             usuario = get_object_or_404(Usuario, id=request.POST.get("id"))
             usuario.delete()
-            return redirect('usuarios_list')
+            return redirect(request.get_full_path())
+
+    usuarios, q = filtrar_y_paginar(
+        request, Usuario.objects.select_related('sucursal'), ['username', 'first_name', 'last_name', 'email']
+    )
 
     return render(request, 'core/usuarios_list.html', {
         'usuarios': usuarios,
+        'q': q,
         'form': form,  # solo crear
     })
 
+@con_presupuesto(6)
 @login_required
 def proveedores_list(request):
-    proveedores = Proveedor.objects.all()
     form = ProveedorForm()
 
     if request.method == 'POST':
@@ -267,32 +331,31 @@ def proveedores_list(request):
             form = ProveedorForm(request.POST)
             if form.is_valid():
                 form.save()
-                return redirect('proveedores_list')
+                return redirect(request.get_full_path())
 
         if "editar_proveedor" in request.POST:
             proveedor = get_object_or_404(Proveedor, id=request.POST.get("id"))
             form = ProveedorForm(request.POST, instance=proveedor)
             if form.is_valid():
                 form.save()
-                return redirect('proveedores_list')
+                return redirect(request.get_full_path())
 
         if "eliminar_proveedor" in request.POST:
             proveedor = get_object_or_404(Proveedor, id=request.POST.get("id"))
             proveedor.delete()
-            return redirect('proveedores_list')
+            return redirect(request.get_full_path())
 
-    # inyectar form_editar en cada proveedor
-    for p in proveedores:
-        p.form_editar = ProveedorForm(instance=p)
+    proveedores, q = filtrar_y_paginar(request, Proveedor.objects.all(), ['nombre', 'contacto', 'email'])
 
     return render(request, 'core/proveedores_list.html', {
         'proveedores': proveedores,
+        'q': q,
         'form': form,
     })
 
+@con_presupuesto(7)
 @login_required
 def promociones_list(request):
-    promociones = Promocion.objects.all()
     form = PromocionForm()
 
     if request.method == 'POST':
@@ -300,52 +363,86 @@ def promociones_list(request):
             form = PromocionForm(request.POST)
             if form.is_valid():
                 form.save()
-                return redirect('promociones_list')
+                return redirect(request.get_full_path())
 
         if "editar_promocion" in request.POST:
             promocion = get_object_or_404(Promocion, id=request.POST.get("id"))
             form = PromocionForm(request.POST, instance=promocion)
             if form.is_valid():
                 form.save()
-                return redirect('promociones_list')
+                return redirect(request.get_full_path())
 
         if "eliminar_promocion" in request.POST:
             promocion = get_object_or_404(Promocion, id=request.POST.get("id"))
             promocion.delete()
-            return redirect('promociones_list')
+            return redirect(request.get_full_path())
 
-    # Crear forms individuales para edición en cada modal
-    for p in promociones:
-        p.form_editar = PromocionForm(instance=p)
+    promociones, q = filtrar_y_paginar(
+        request, Promocion.objects.select_related('producto'), ['nombre', 'producto__nombre']
+    )
 
     return render(request, 'core/promociones_list.html', {
         'promociones': promociones,
+        'q': q,
         'form': form,
     })
 
+# Formularios de edición que se cargan al abrir el modal de una fila
+FORMULARIOS_EDICION = {
+    'cliente': (Cliente, ClienteForm),
+    'usuario': (Usuario, UsuarioForm),
+    'proveedor': (Proveedor, ProveedorForm),
+    'promocion': (Promocion, PromocionForm),
+}
+
+@login_required
+def formulario_edicion(request, tipo, pk):
+    """Devuelve solo el cuerpo del form de edición de una fila (HTML parcial)."""
+    if tipo not in FORMULARIOS_EDICION:
+        raise Http404
+    modelo, form_class = FORMULARIOS_EDICION[tipo]
+    instancia = get_object_or_404(modelo, pk=pk)
+    return render(request, 'core/form_editar.html', {
+        'form': form_class(instance=instancia),
+        'tipo': tipo,
+    })
+
+@con_presupuesto(6)
 @login_required
 def dashboard(request):
-    # Traer algunos datos para mostrar resúmenes
-    total_productos = Producto.objects.count()
-    total_promociones = Promocion.objects.count()
-    total_proveedores = Proveedor.objects.count()
-    total_clientes = Cliente.objects.count()
-    total_sucursales = Sucursal.objects.count()
+    # Totales y métricas precalculadas (estadisticas.py): sin COUNT(*) por carga
+    resumen = resumen_dashboard()
 
     # Puedes limitar la cantidad de items que se muestran en mini-cards
-    ultimos_productos = Producto.objects.all().order_by('-id')[:5]
-    ultimas_promociones = Promocion.objects.all().order_by('-id')[:5]
+    ultimos_productos = Producto.objects.select_related('categoria').order_by('-id')[:5]
+    ultimas_promociones = Promocion.objects.select_related('producto').order_by('-id')[:5]
 
     return render(request, 'core/dashboard.html', {
-        'total_productos': total_productos,
-        'total_promociones': total_promociones,
-        'total_proveedores': total_proveedores,
-        'total_clientes': total_clientes,
-        'total_sucursales': total_sucursales,
+        **resumen,
         'ultimos_productos': ultimos_productos,
         'ultimas_promociones': ultimas_promociones,
     })
-    return render(request, 'core/dashboard.html', {})
+
+def salud(request):
+    """
+    Health check para el balanceador: 503 si la primaria no responde.
+    Una réplica caída o atrasada solo deja el estado en 'degradado' (las
+    lecturas vuelven a la primaria). Sin sesión de staff solo se informa
+    ok/atraso de cada base.
+    """
+    bases = estado_bases(detalle=request.user.is_staff)
+    primaria = bases.pop('default')
+    maximo = settings.REPLICAS.get('LAG_MAXIMO', 5)
+    if not primaria['ok']:
+        estado = 'error'
+    elif any(not replica['ok'] or replica['atraso_s'] > maximo for replica in bases.values()):
+        estado = 'degradado'
+    else:
+        estado = 'ok'
+    return JsonResponse(
+        {'estado': estado, 'primaria': primaria, 'replicas': bases},
+        status=503 if estado == 'error' else 200,
+    )
 
 # -------------------------------------------------------------
 # --- SERIALIZERS
@@ -354,28 +451,269 @@ def dashboard(request):
 class ClienteTokenObtainPairView(TokenObtainPairView):
     """Vista para que los Clientes obtengan su token."""
     serializer_class = ClienteTokenObtainPairSerializer
+    # Se evalúan antes de buscar al cliente y de calcular el hash
+    throttle_classes = [LoginIPThrottle, LoginUsuarioThrottle]
 
 class ClienteTokenRefreshView(TokenRefreshView):
     """Vista para que los Clientes refresquen su token."""
     serializer_class = ClienteTokenRefreshSerializer
 
-class ProductoViewSet(ModelViewSet):
+class ProductoViewSet(CacheVersionadaMixin, ModelViewSet):
     queryset = Producto.objects.all()
     serializer_class = ProductoSerializer
+    # Consultas máximas por acción (ver instrumentacion.py); una página de
+    # productos no debe crecer con la cantidad de filas. list/retrieve
+    # incluyen la consulta de descuentos con PrecioEfectivo atrasado.
+    presupuesto_consultas = {'list': 5, 'retrieve': 4, 'search': 4, 'autocomplete': 2, 'changes': 8, 'precios': 12}
+    # El producto muestra nombres de FKs y el descuento vigente del día
+    modelos_version = (Producto, Promocion, Categoria, Estanteria, Pasillo, PrecioEfectivo)
+    depende_de_fecha = True
     
     # --- 2. APLICA LA AUTENTICACIÓN Y PERMISOS ---
     authentication_classes = [ClienteJWTAuthentication]
     permission_classes = [IsAuthenticated]
 
-class PromocionViewSet(ModelViewSet):
+    def get_queryset(self):
+        # FKs y el precio efectivo precalculado (precios.py) en el mismo JOIN
+        return Producto.objects.select_related(
+            'categoria', 'estanteria', 'pasillo', 'precio_efectivo'
+        )
+
+    @action(detail=False, methods=['get'], url_path='search')
+    def search(self, request):
+        """
+        Búsqueda de productos por texto: ?q=<texto>&limit=<n>
+        Ordena por relevancia (texto completo + similitud por trigramas).
+        """
+        q = request.query_params.get('q', '').strip()
+        if not q:
+            return Response({"q": ["Debe indicar un texto de búsqueda."]}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limite = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+        except ValueError:
+            return Response({"limit": ["Debe ser un número entero."]}, status=status.HTTP_400_BAD_REQUEST)
+
+        ids = buscar_productos(q, limite)
+        productos = self.get_queryset().in_bulk(ids)
+        ordenados = [productos[i] for i in ids if i in productos]
+        return Response(self.get_serializer(ordenados, many=True).data)
+
+    @action(detail=False, methods=['get'], url_path='autocomplete')
+    def autocomplete(self, request):
+        """
+        Sugerencias por prefijo para el buscador: ?q=<prefijo>&k=<n>
+        Se responde desde el índice en memoria, sin consultar la base de datos.
+        """
+        try:
+            k = min(max(int(request.query_params.get('k', 10)), 1), 50)
+        except ValueError:
+            return Response({"k": ["Debe ser un número entero."]}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(indice_autocompletar.buscar(request.query_params.get('q', ''), k))
+
+    # --- Carga masiva (panel de administración: usuarios staff) ---
+
+    @action(detail=False, methods=['post'], authentication_classes=[JWTAuthentication, SessionAuthentication],
+            permission_classes=[IsAdminUser])
+    def importar(self, request):
+        """
+        Importa un archivo CSV/JSONL (campo `archivo`) haciendo upsert por código.
+        Parámetros opcionales: formato=csv|jsonl, crear_faltantes=1,
+        en_segundo_plano=1 (202 con la tarea en vez del resumen).
+        """
+        archivo = request.FILES.get('archivo')
+        if archivo is None:
+            return Response({"archivo": ["Debe adjuntar un archivo."]}, status=status.HTTP_400_BAD_REQUEST)
+        formato = detectar_formato(archivo.name, request.data.get('formato'))
+        if formato not in ('csv', 'jsonl'):
+            return Response({"formato": ["Use csv o jsonl."]}, status=status.HTTP_400_BAD_REQUEST)
+
+        crear_faltantes = request.data.get('crear_faltantes') in ('1', 'true', True)
+        if request.data.get('en_segundo_plano') in ('1', 'true', True):
+            # Archivos grandes: responde enseguida; el resumen queda en la tarea
+            tarea = importar_productos.encolar(adjunto=archivo.read(), formato=formato, crear_faltantes=crear_faltantes)
+            return Response(TareaSerializer(tarea).data, status=status.HTTP_202_ACCEPTED)
+
+        importador = ImportadorProductos(crear_faltantes=crear_faltantes)
+        return Response(importador.importar(leer_filas(archivo, formato)))
+
+    @action(detail=False, methods=['get'], authentication_classes=[JWTAuthentication, SessionAuthentication],
+            permission_classes=[IsAdminUser])
+    def exportar(self, request):
+        """Descarga el catálogo completo en streaming: ?formato=csv|jsonl"""
+        formato = request.query_params.get('formato', 'csv')
+        if formato not in ('csv', 'jsonl'):
+            return Response({"formato": ["Use csv o jsonl."]}, status=status.HTTP_400_BAD_REQUEST)
+        tipo = 'text/csv' if formato == 'csv' else 'application/x-ndjson'
+        response = StreamingHttpResponse(exportar_productos(formato), content_type=f'{tipo}; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="productos.{formato}"'
+        return response
+
+    @action(detail=True, methods=['post'], authentication_classes=[JWTAuthentication, SessionAuthentication],
+            permission_classes=[IsAdminUser])
+    def imagen(self, request, pk=None):
+        """
+        Reemplaza la imagen del producto (campo `imagen`, multipart). Se valida
+        en el momento y la subida y las derivadas se hacen en segundo plano:
+        responde 202 con la tarea a consultar en /api/tareas/<id>/.
+        """
+        producto = self.get_object()
+        archivo = request.FILES.get('imagen')
+        if archivo is None:
+            return Response({"imagen": ["Debe adjuntar una imagen."]}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            analizar_imagen(archivo)
+        except ValueError as e:
+            return Response({"imagen": [str(e)]}, status=status.HTTP_400_BAD_REQUEST)
+        tarea = encolar_imagen(producto, archivo)
+        return Response(TareaSerializer(tarea).data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=False, methods=['post'], authentication_classes=[JWTAuthentication, SessionAuthentication],
+            permission_classes=[IsAdminUser])
+    def precios(self, request):
+        """
+        Cambia el precio de varios productos en una transacción:
+        [{"id": 1, "precio": "990.00"}, ...]. Responde cada ítem con su
+        `precio_anterior`; si alguno no es válido no se guarda ninguno y los
+        errores vienen en la posición de cada ítem.
+        """
+        serializer = PrecioLoteSerializer(data=request.data, many=True, allow_empty=False, max_length=MAXIMO_LOTE)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data)
+
+    # Solapamiento entre sincronizaciones: cubre transacciones que confirman
+    # con un updated_at anterior al watermark entregado (la app hace upsert).
+    MARGEN_SINCRONIZACION = timedelta(seconds=5)
+
+    @action(detail=False, methods=['get'], url_path='changes')
+    def changes(self, request):
+        """
+        Sincronización incremental del catálogo: ?since=<watermark ISO 8601>.
+        Devuelve solo lo creado/modificado/eliminado desde el watermark y el
+        nuevo watermark. Sin `since`, o si es anterior a los tombstones que
+        se conservan, devuelve el catálogo completo con `completo: true`: la
+        app debe reemplazar sus datos en vez de hacer upsert.
+        """
+        ahora = timezone.now()
+        since = request.query_params.get('since')
+        desde = None
+        if since:
+            desde = parse_datetime(since)
+            if desde is None:
+                return Response({"since": ["Formato de fecha inválido (ISO 8601)."]}, status=status.HTTP_400_BAD_REQUEST)
+            if timezone.is_naive(desde):
+                desde = timezone.make_aware(desde)
+            desde -= self.MARGEN_SINCRONIZACION
+            retencion = timedelta(days=settings.SINCRONIZACION['RETENCION_ELIMINACIONES_DIAS'])
+            if desde < ahora - retencion:
+                # Las bajas de entonces ya pueden estar purgadas
+                desde = None
+
+        def cambiados(queryset):
+            return queryset if desde is None else queryset.filter(updated_at__gt=desde)
+
+        promociones = cambiados(Promocion.objects.all())
+        productos = self.get_queryset()
+        if desde is not None:
+            # El precio con descuento también cambia cuando una promoción
+            # empieza o termina por fecha, sin que se modifique ninguna fila.
+            hoy, dia_desde = ahora.date(), desde.date()
+            por_fecha = Promocion.objects.filter(
+                Q(fecha_inicio__gt=dia_desde, fecha_inicio__lte=hoy) |
+                Q(fecha_fin__gte=dia_desde, fecha_fin__lt=hoy)
+            )
+            # El producto lleva los nombres de su categoría, estantería y
+            # pasillo: renombrarlos también lo cambia
+            productos = productos.filter(
+                Q(updated_at__gt=desde) |
+                Q(categoria__updated_at__gt=desde) |
+                Q(estanteria__updated_at__gt=desde) |
+                Q(pasillo__updated_at__gt=desde) |
+                Q(id__in=promociones.values('producto_id')) |
+                Q(id__in=por_fecha.values('producto_id'))
+            )
+
+        eliminados = {}
+        if desde is not None:
+            for modelo, objeto_id in Eliminacion.objects.filter(fecha__gt=desde).values_list('modelo', 'objeto_id'):
+                eliminados.setdefault(modelo, []).append(objeto_id)
+
+        contexto = self.get_serializer_context()
+        return Response({
+            'watermark': ahora.isoformat(),
+            'completo': desde is None,
+            'productos': ProductoSerializer(productos, many=True, context=contexto).data,
+            'promociones': PromocionSerializer(promociones, many=True, context=contexto).data,
+            'categorias': CategoriaSerializer(cambiados(Categoria.objects.all()), many=True, context=contexto).data,
+            'estanterias': EstanteriaSerializer(cambiados(Estanteria.objects.all()), many=True, context=contexto).data,
+            'pasillos': PasilloSerializer(cambiados(Pasillo.objects.all()), many=True, context=contexto).data,
+            'eliminados': {
+                'productos': eliminados.get('producto', []),
+                'promociones': eliminados.get('promocion', []),
+                'categorias': eliminados.get('categoria', []),
+                'estanterias': eliminados.get('estanteria', []),
+                'pasillos': eliminados.get('pasillo', []),
+            },
+        })
+
+class PromocionViewSet(ETagVersionMixin, ModelViewSet):
     queryset = Promocion.objects.all()
     serializer_class = PromocionSerializer
+    presupuesto_consultas = {'list': 4, 'retrieve': 3, 'lote': 20}
     authentication_classes = [ClienteJWTAuthentication]
     permission_classes = [IsAuthenticated]
 
-class ClienteViewSet(ModelViewSet):
+    @action(detail=False, methods=['post', 'patch', 'delete'], authentication_classes=[JWTAuthentication, SessionAuthentication],
+            permission_classes=[IsAdminUser])
+    def lote(self, request):
+        """
+        Varias promociones en una petición y una transacción:
+        POST [{...}, ...] crea, PATCH [{"id": 1, ...}, ...] modifica y
+        DELETE {"ids": [...]} elimina. En POST y PATCH, si algún ítem no es
+        válido (incluidas fechas cruzadas entre ítems del lote) no se guarda
+        ninguno y los errores vienen en la posición de cada ítem.
+        """
+        if request.method == 'DELETE':
+            return self.eliminar_lote(request)
+        instancias = None
+        if request.method == 'PATCH' and isinstance(request.data, list):
+            ids = {a_entero(item.get('id')) for item in request.data if isinstance(item, dict)}
+            instancias = list(Promocion.objects.filter(pk__in=ids - {None}))
+        serializer = self.get_serializer(
+            instancias, data=request.data, many=True, partial=request.method == 'PATCH',
+            allow_empty=False, max_length=MAXIMO_LOTE,
+        )
+        serializer.is_valid(raise_exception=True)
+        try:
+            serializer.save()
+        except IntegrityError:
+            # Restricción promocion_sin_solape: otra petición guardó fechas cruzadas entremedio
+            return Response(
+                {"non_field_errors": ["Otra operación guardó promociones con fechas cruzadas; intente de nuevo."]},
+                status=status.HTTP_409_CONFLICT,
+            )
+        return Response(serializer.data, status=status.HTTP_201_CREATED if request.method == 'POST' else status.HTTP_200_OK)
+
+    def eliminar_lote(self, request):
+        ids = request.data.get('ids') if isinstance(request.data, dict) else None
+        if not isinstance(ids, list) or not ids:
+            return Response({"ids": ["Debe enviar una lista de ids."]}, status=status.HTTP_400_BAD_REQUEST)
+        if len(ids) > MAXIMO_LOTE:
+            return Response({"ids": [f"Máximo {MAXIMO_LOTE} ids por petición."]}, status=status.HTTP_400_BAD_REQUEST)
+        pks = [a_entero(pk) for pk in ids]
+        if None in pks:
+            return Response({"ids": ["Los ids deben ser números enteros."]}, status=status.HTTP_400_BAD_REQUEST)
+        # delete() emite las señales por objeto; en_lote las aplica una vez
+        # (tombstones, versión, precios efectivos y contadores)
+        with transaction.atomic(), en_lote():
+            existentes = set(Promocion.objects.filter(pk__in=pks).values_list('pk', flat=True))
+            Promocion.objects.filter(pk__in=existentes).delete()
+        return Response([{"id": pk, "eliminada": pk in existentes} for pk in pks])
+
+class ClienteViewSet(ETagVersionMixin, ModelViewSet):
     queryset = Cliente.objects.all()
     serializer_class = ClienteSerializer
+    presupuesto_consultas = {'list': 4, 'retrieve': 3}
     authentication_classes = [ClienteJWTAuthentication]
     
     def get_permissions(self):
@@ -390,32 +728,171 @@ class ClienteViewSet(ModelViewSet):
 
         if serializer.is_valid():
             # Verifica la contraseña antigua
-            if not cliente.check_password(serializer.data.get("old_password")):
+            if not verificar_password(cliente, serializer.data.get("old_password")):
                 return Response({"old_password": ["La contraseña actual es incorrecta."]}, status=status.HTTP_400_BAD_REQUEST)
             
-            # Establece la nueva contraseña (el método set_password se encarga de hashearla)
-            cliente.set_password(serializer.data.get("new_password"))
+            # Establece la nueva contraseña (hasheada en el pool; también revoca los tokens)
+            cliente.asignar_password_hash(generar_hash(serializer.data.get("new_password")))
             cliente.save()
             return Response({"status": "Contraseña actualizada con éxito"}, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
-class ProveedorViewSet(ModelViewSet):
+class ProveedorViewSet(ETagVersionMixin, ModelViewSet):
     queryset = Proveedor.objects.all()
     serializer_class = ProveedorSerializer
+    presupuesto_consultas = {'list': 4, 'retrieve': 3}
 
-class SucursalViewSet(ModelViewSet):
+class SucursalViewSet(ETagVersionMixin, ModelViewSet):
     queryset = Sucursal.objects.all()
     serializer_class = SucursalSerializer
-
-class CategoriaViewSet(ModelViewSet):
+    presupuesto_consultas = {'list': 4, 'retrieve': 3, 'cercanas': 3}
+
+    MAXIMO_LISTA = 200
+    MAXIMO_CERCANAS = 50
+
+    def ubicaciones(self, sucursal, ids):
+        return Producto.objects.filter(id__in=ids).ubicados_en(sucursal.id).values(
+            'id', 'nombre', 'pasillo_ubicado_id', 'pasillo_nombre', 'estanteria_nombre', 'posicion', 'origen_ubicacion'
+        )
+
+    def ids_productos(self, request):
+        """Lee la lista de productos de POST {"productos": [...]} o GET ?productos=1,2,3."""
+        error = ErrorValidacion({"productos": ["Debe ser una lista de ids."]})
+        if request.method == 'POST':
+            if not isinstance(request.data, dict):
+                raise error
+            ids = request.data.get('productos', [])
+            # Un texto se recorrería carácter a carácter y un bool pasa por int
+            if not isinstance(ids, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+                raise error
+        else:
+            try:
+                ids = [int(i) for i in request.query_params.get('productos', '').split(',') if i]
+            except ValueError:
+                raise error
+        if len(ids) > self.MAXIMO_LISTA:
+            raise ErrorValidacion({"productos": [f"Máximo {self.MAXIMO_LISTA} productos por consulta."]})
+        return ids
+
+    # Endpoints usados por la app móvil: se autentican con el token del Cliente
+    @action(detail=False, methods=['get'], authentication_classes=[ClienteJWTAuthentication])
+    def cercanas(self, request):
+        """
+        Sucursales más cercanas a un punto, con su distancia en km:
+        ?lat=<latitud>&lon=<longitud>&k=<n>&producto=<id>. Con `producto`
+        solo las sucursales que tienen una ubicación propia para el producto.
+        """
+        errores = {}
+        try:
+            latitud = float(request.query_params.get('lat', ''))
+            if not -90 <= latitud <= 90:
+                raise ValueError
+        except ValueError:
+            errores['lat'] = ["Debe ser una latitud entre -90 y 90."]
+        try:
+            longitud = float(request.query_params.get('lon', ''))
+            if not -180 <= longitud <= 180:
+                raise ValueError
+        except ValueError:
+            errores['lon'] = ["Debe ser una longitud entre -180 y 180."]
+        try:
+            k = min(max(int(request.query_params.get('k', 5)), 1), self.MAXIMO_CERCANAS)
+        except ValueError:
+            errores['k'] = ["Debe ser un número entero."]
+        producto = request.query_params.get('producto')
+        if producto is not None:
+            try:
+                producto = int(producto)
+            except ValueError:
+                errores['producto'] = ["Debe indicar el id del producto."]
+        if errores:
+            return Response(errores, status=status.HTTP_400_BAD_REQUEST)
+        return Response(sucursales_cercanas(latitud, longitud, k, producto))
+
+    @action(detail=True, methods=['get'], authentication_classes=[ClienteJWTAuthentication])
+    def ubicar(self, request, pk=None):
+        """Dónde está un producto en esta sucursal: ?producto=<id>"""
+        sucursal = self.get_object()
+        try:
+            producto_id = int(request.query_params.get('producto', ''))
+        except ValueError:
+            return Response({"producto": ["Debe indicar el id del producto."]}, status=status.HTTP_400_BAD_REQUEST)
+
+        fila = self.ubicaciones(sucursal, [producto_id]).first()
+        if fila is None:
+            return Response({"detail": "Producto no encontrado."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(UbicacionSerializer(fila).data)
+
+    @action(detail=True, methods=['get', 'post'], url_path='ubicar-lista', authentication_classes=[ClienteJWTAuthentication])
+    def ubicar_lista(self, request, pk=None):
+        """
+        Ubica una lista de compras completa en una sola consulta.
+        GET ?productos=1,2,3 o POST {"productos": [1, 2, 3]}
+        """
+        sucursal = self.get_object()
+        ids = self.ids_productos(request)
+
+        filas = {fila['id']: fila for fila in self.ubicaciones(sucursal, ids)}
+        return Response({
+            'sucursal': sucursal.id,
+            'ubicaciones': UbicacionSerializer([filas[i] for i in ids if i in filas], many=True).data,
+            'no_encontrados': [i for i in ids if i not in filas],
+        })
+
+    @action(detail=True, methods=['get', 'post'], authentication_classes=[ClienteJWTAuthentication])
+    def ruta(self, request, pk=None):
+        """
+        Recorrido sugerido por la sucursal para una lista de compras
+        (mismos parámetros que `ubicar-lista`), agrupado por pasillo.
+        """
+        sucursal = self.get_object()
+        ids = self.ids_productos(request)
+
+        filas = list(self.ubicaciones(sucursal, ids))
+        tramos, distancia, sin_plano = planificar_ruta(sucursal.id, filas)
+
+        def tramo(pasillo_id, filas_pasillo):
+            filas_pasillo.sort(key=lambda f: (f['estanteria_nombre'], f['posicion'] is None, f['posicion'] or 0))
+            return {
+                'pasillo_id': pasillo_id,
+                'pasillo': filas_pasillo[0]['pasillo_nombre'],
+                'productos': UbicacionSerializer(filas_pasillo, many=True).data,
+            }
+
+        encontrados = {f['id'] for f in filas}
+        return Response({
+            'sucursal': sucursal.id,
+            'distancia_total': round(distancia, 2) if math.isfinite(distancia) else None,
+            'ruta': [tramo(p, f) for p, f in tramos],
+            'sin_plano': [tramo(p, f) for p, f in sin_plano],
+            'no_encontrados': [i for i in ids if i not in encontrados],
+        })
+
+class CategoriaViewSet(CacheVersionadaMixin, ModelViewSet):
     queryset = Categoria.objects.all()
     serializer_class = CategoriaSerializer
+    presupuesto_consultas = {'list': 4, 'retrieve': 3}
 
-class EstanteriaViewSet(ModelViewSet):
+class EstanteriaViewSet(CacheVersionadaMixin, ModelViewSet):
     queryset = Estanteria.objects.all()
     serializer_class = EstanteriaSerializer
+    presupuesto_consultas = {'list': 4, 'retrieve': 3}
 
-class PasilloViewSet(ModelViewSet):
+class PasilloViewSet(CacheVersionadaMixin, ModelViewSet):
     queryset = Pasillo.objects.all()
-    serializer_class = PasilloSerializer
\ No newline at end of file
+    serializer_class = PasilloSerializer
+    presupuesto_consultas = {'list': 4, 'retrieve': 3}
+
+class UbicacionProductoViewSet(ETagVersionMixin, ModelViewSet):
+    queryset = UbicacionProducto.objects.all()
+    serializer_class = UbicacionProductoSerializer
+    presupuesto_consultas = {'list': 4, 'retrieve': 3}
+
+class TareaViewSet(ReadOnlyModelViewSet):
+    """Estado de las tareas en segundo plano (imágenes, importaciones diferidas)."""
+    queryset = Tarea.objects.defer('adjunto').order_by('-id')
+    serializer_class = TareaSerializer
+    authentication_classes = [JWTAuthentication, SessionAuthentication]
+    permission_classes = [IsAdminUser]
+    presupuesto_consultas = {'list': 4, 'retrieve': 3}
@@ -0,0 +1,192 @@
+# mantenedores/vistas_async.py
+
+import asyncio
+import weakref
+from contextlib import asynccontextmanager
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views import View
+from rest_framework.exceptions import APIException, NotAuthenticated, NotFound
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .authentication import ClienteJWTAuthentication, UsuarioJWTAuthentication
+from .cache_api import clave_respuesta, contenido_en_cache
+from .models import Categoria, Estanteria, Pasillo, PrecioEfectivo, Producto, Promocion
+from .pagination import PaginaPagination
+from .precios import acompletar_descuentos
+from .serializers import CategoriaSerializer, ProductoSerializer, PromocionSerializer
+from .versiones import aobtener_versiones, calcular_validadores
+
+# Un semáforo por event loop (uvicorn usa uno por proceso; los tests, varios)
+_semaforos = weakref.WeakKeyDictionary()
+
+
+def semaforo_bd():
+    loop = asyncio.get_running_loop()
+    semaforo = _semaforos.get(loop)
+    if semaforo is None:
+        semaforo = _semaforos[loop] = asyncio.Semaphore(getattr(settings, 'LECTURA_ASYNC_CONCURRENCIA_BD', 20))
+    return semaforo
+
+
+@asynccontextmanager
+async def acceso_bd():
+    """
+    Tramo de la petición que usa la base de datos. Limita cuántas peticiones
+    consultan a la vez y al salir cierra la conexión del hilo de la petición
+    (CONN_MAX_AGE = 0 bajo ASGI), para no retenerla mientras la respuesta se
+    envía a un cliente lento.
+    """
+    async with semaforo_bd():
+        try:
+            yield
+        finally:
+            await sync_to_async(close_old_connections)()
+
+
+class LecturaAsyncView(View):
+    """
+    Lectura (list y retrieve) servida con el ORM async, con las mismas reglas
+    que el ViewSet equivalente: la misma autenticación, ETag/304 por versión de
+    modelo, caché de la respuesta, ?fields= y paginación opcional por número
+    de página (?page= / ?page_size=; sin parámetros se devuelve la lista
+    completa). El modo ?cursor= solo existe en los ViewSets.
+    """
+    http_method_names = ['get', 'head', 'options']
+    serializer_class = None
+    modelos_version = ()
+    depende_de_fecha = False
+    usar_cache = True
+    autenticacion_class = ClienteJWTAuthentication
+    # autenticación (el Cliente/Usuario del token) + versiones + count + filas
+    presupuesto_consultas = {'list': 4, 'retrieve': 3}
+
+    def get_queryset(self):
+        raise NotImplementedError
+
+    async def preparar(self, objetos):
+        """Carga lo que la serialización necesite sin consultar (ver ProductosLectura)."""
+
+    async def get(self, request, pk=None):
+        autenticacion = self.autenticacion_class()
+        modelos = self.modelos_version or (self.get_queryset().model,)
+        try:
+            async with acceso_bd():
+                resultado = await autenticacion.aauthenticate(request)
+                if resultado is None or resultado[0] is None:
+                    raise NotAuthenticated()
+                request.user = resultado[0]
+                versiones = await aobtener_versiones(modelos)
+            etag, last_modified = calcular_validadores(request, modelos, versiones, self.depende_de_fecha)
+
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                if self.usar_cache:
+                    clave = clave_respuesta(request, etag, prefijo='api-async')
+                    contenido = await contenido_en_cache(clave, lambda: self.generar(request, pk))
+                else:
+                    contenido = await self.generar(request, pk)
+                response = HttpResponse(contenido, content_type='application/json')
+        except APIException as exc:
+            # Mismo cuerpo que el exception handler de DRF
+            datos = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+            response = JsonResponse(datos, status=exc.status_code, safe=False)
+            if exc.status_code == 401:
+                response['WWW-Authenticate'] = autenticacion.authenticate_header(request)
+            return response
+
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    async def generar(self, request, pk):
+        """JSON renderizado de la respuesta; lanza NotFound si no existe."""
+        drf_request = Request(request)
+        queryset = self.get_queryset()
+        async with acceso_bd():
+            if pk is not None:
+                try:
+                    objetos = [await queryset.aget(pk=pk)]
+                except queryset.model.DoesNotExist:
+                    raise NotFound()
+                pagina = None
+            else:
+                objetos, pagina = await self.listar(drf_request, queryset)
+            await self.preparar(objetos)
+
+        contexto = {'request': drf_request}
+        if pk is not None:
+            datos = self.serializer_class(objetos[0], context=contexto).data
+        else:
+            datos = self.serializer_class(objetos, many=True, context=contexto).data
+            if pagina is not None:
+                datos = dict(pagina, results=datos)
+        return JSONRenderer().render(datos)
+
+    async def listar(self, drf_request, queryset):
+        params = drf_request.query_params
+        if not ('page' in params or 'page_size' in params or params.get('paginacion') == 'pagina'):
+            return [objeto async for objeto in queryset], None
+
+        tamano = PaginaPagination().get_page_size(drf_request)
+        try:
+            numero = int(params.get('page', 1))
+        except ValueError:
+            raise NotFound("Página inválida.")
+        total = await queryset.acount()
+        paginas = max(1, -(-total // tamano))
+        if not 1 <= numero <= paginas:
+            raise NotFound("Página inválida.")
+
+        inicio = (numero - 1) * tamano
+        objetos = [objeto async for objeto in queryset.order_by('id')[inicio:inicio + tamano]]
+        url = drf_request.build_absolute_uri()
+        anterior = None
+        if numero > 1:
+            anterior = remove_query_param(url, 'page') if numero == 2 else replace_query_param(url, 'page', numero - 1)
+        pagina = {
+            'count': total,
+            'next': replace_query_param(url, 'page', numero + 1) if numero < paginas else None,
+            'previous': anterior,
+        }
+        return objetos, pagina
+
+
+class ProductosLectura(LecturaAsyncView):
+    serializer_class = ProductoSerializer
+    modelos_version = (Producto, Promocion, Categoria, Estanteria, Pasillo, PrecioEfectivo)
+    depende_de_fecha = True
+    # + descuentos atrasados (PrecioEfectivo faltante o de otro día), en lote
+    presupuesto_consultas = {'list': 5, 'retrieve': 4}
+
+    def get_queryset(self):
+        return Producto.objects.select_related('categoria', 'estanteria', 'pasillo', 'precio_efectivo')
+
+    async def preparar(self, objetos):
+        await acompletar_descuentos(objetos)
+
+
+class CategoriasLectura(LecturaAsyncView):
+    serializer_class = CategoriaSerializer
+    # Como CategoriaViewSet: token de usuario del panel
+    autenticacion_class = UsuarioJWTAuthentication
+
+    def get_queryset(self):
+        return Categoria.objects.all()
+
+
+class PromocionesLectura(LecturaAsyncView):
+    serializer_class = PromocionSerializer
+    # Como PromocionViewSet: solo ETag, sin caché de la respuesta
+    usar_cache = False
+
+    def get_queryset(self):
+        return Promocion.objects.all()